@@ -1,10 +1,17 @@
 import json
 import os
-from datetime import datetime
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from datetime import date, datetime, timezone
 from pathlib import Path
-from typing import Protocol
+from typing import BinaryIO, Iterable, Iterator, Optional, Protocol
 from app.config import get_settings
 from app.db_models import Event
+from app import segments
 
 
 class ArchiveWriter(Protocol):
@@ -13,6 +20,38 @@ class ArchiveWriter(Protocol):
     def write_event(self, event: Event) -> None:
         """Write an event to the archive."""
         ...
+    
+    def write_events(self, events: Iterable[Event]) -> None:
+        """Write a batch of events to the archive."""
+        ...
+    
+    def flush(self) -> None:
+        """Make all accepted writes durable."""
+        ...
+    
+    def close(self) -> None:
+        """Flush and release any resources held by the writer."""
+        ...
+    
+    def iter_events(self, agent_id: str, date: datetime) -> Iterator[dict]:
+        """Stream the archived events for an agent and day."""
+        ...
+    
+    def write_seal(self, agent_id: str, date: datetime, seal: dict) -> None:
+        """Store the sealed digest for an agent and day."""
+        ...
+    
+    def read_seal(self, agent_id: str, date: datetime) -> Optional[dict]:
+        """Get the sealed digest for an agent and day, if any."""
+        ...
+    
+    def list_archives(self, start: date, end: date) -> Iterator[tuple[str, date]]:
+        """List the (agent_id, day) pairs archived between two days, inclusive."""
+        ...
+    
+    def find_event(self, agent_id: str, date: datetime, event_id: str) -> Optional[dict]:
+        """Get one archived event of an agent and day, if present."""
+        ...
 
 
 class LocalFileArchiveWriter:
@@ -25,6 +64,8 @@ class LocalFileArchiveWriter:
     Each line is a complete JSON object (JSON Lines format).
     """
     
+    suffix = ".jsonl"
+    
     def __init__(self, base_path: str = None):
         settings = get_settings()
         self.base_path = Path(base_path or settings.archive_path)
@@ -34,21 +75,15 @@ class LocalFileArchiveWriter:
         """Create base archive directory if it doesn't exist."""
         self.base_path.mkdir(parents=True, exist_ok=True)
     
-    def _get_archive_path(self, agent_id: str, timestamp: datetime) -> Path:
+    def _get_archive_path(self, agent_id: str, timestamp: datetime, suffix: str = None) -> Path:
         """Get the archive file path for a given agent and date."""
         date_str = timestamp.strftime("%Y-%m-%d")
         agent_dir = self.base_path / agent_id
         agent_dir.mkdir(parents=True, exist_ok=True)
-        return agent_dir / f"{date_str}.jsonl"
+        return agent_dir / f"{date_str}{suffix or self.suffix}"
     
-    def write_event(self, event: Event) -> None:
-        """
-        Append an event to the appropriate daily archive file.
-        
-        Uses append mode to ensure we never overwrite existing events.
-        """
-        archive_path = self._get_archive_path(event.agent_id, event.timestamp)
-        
+    def _serialize(self, event: Event) -> str:
+        """Serialize an event as one JSON Lines record."""
         event_data = {
             "event_id": event.event_id,
             "agent_id": event.agent_id,
@@ -63,25 +98,104 @@ class LocalFileArchiveWriter:
             "previous_event_hash": event.previous_event_hash,
             "event_hash": event.event_hash
         }
+        return json.dumps(event_data, separators=(',', ':')) + '\n'
+    
+    def encode_events(self, events: list[Event]) -> bytes:
+        """Encode events bound for one file as a single appendable chunk."""
+        return ''.join(self._serialize(event) for event in events).encode('utf-8')
+    
+    def write_event(self, event: Event) -> None:
+        """
+        Append an event to the appropriate daily archive file.
+        
+        Uses append mode to ensure we never overwrite existing events.
+        """
+        archive_path = self._get_archive_path(event.agent_id, event.timestamp)
         
         # Append mode - never overwrites
-        with open(archive_path, 'a') as f:
-            f.write(json.dumps(event_data, separators=(',', ':')) + '\n')
+        with open(archive_path, 'ab') as f:
+            f.write(self.encode_events([event]))
     
-    def read_events(self, agent_id: str, date: datetime) -> list[dict]:
-        """Read all events from an archive file (for verification)."""
-        archive_path = self._get_archive_path(agent_id, date)
+    def write_events(self, events: Iterable[Event]) -> None:
+        """
+        Append a batch of events, opening each agent/day file once.
+        
+        Events keep their relative order within each file.
+        """
+        events_by_file: dict[Path, list[Event]] = {}
+        for event in events:
+            archive_path = self._get_archive_path(event.agent_id, event.timestamp)
+            events_by_file.setdefault(archive_path, []).append(event)
+        
+        for archive_path, file_events in events_by_file.items():
+            with open(archive_path, 'ab') as f:
+                f.write(self.encode_events(file_events))
+    
+    def flush(self) -> None:
+        """Nothing to flush - every write is closed before returning."""
+    
+    def close(self) -> None:
+        """Nothing to release."""
+    
+    def iter_events(self, agent_id: str, date: datetime) -> Iterator[dict]:
+        """Stream events from an archive file one line at a time."""
+        archive_path = self._get_archive_path(agent_id, date, LocalFileArchiveWriter.suffix)
         
         if not archive_path.exists():
-            return []
+            return
         
-        events = []
         with open(archive_path, 'r') as f:
             for line in f:
                 if line.strip():
-                    events.append(json.loads(line))
-        
-        return events
+                    yield json.loads(line)
+    
+    def read_events(self, agent_id: str, date: datetime, start: int = 0, stop: int = None) -> list[dict]:
+        """Read all events from an archive file, or the [start, stop) range of them."""
+        return list(islice(self.iter_events(agent_id, date), start, stop))
+    
+    def find_event(self, agent_id: str, date: datetime, event_id: str) -> Optional[dict]:
+        """Look up one archived event by scanning the day's file."""
+        for record in self.iter_events(agent_id, date):
+            if record.get("event_id") == event_id:
+                return record
+        return None
+    
+    def _get_seal_path(self, agent_id: str, date: datetime) -> Path:
+        """Sidecar file holding the sealed digest of a daily archive file."""
+        return self._get_archive_path(agent_id, date).with_suffix(".seal.json")
+    
+    def write_seal(self, agent_id: str, date: datetime, seal: dict) -> None:
+        """Write the sealed digest sidecar next to a daily archive file."""
+        seal_path = self._get_seal_path(agent_id, date)
+        tmp_path = seal_path.with_suffix(".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(seal, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, seal_path)
+    
+    def read_seal(self, agent_id: str, date: datetime) -> Optional[dict]:
+        """Read the sealed digest sidecar for a daily archive file, if any."""
+        seal_path = self._get_seal_path(agent_id, date)
+        if not seal_path.exists():
+            return None
+        with open(seal_path, 'r') as f:
+            return json.load(f)
+    
+    def list_archives(self, start: date, end: date) -> Iterator[tuple[str, date]]:
+        """Walk the archive tree for daily files between two days, inclusive."""
+        for agent_dir in sorted(p for p in self.base_path.iterdir() if p.is_dir()):
+            days = set()
+            for archive_path in agent_dir.glob("*.*"):
+                if archive_path.suffix not in (".jsonl", ".seg", ".segz"):
+                    continue
+                try:
+                    days.add(date.fromisoformat(archive_path.name.split(".")[0]))
+                except ValueError:
+                    continue
+            for day in sorted(days):
+                if start <= day <= end:
+                    yield agent_dir.name, day
     
     def check_health(self) -> bool:
         """Check if archive directory is writable."""
@@ -94,8 +208,487 @@ class LocalFileArchiveWriter:
             return False
 
 
+class SegmentArchiveWriter(LocalFileArchiveWriter):
+    """
+    Archive writer using the compact binary segment format.
+    
+    Each agent/day has one active segment that appends go to, plus any
+    number of sealed ones:
+    /archive/{agent_id}/{YYYY-MM-DD}.seg             active
+    /archive/{agent_id}/{YYYY-MM-DD}.{NNNN}.seg      sealed, awaiting compaction
+    /archive/{agent_id}/{YYYY-MM-DD}.{NNNN}.segz     sealed and compressed
+    /archive/{agent_id}/{YYYY-MM-DD}.{NNNN}.idx      index of the .segz
+    
+    Each append is one self-contained block (see app.segments). The
+    buffered writer rolls the active segment over by size or age;
+    sealed segments are then compressed in seekable chunks and indexed
+    by event_id and sequence. Readers memory-map every file. Days
+    archived as JSONL before the format was switched are still read,
+    ahead of the segment records.
+    """
+    
+    suffix = ".seg"
+    
+    def __init__(self, base_path: str = None):
+        super().__init__(base_path)
+        # Held while segments are renamed, so readers see a consistent set
+        self._segments_lock = threading.Lock()
+    
+    def encode_events(self, events: list[Event]) -> bytes:
+        """Encode events bound for one file as a single segment block."""
+        return segments.encode_block(events)
+    
+    def _sealed_segments(self, active_path: Path) -> list[tuple[int, Path, Optional[Path]]]:
+        """(number, path, index path or None if uncompressed) of a day's sealed segments, in order."""
+        found: dict[int, tuple[Path, Optional[Path]]] = {}
+        for path in active_path.parent.glob(f"{active_path.stem}.*"):
+            parts = path.name.split(".")
+            if len(parts) != 3 or not parts[1].isdigit():
+                continue
+            number = int(parts[1])
+            if parts[2] == "segz":
+                found[number] = (path, path.with_suffix(".idx"))
+            elif parts[2] == "seg":
+                found.setdefault(number, (path, None))
+        return [(number, *found[number]) for number in sorted(found)]
+    
+    def _snapshot(self, agent_id: str, date: datetime) -> list[tuple]:
+        """
+        Map every segment of a day, oldest first.
+        
+        Returns (mapped, index) pairs; index is None for uncompressed
+        segments. Mapping under the lock means a concurrent rollover or
+        compaction can't make a reader skip or repeat a segment.
+        """
+        active_path = self._get_archive_path(agent_id, date)
+        sources = []
+        with self._segments_lock:
+            for _, path, index_path in self._sealed_segments(active_path):
+                index = segments.SegmentIndex(index_path) if index_path else None
+                sources.append((segments.map_file(path), index))
+            if active_path.exists():
+                sources.append((segments.map_file(active_path), None))
+        return sources
+    
+    def iter_events(self, agent_id: str, date: datetime, start: int = 0, stop: int = None) -> Iterator[dict]:
+        """
+        Stream a day's events [start, stop): its JSONL file (if any), then its segments.
+        
+        Compressed segments outside the range are skipped using their
+        index counts, and the first one in range is entered at the
+        chunk holding `start`.
+        """
+        position = 0
+        
+        def take(records: Iterable[dict]) -> Iterator[dict]:
+            nonlocal position
+            for record in records:
+                if stop is not None and position >= stop:
+                    return
+                if position >= start:
+                    yield record
+                position += 1
+        
+        yield from take(super().iter_events(agent_id, date))
+        
+        sources = self._snapshot(agent_id, date)
+        try:
+            for mapped, index in sources:
+                if stop is not None and position >= stop:
+                    return
+                if index is None:
+                    yield from take(segments.iter_records(mapped) if mapped is not None else ())
+                    continue
+                if position + index.event_count > start:
+                    yield from segments.read_compressed(
+                        mapped,
+                        index,
+                        start - position,
+                        None if stop is None else stop - position
+                    )
+                position += index.event_count
+        finally:
+            for mapped, _ in sources:
+                segments.release(mapped)
+    
+    def read_events(self, agent_id: str, date: datetime, start: int = 0, stop: int = None) -> list[dict]:
+        """Read a day's events, or the [start, stop) range of them."""
+        return list(self.iter_events(agent_id, date, start, stop))
+    
+    def find_event(self, agent_id: str, date: datetime, event_id: str) -> Optional[dict]:
+        """
+        Look up one archived event.
+        
+        Compressed segments are searched through their index, inflating
+        a single chunk; only the active segment (and uncompressed or
+        legacy files) are scanned.
+        """
+        for record in super().iter_events(agent_id, date):
+            if record.get("event_id") == event_id:
+                return record
+        
+        sources = self._snapshot(agent_id, date)
+        try:
+            for mapped, index in sources:
+                if index is not None:
+                    sequence = index.lookup(event_id)
+                    if sequence is not None:
+                        return next(segments.read_compressed(mapped, index, sequence, sequence + 1), None)
+                elif mapped is not None:
+                    for record in segments.iter_records(mapped):
+                        if record["event_id"] == event_id:
+                            return record
+            return None
+        finally:
+            for mapped, _ in sources:
+                segments.release(mapped)
+    
+    def seal_segment(self, active_path: Path) -> Optional[Path]:
+        """
+        Seal a day's active segment by renaming it to the next number.
+        
+        The caller must have closed its handle. Returns the sealed path,
+        or None if there was nothing to seal.
+        """
+        with self._segments_lock:
+            if not active_path.exists() or active_path.stat().st_size == 0:
+                return None
+            sealed = self._sealed_segments(active_path)
+            number = sealed[-1][0] + 1 if sealed else 1
+            sealed_path = active_path.with_name(f"{active_path.stem}.{number:04d}.seg")
+            os.replace(active_path, sealed_path)
+            return sealed_path
+    
+    def compact_segment(self, sealed_path: Path) -> None:
+        """Compress a sealed segment, write its index and remove the raw file."""
+        compressed_path = sealed_path.with_suffix(".segz")
+        segments.compact_segment(sealed_path, compressed_path, sealed_path.with_suffix(".idx"))
+        with self._segments_lock:
+            sealed_path.unlink()
+    
+    def pending_segments(self) -> Iterator[Path]:
+        """Sealed segments that haven't been compressed yet (e.g. after a crash)."""
+        for path in sorted(self.base_path.glob("*/*.*.seg")):
+            if path.with_suffix(".segz").exists():
+                # Compressed but the raw file wasn't removed
+                with self._segments_lock:
+                    path.unlink()
+                continue
+            yield path
+    
+    def active_segments(self, before: date = None) -> Iterator[Path]:
+        """Active segments, optionally only those of days before `before`."""
+        for path in sorted(self.base_path.glob("*/*.seg")):
+            if path.name.count(".") != 1:
+                continue
+            try:
+                day = date.fromisoformat(path.stem)
+            except ValueError:
+                continue
+            if before is None or day < before:
+                yield path
+
+
+class ArchiveFormat:
+    """On-disk format for new archive writes."""
+    JSONL = "jsonl"      # one JSON object per line
+    SEGMENT = "segment"  # binary blocks, see app.segments
+    
+    WRITERS = {JSONL: LocalFileArchiveWriter, SEGMENT: SegmentArchiveWriter}
+
+
+class FsyncPolicy:
+    """When the buffered writer calls fsync on archive files."""
+    EVENT = "event"        # after every event
+    COUNT = "count"        # after every N events per file
+    INTERVAL = "interval"  # at most every N milliseconds
+
+
+# How often the writer thread looks for segments due to roll over by age
+ROLL_CHECK_SECONDS = 1.0
+
+
+class BufferedArchiveWriter:
+    """
+    Long-lived archive writer that keeps file I/O off the request path.
+    
+    Events are serialized by the caller and queued; a background thread
+    appends them to the same daily files as LocalFileArchiveWriter (or
+    SegmentArchiveWriter, per ARCHIVE_FORMAT). Open
+    file handles are kept in an LRU pool so busy agents don't reopen
+    their file on every write, and fsync follows a configurable policy.
+    
+    With the segment format, the active segment of an agent/day is
+    sealed once it reaches ARCHIVE_SEGMENT_MAX_BYTES or has been written
+    to for ARCHIVE_SEGMENT_MAX_AGE_S, or when its day is over. Sealed
+    segments are compressed and indexed on a separate thread.
+    
+    Queued writes are lost if the process crashes before they are
+    flushed; the database remains the primary copy.
+    """
+    
+    def __init__(
+        self,
+        base_path: str = None,
+        max_open_files: int = None,
+        fsync_policy: str = None,
+        fsync_every: int = None,
+        fsync_interval_ms: float = None,
+        archive_format: str = None,
+        segment_max_bytes: int = None,
+        segment_max_age_s: float = None
+    ):
+        settings = get_settings()
+        archive_format = archive_format or settings.archive_format
+        if archive_format not in ArchiveFormat.WRITERS:
+            raise ValueError(f"Unknown archive format: {archive_format}")
+        self.files = ArchiveFormat.WRITERS[archive_format](base_path)
+        self.base_path = self.files.base_path
+        self.max_open_files = max_open_files or settings.archive_max_open_files
+        self.fsync_policy = fsync_policy or settings.archive_fsync_policy
+        self.fsync_every = fsync_every or settings.archive_fsync_every
+        self.fsync_interval = (fsync_interval_ms or settings.archive_fsync_interval_ms) / 1000.0
+        if self.fsync_policy not in (FsyncPolicy.EVENT, FsyncPolicy.COUNT, FsyncPolicy.INTERVAL):
+            raise ValueError(f"Unknown archive fsync policy: {self.fsync_policy}")
+        
+        self._queue: queue.Queue = queue.Queue()
+        self._handles: OrderedDict[Path, BinaryIO] = OrderedDict()
+        self._unsynced: dict[Path, int] = {}
+        self._known_dirs: set[Path] = set()
+        self._last_sync = time.monotonic()
+        
+        self.rollover = isinstance(self.files, SegmentArchiveWriter)
+        self.segment_max_bytes = segment_max_bytes or settings.archive_segment_max_bytes
+        self.segment_max_age = segment_max_age_s or settings.archive_segment_max_age_s
+        self._segment_started: dict[Path, float] = {}
+        self._next_roll_check = time.monotonic()
+        self._compactor: Optional[ThreadPoolExecutor] = None
+        if self.rollover:
+            self._compactor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="archive-compactor")
+        
+        self._thread = threading.Thread(target=self._run, name="archive-writer", daemon=True)
+        self._thread.start()
+    
+    def _path_for(self, event: Event) -> Path:
+        date_str = event.timestamp.strftime("%Y-%m-%d")
+        return self.base_path / event.agent_id / f"{date_str}{self.files.suffix}"
+    
+    def write_event(self, event: Event) -> None:
+        """Queue an event for appending to its daily archive file."""
+        self.write_events([event])
+    
+    def write_events(self, events: Iterable[Event]) -> None:
+        """Queue a batch of events, grouped into one write per file."""
+        chunks: dict[Path, list[Event]] = {}
+        for event in events:
+            chunks.setdefault(self._path_for(event), []).append(event)
+        for path, file_events in chunks.items():
+            self._queue.put((path, self.files.encode_events(file_events), len(file_events)))
+    
+    def flush(self) -> None:
+        """Block until everything queued so far is written and fsynced."""
+        if not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+    
+    def close(self) -> None:
+        """Flush pending writes, stop the background thread and close all files."""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join()
+        if self._compactor is not None:
+            self._compactor.shutdown(wait=True)
+    
+    def iter_events(self, agent_id: str, date: datetime) -> Iterator[dict]:
+        """Stream events from an archive file, including queued writes."""
+        self.flush()
+        return self.files.iter_events(agent_id, date)
+    
+    def read_events(self, agent_id: str, date: datetime, start: int = 0, stop: int = None) -> list[dict]:
+        """Read events from an archive file, including queued writes."""
+        self.flush()
+        return self.files.read_events(agent_id, date, start, stop)
+    
+    def find_event(self, agent_id: str, date: datetime, event_id: str) -> Optional[dict]:
+        """Look up one archived event, including queued writes."""
+        self.flush()
+        return self.files.find_event(agent_id, date, event_id)
+    
+    def write_seal(self, agent_id: str, date: datetime, seal: dict) -> None:
+        """Write the sealed digest sidecar next to a daily archive file."""
+        self.files.write_seal(agent_id, date, seal)
+    
+    def read_seal(self, agent_id: str, date: datetime) -> Optional[dict]:
+        """Read the sealed digest sidecar for a daily archive file, if any."""
+        return self.files.read_seal(agent_id, date)
+    
+    def list_archives(self, start: date, end: date) -> Iterator[tuple[str, date]]:
+        """Walk the archive tree for daily files, including queued writes."""
+        self.flush()
+        return self.files.list_archives(start, end)
+    
+    def check_health(self) -> bool:
+        """Check that the archive directory is writable and the writer is running."""
+        return self._thread.is_alive() and self.files.check_health()
+    
+    def _run(self) -> None:
+        if self.rollover:
+            self._recover_segments()
+        while True:
+            self._roll_due()
+            timeout = None
+            if self.fsync_policy == FsyncPolicy.INTERVAL and self._unsynced:
+                timeout = max(0.0, self._last_sync + self.fsync_interval - time.monotonic())
+            if self._segment_started:
+                roll_in = max(0.0, self._next_roll_check - time.monotonic())
+                timeout = roll_in if timeout is None else min(timeout, roll_in)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._sync_all()
+                continue
+            
+            if item is None:
+                self._sync_all()
+                for handle in self._handles.values():
+                    handle.close()
+                self._handles.clear()
+                return
+            
+            if isinstance(item, threading.Event):
+                self._sync_all()
+                item.set()
+                continue
+            
+            path, data, count = item
+            try:
+                self._append(path, data, count)
+            except Exception as e:
+                # Log but keep the writer alive - DB is primary storage
+                print(f"Warning: Archive write failed for {path}: {e}")
+            
+            if self.fsync_policy == FsyncPolicy.INTERVAL and time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync_all()
+    
+    def _append(self, path: Path, data: bytes, count: int) -> None:
+        handle = self._open(path)
+        # Append mode - never overwrites
+        handle.write(data)
+        self._unsynced[path] = self._unsynced.get(path, 0) + count
+        
+        if self.fsync_policy == FsyncPolicy.EVENT or (
+            self.fsync_policy == FsyncPolicy.COUNT and self._unsynced[path] >= self.fsync_every
+        ):
+            self._sync(path)
+        
+        if self.rollover:
+            self._segment_started.setdefault(path, time.monotonic())
+            if handle.tell() >= self.segment_max_bytes:
+                self._roll(path)
+    
+    def _open(self, path: Path) -> BinaryIO:
+        handle = self._handles.get(path)
+        if handle is not None:
+            self._handles.move_to_end(path)
+            return handle
+        
+        if path.parent not in self._known_dirs:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._known_dirs.add(path.parent)
+        
+        # Evict the least recently used handle, making it durable first
+        while len(self._handles) >= self.max_open_files:
+            old_path, old_handle = self._handles.popitem(last=False)
+            self._sync(old_path, old_handle)
+            old_handle.close()
+        
+        handle = open(path, 'ab')
+        self._handles[path] = handle
+        return handle
+    
+    def _sync(self, path: Path, handle: Optional[BinaryIO] = None) -> None:
+        handle = handle or self._handles.get(path)
+        if handle is None or not self._unsynced.pop(path, 0):
+            return
+        try:
+            handle.flush()
+            os.fsync(handle.fileno())
+        except Exception as e:
+            print(f"Warning: Archive fsync failed for {path}: {e}")
+    
+    def _sync_all(self) -> None:
+        for path in list(self._unsynced):
+            self._sync(path)
+        self._last_sync = time.monotonic()
+    
+    def _roll_due(self) -> None:
+        """Roll over active segments that are too old or whose day is over."""
+        now = time.monotonic()
+        if not self._segment_started or now < self._next_roll_check:
+            return
+        self._next_roll_check = now + ROLL_CHECK_SECONDS
+        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        for path, started in list(self._segment_started.items()):
+            if now - started >= self.segment_max_age or path.stem < today:
+                self._roll(path)
+    
+    def _roll(self, path: Path) -> None:
+        """Seal an active segment and queue it for compaction."""
+        handle = self._handles.pop(path, None)
+        if handle is not None:
+            self._unsynced.setdefault(path, 1)
+            self._sync(path, handle)
+            handle.close()
+        self._segment_started.pop(path, None)
+        try:
+            sealed_path = self.files.seal_segment(path)
+        except Exception as e:
+            print(f"Warning: Archive rollover failed for {path}: {e}")
+            return
+        if sealed_path is not None:
+            self._compactor.submit(self._compact, sealed_path)
+    
+    def _compact(self, sealed_path: Path) -> None:
+        try:
+            self.files.compact_segment(sealed_path)
+        except Exception as e:
+            # The raw sealed segment stays readable; retried on next start
+            print(f"Warning: Archive compaction failed for {sealed_path}: {e}")
+    
+    def _recover_segments(self) -> None:
+        """Queue compactions interrupted by a restart and seal past days' segments."""
+        try:
+            for sealed_path in list(self.files.pending_segments()):
+                self._compactor.submit(self._compact, sealed_path)
+            today = datetime.now(timezone.utc).date()
+            for active_path in list(self.files.active_segments(before=today)):
+                self._roll(active_path)
+        except Exception as e:
+            print(f"Warning: Archive segment recovery failed: {e}")
+
+
+_archive_writer: Optional[BufferedArchiveWriter] = None
+_archive_writer_lock = threading.Lock()
+
+
 def get_archive_writer() -> ArchiveWriter:
     """Factory function to get the appropriate archive writer."""
-    # For v1, always use local file writer
+    # One long-lived buffered writer per process
     # Later, this can check config to return S3 writer
-    return LocalFileArchiveWriter()
\ No newline at end of file
+    global _archive_writer
+    with _archive_writer_lock:
+        if _archive_writer is None:
+            _archive_writer = BufferedArchiveWriter()
+        return _archive_writer
+
+
+def close_archive_writer() -> None:
+    """Flush and close the process-wide archive writer (called on shutdown)."""
+    global _archive_writer
+    with _archive_writer_lock:
+        if _archive_writer is not None:
+            _archive_writer.close()
+            _archive_writer = None
\ No newline at end of file
@@ -1,28 +1,197 @@
+"""
+API key authentication.
+
+Keys are checked against an in-memory registry of SHA-256 digests: the
+presented key is hashed once and looked up by digest, then confirmed with
+hmac.compare_digest, so the cost doesn't depend on how many keys exist or
+how much of a wrong key matches. The registry holds:
+
+- API_KEY, the shared key, unscoped (set it to an empty string to disable)
+- the entries of API_KEYS_FILE, if set: a JSON file of hashed keys,
+  optionally scoped to agent_id prefixes
+
+    {"keys": [{"name": "support-fleet", "sha256": "<hex digest of the key>",
+               "agent_prefixes": ["support-"]}]}
+
+The file is loaded once and reloaded when its modification time changes
+(checked at most every API_KEYS_RELOAD_S seconds), so keys can be added
+or revoked without a restart. `python -m app.cli keys generate` prints a
+new key and its registry entry.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
 from fastapi import HTTPException, Security, status
 from fastapi.security import APIKeyHeader
 from app.config import get_settings
 
+logger = logging.getLogger(__name__)
+
 # Define the API key header
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
 
-async def verify_api_key(api_key: str = Security(api_key_header)) -> str:
+@dataclass(frozen=True)
+class ApiKey:
+    """A registered key. agent_prefixes is None for an unscoped key."""
+    name: str
+    digest: bytes
+    agent_prefixes: Optional[tuple[str, ...]] = None
+
+    def allows(self, agent_id: Optional[str]) -> bool:
+        """
+        Whether this key may access an agent's events.
+
+        agent_id None stands for "every agent" (listing without a filter,
+        fleet-wide jobs), which only unscoped keys may do.
+        """
+        if self.agent_prefixes is None:
+            return True
+        return agent_id is not None and agent_id.startswith(self.agent_prefixes)
+
+
+def hash_key(api_key: str) -> bytes:
+    return hashlib.sha256(api_key.encode("utf-8")).digest()
+
+
+def generate_key(name: str, agent_prefixes: Optional[list[str]] = None) -> tuple[str, dict]:
+    """A new random key and its API_KEYS_FILE entry (which holds only the digest)."""
+    api_key = secrets.token_urlsafe(32)
+    entry = {"name": name, "sha256": hash_key(api_key).hex()}
+    if agent_prefixes:
+        entry["agent_prefixes"] = agent_prefixes
+    return api_key, entry
+
+
+def load_keys_file(path: str) -> dict[bytes, ApiKey]:
+    """Parse an API_KEYS_FILE. Raises ValueError on a malformed file."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    keys = {}
+    for i, entry in enumerate(data.get("keys", [])):
+        try:
+            digest = bytes.fromhex(entry["sha256"])
+            prefixes = entry.get("agent_prefixes")
+            name = entry.get("name") or f"key-{i}"
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"{path}: invalid key entry {i}: {e}") from e
+        if len(digest) != hashlib.sha256().digest_size:
+            raise ValueError(f"{path}: key entry {i} is not a SHA-256 digest")
+        if prefixes is not None and (
+            not isinstance(prefixes, list) or not all(isinstance(p, str) for p in prefixes)
+        ):
+            raise ValueError(f"{path}: agent_prefixes of key entry {i} must be a list of strings")
+        keys[digest] = ApiKey(name, digest, tuple(prefixes) if prefixes is not None else None)
+    return keys
+
+
+class KeyRegistry:
+    """Registered keys by digest, reloaded when API_KEYS_FILE changes."""
+
+    def __init__(self, api_key: str, keys_file: str, reload_s: float):
+        self.keys_file = keys_file
+        self.reload_s = reload_s
+        self._static = {}
+        if api_key:
+            digest = hash_key(api_key)
+            self._static[digest] = ApiKey("default", digest)
+        self._keys = dict(self._static)
+        self._file_version = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        if keys_file:
+            self.reload()
+
+    def reload(self) -> None:
+        """Reload API_KEYS_FILE if it changed; a broken file keeps the old keys."""
+        try:
+            stat = os.stat(self.keys_file)
+        except OSError as e:
+            logger.error("Cannot read API_KEYS_FILE %s: %s", self.keys_file, e)
+            return
+        version = (stat.st_mtime_ns, stat.st_size)
+        if version == self._file_version:
+            return
+        try:
+            loaded = load_keys_file(self.keys_file)
+        except (OSError, ValueError) as e:
+            logger.error("Keeping previous API keys, failed to load %s: %s", self.keys_file, e)
+            return
+        # Replace the whole dict so lookups never see a half-built registry
+        self._keys = {**loaded, **self._static}
+        self._file_version = version
+        logger.info("Loaded %d API keys from %s", len(loaded), self.keys_file)
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        with self._lock:
+            if now < self._next_check:
+                return
+            self._next_check = now + self.reload_s
+            self.reload()
+
+    def lookup(self, api_key: str) -> Optional[ApiKey]:
+        if self.keys_file:
+            self._maybe_reload()
+        digest = hash_key(api_key)
+        entry = self._keys.get(digest)
+        if entry is None or not hmac.compare_digest(entry.digest, digest):
+            return None
+        return entry
+
+
+_registry: Optional[KeyRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_key_registry() -> KeyRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                settings = get_settings()
+                _registry = KeyRegistry(settings.api_key, settings.api_keys_file, settings.api_keys_reload_s)
+    return _registry
+
+
+async def verify_api_key(api_key: str = Security(api_key_header)) -> ApiKey:
     """
     Verify the API key from the X-API-Key header.
-    Returns the API key if valid, raises 401 if missing or invalid.
+    Returns the matching registry entry, raises 401 if missing or invalid.
     """
-    settings = get_settings()
-    
     if api_key is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Missing X-API-Key header"
         )
-    
-    if api_key != settings.api_key:
+
+    entry = get_key_registry().lookup(api_key)
+    if entry is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid API key"
         )
-    
-    return api_key
\ No newline at end of file
+
+    return entry
+
+
+def check_agent_access(api_key: ApiKey, agent_id: Optional[str]) -> None:
+    """Raise 403 unless the key may access agent_id (None: every agent)."""
+    if not api_key.allows(agent_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=(
+                f"API key is not allowed to access agent {agent_id}" if agent_id is not None
+                else "API key is scoped to specific agents; pass agent_id"
+            )
+        )
@@ -0,0 +1,360 @@
+"""
+Command-line tools for operating the ledger.
+
+Run inside the backend container, e.g.:
+
+    python -m app.cli verify my-agent --full --workers 8
+"""
+import argparse
+import json
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+from app.config import get_settings
+from app.database import SessionLocal, engine
+from app.hash_chain import verify_chain, lock_chain_head
+from app.fleet import create_job, run_job, list_agent_ids
+from app.mmr import rebuild_index
+from app.sealing import seal_day, agents_active_on
+from app import reconcile
+from app.archive import SegmentArchiveWriter
+from app import column_migration
+from app import partitions
+from app import sequences
+from app.auth import generate_key, hash_key
+from app.db_models import VerificationJob, VerificationResult, ReconciliationJob, ReconciliationDiscrepancy
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+def cmd_verify(args: argparse.Namespace) -> int:
+    """Verify one agent's chain and print the result as JSON."""
+    def report_progress(events_checked: int) -> None:
+        print(f"  ... {events_checked} events checked", file=sys.stderr)
+
+    db = SessionLocal()
+    try:
+        is_valid, events_checked, first_invalid_event_id, error_message, mode = verify_chain(
+            db=db,
+            agent_id=args.agent_id,
+            start_time=args.start_time,
+            end_time=args.end_time,
+            full=args.full,
+            progress=report_progress,
+            workers=args.workers
+        )
+    finally:
+        db.close()
+
+    print(json.dumps({
+        "agent_id": args.agent_id,
+        "is_valid": is_valid,
+        "events_checked": events_checked,
+        "first_invalid_event_id": first_invalid_event_id,
+        "error_message": error_message,
+        "mode": mode
+    }, indent=2))
+    return 0 if is_valid else 1
+
+
+def cmd_verify_all(args: argparse.Namespace) -> int:
+    """Verify every agent's chain and print a summary of broken chains."""
+    db = SessionLocal()
+    try:
+        job = create_job(db, full=args.full)
+        job_id = job.job_id
+    finally:
+        db.close()
+
+    print(f"Verification job {job_id}", file=sys.stderr)
+
+    def report_progress(agent_id: str, is_valid: bool) -> None:
+        print(f"  {'ok ' if is_valid else 'BAD'} {agent_id}", file=sys.stderr)
+
+    run_job(job_id, concurrency=args.concurrency, workers=args.workers, progress=report_progress)
+
+    db = SessionLocal()
+    try:
+        job = db.query(VerificationJob).filter(VerificationJob.job_id == job_id).one()
+        broken = (
+            db.query(VerificationResult)
+            .filter(VerificationResult.job_id == job_id, VerificationResult.is_valid.is_(False))
+            .order_by(VerificationResult.agent_id)
+            .all()
+        )
+        print(json.dumps({
+            "job_id": job_id,
+            "status": job.status,
+            "total_agents": job.total_agents,
+            "invalid_agents": job.invalid_agents,
+            "events_checked": job.events_checked,
+            "error_message": job.error_message,
+            "broken": [
+                {
+                    "agent_id": r.agent_id,
+                    "events_checked": r.events_checked,
+                    "first_invalid_event_id": r.first_invalid_event_id,
+                    "error_message": r.error_message
+                }
+                for r in broken
+            ]
+        }, indent=2))
+        return 0 if job.status == "completed" and not broken else 1
+    finally:
+        db.close()
+
+
+def cmd_mmr_rebuild(args: argparse.Namespace) -> int:
+    """Rebuild the Merkle Mountain Range index from the events table."""
+    db = SessionLocal()
+    try:
+        agent_ids = [args.agent_id] if args.agent_id else list_agent_ids(db)
+        for agent_id in agent_ids:
+            # Hold the chain head lock so no event is appended mid-rebuild
+            lock_chain_head(db, agent_id)
+            leaf_count = rebuild_index(db, agent_id)
+            print(f"  {agent_id}: {leaf_count} events", file=sys.stderr)
+    finally:
+        db.close()
+    return 0
+
+
+def cmd_seal(args: argparse.Namespace) -> int:
+    """Seal the archive digests for a closed day."""
+    day = args.date or datetime.now(timezone.utc).date() - timedelta(days=1)
+    db = SessionLocal()
+    try:
+        agent_ids = [args.agent_id] if args.agent_id else agents_active_on(db, day)
+        for agent_id in agent_ids:
+            seal = seal_day(db, agent_id, day)
+            if seal is None:
+                print(f"{day} has not closed yet (UTC)", file=sys.stderr)
+                return 1
+            print(f"  {agent_id}: {seal.event_count} events, root {seal.root}", file=sys.stderr)
+    finally:
+        db.close()
+    return 0
+
+
+def cmd_reconcile(args: argparse.Namespace) -> int:
+    """Reconcile the database against the archive and print any discrepancies."""
+    db = SessionLocal()
+    try:
+        job = reconcile.create_job(db, args.start_date, args.end_date, args.agent_id)
+        job_id = job.job_id
+    finally:
+        db.close()
+
+    print(f"Reconciliation job {job_id}", file=sys.stderr)
+
+    def report_progress(report: reconcile.DayReport) -> None:
+        print(f"  {'ok ' if report.is_clean else 'BAD'} {report.agent_id} {report.day}", file=sys.stderr)
+
+    reconcile.run_job(job_id, concurrency=args.concurrency, progress=report_progress)
+
+    db = SessionLocal()
+    try:
+        job = db.query(ReconciliationJob).filter(ReconciliationJob.job_id == job_id).one()
+        discrepancies = (
+            db.query(ReconciliationDiscrepancy)
+            .filter(ReconciliationDiscrepancy.job_id == job_id)
+            .order_by(ReconciliationDiscrepancy.agent_id, ReconciliationDiscrepancy.day)
+            .all()
+        )
+        print(json.dumps({
+            "job_id": job_id,
+            "status": job.status,
+            "total_days": job.total_days,
+            "discrepant_days": job.discrepant_days,
+            "db_events": job.db_events,
+            "archive_events": job.archive_events,
+            "missing_in_archive": job.missing_in_archive,
+            "extra_in_archive": job.extra_in_archive,
+            "mismatched": job.mismatched,
+            "error_message": job.error_message,
+            "discrepancies": [
+                {
+                    "agent_id": d.agent_id,
+                    "day": d.day,
+                    "missing_in_archive": d.missing_in_archive,
+                    "extra_in_archive": d.extra_in_archive,
+                    "mismatched": d.mismatched,
+                    "first_missing_event_id": d.first_missing_event_id,
+                    "first_extra_event_id": d.first_extra_event_id,
+                    "first_mismatched_event_id": d.first_mismatched_event_id,
+                    "error_message": d.error_message
+                }
+                for d in discrepancies
+            ]
+        }, indent=2))
+        return 0 if job.status == "completed" and not discrepancies else 1
+    finally:
+        db.close()
+
+
+def cmd_archive_compact(args: argparse.Namespace) -> int:
+    """Seal past days' active segments and compress every sealed segment."""
+    files = SegmentArchiveWriter()
+    today = datetime.now(timezone.utc).date()
+    # Only past days: the running service may still be appending to today's segments
+    for active_path in list(files.active_segments(before=today)):
+        files.seal_segment(active_path)
+    for sealed_path in list(files.pending_segments()):
+        files.compact_segment(sealed_path)
+        print(f"  compacted {sealed_path.relative_to(files.base_path)}", file=sys.stderr)
+    return 0
+
+
+def cmd_migrate_columns(args: argparse.Namespace) -> int:
+    """Run one step of the online migration to compact event columns."""
+    try:
+        if args.step == "status":
+            print(json.dumps(column_migration.status(engine), indent=2))
+        elif args.step == "backfill":
+            def report_progress(rows: int) -> None:
+                print(f"  ... {rows} rows backfilled", file=sys.stderr)
+
+            rows = column_migration.backfill(engine, batch_size=args.batch_size, progress=report_progress)
+            print(f"Backfilled {rows} rows", file=sys.stderr)
+        else:
+            getattr(column_migration, args.step)(engine)
+            print(f"Step {args.step} done", file=sys.stderr)
+    except RuntimeError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    return 0
+
+
+def cmd_partitions(args: argparse.Namespace) -> int:
+    """Create, list or detach monthly events partitions."""
+    settings = get_settings()
+    if args.action == "ensure":
+        for name in partitions.ensure_partitions(engine, args.months_ahead or settings.db_partition_months_ahead):
+            print(f"  created {name}", file=sys.stderr)
+    elif args.action == "list":
+        print(json.dumps(partitions.list_partitions(engine), indent=2))
+    else:
+        if args.month is None:
+            print("detach needs a month (YYYY-MM)", file=sys.stderr)
+            return 1
+        db = SessionLocal()
+        try:
+            record = partitions.detach_partition(engine, db, args.month)
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
+            return 1
+        finally:
+            db.close()
+        print(f"Detached {record.name}; its events remain in the archive", file=sys.stderr)
+    return 0
+
+
+def cmd_sequence_backfill(args: argparse.Namespace) -> int:
+    """Number events written before sequence numbers existed, then index them."""
+    def report_progress(agent_id: str, rows: int) -> None:
+        print(f"  {agent_id}: {rows} events numbered", file=sys.stderr)
+
+    rows = sequences.backfill(engine, progress=report_progress)
+    print(f"Backfilled {rows} rows; building the (agent_id, sequence) index", file=sys.stderr)
+    sequences.build_index(engine)
+    return 0
+
+
+def cmd_keys(args: argparse.Namespace) -> int:
+    """Print an API_KEYS_FILE entry for a new key, or for a key read from stdin."""
+    if args.action == "generate":
+        api_key, entry = generate_key(args.name, args.agent_prefix)
+        print(f"API key (shown once, store it now): {api_key}", file=sys.stderr)
+    else:
+        api_key = sys.stdin.readline().strip()
+        if not api_key:
+            print("Pass the key on stdin", file=sys.stderr)
+            return 1
+        entry = {"name": args.name, "sha256": hash_key(api_key).hex()}
+        if args.agent_prefix:
+            entry["agent_prefixes"] = args.agent_prefix
+    print(json.dumps(entry))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="AI Action Ledger tools")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    verify = subcommands.add_parser("verify", help="Verify one agent's hash chain")
+    verify.add_argument("agent_id")
+    verify.add_argument("--full", action="store_true", help="Rehash the whole chain, ignoring checkpoints")
+    verify.add_argument("--start-time", type=_parse_time, help="Start of time range (ISO format)")
+    verify.add_argument("--end-time", type=_parse_time, help="End of time range (ISO format)")
+    verify.add_argument("--workers", type=int, default=settings.verify_workers,
+                        help="Processes used to rehash events (default: VERIFY_WORKERS)")
+    verify.set_defaults(handler=cmd_verify)
+
+    verify_all = subcommands.add_parser("verify-all", help="Verify every agent's hash chain")
+    verify_all.add_argument("--full", action="store_true", help="Rehash every chain, ignoring checkpoints")
+    verify_all.add_argument("--concurrency", type=int, default=settings.verify_concurrency,
+                            help="Agents verified at once (default: VERIFY_CONCURRENCY)")
+    verify_all.add_argument("--workers", type=int, default=1,
+                            help="Processes used to rehash each agent's events")
+    verify_all.set_defaults(handler=cmd_verify_all)
+
+    mmr_rebuild = subcommands.add_parser("mmr-rebuild", help="Rebuild the Merkle Mountain Range index")
+    mmr_rebuild.add_argument("agent_id", nargs="?", help="Only this agent (default: all agents)")
+    mmr_rebuild.set_defaults(handler=cmd_mmr_rebuild)
+
+    seal = subcommands.add_parser("seal", help="Seal a closed day's archive digests")
+    seal.add_argument("--date", type=date.fromisoformat, help="Day to seal, YYYY-MM-DD (default: yesterday, UTC)")
+    seal.add_argument("--agent-id", help="Only this agent (default: every agent with events that day)")
+    seal.set_defaults(handler=cmd_seal)
+
+    reconcile_parser = subcommands.add_parser("reconcile", help="Reconcile the database against the archive")
+    reconcile_parser.add_argument("--start-date", type=date.fromisoformat, required=True, help="First day, YYYY-MM-DD")
+    reconcile_parser.add_argument("--end-date", type=date.fromisoformat, required=True, help="Last day, YYYY-MM-DD")
+    reconcile_parser.add_argument("--agent-id", help="Only this agent (default: every agent)")
+    reconcile_parser.add_argument("--concurrency", type=int, default=settings.verify_concurrency,
+                                  help="Agent/days reconciled at once (default: VERIFY_CONCURRENCY)")
+    reconcile_parser.set_defaults(handler=cmd_reconcile)
+
+    archive_compact = subcommands.add_parser("archive-compact",
+                                             help="Compress and index sealed archive segments")
+    archive_compact.set_defaults(handler=cmd_archive_compact)
+
+    migrate_columns = subcommands.add_parser("migrate-columns",
+                                             help="Migrate events to UUID/BYTEA columns online (Postgres)")
+    migrate_columns.add_argument("step", choices=column_migration.STEPS + ("status",))
+    migrate_columns.add_argument("--batch-size", type=int, default=10000, help="Rows per backfill transaction")
+    migrate_columns.set_defaults(handler=cmd_migrate_columns)
+
+    partitions_parser = subcommands.add_parser("partitions", help="Manage monthly events partitions (Postgres)")
+    partitions_parser.add_argument("action", choices=("ensure", "list", "detach"))
+    partitions_parser.add_argument("month", nargs="?", type=partitions.parse_month,
+                                   help="Month to detach, YYYY-MM (must be closed and fully sealed)")
+    partitions_parser.add_argument("--months-ahead", type=int,
+                                   help="Future months to create (default: DB_PARTITION_MONTHS_AHEAD)")
+    partitions_parser.set_defaults(handler=cmd_partitions)
+
+    sequence_backfill = subcommands.add_parser("sequence-backfill",
+                                               help="Number events written before sequence numbers existed")
+    sequence_backfill.set_defaults(handler=cmd_sequence_backfill)
+
+    keys = subcommands.add_parser("keys", help="Create API_KEYS_FILE entries")
+    keys.add_argument("action", choices=("generate", "hash"),
+                      help="generate: a new random key; hash: the key read from stdin")
+    keys.add_argument("--name", required=True, help="Label for the key, e.g. the agent fleet it belongs to")
+    keys.add_argument("--agent-prefix", action="append",
+                      help="Only allow agent_ids starting with this (repeatable; default: every agent)")
+    keys.set_defaults(handler=cmd_keys)
+
+    return parser
+
+
+def main(argv: list[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
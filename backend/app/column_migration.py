@@ -0,0 +1,196 @@
+"""
+Online migration of the events table to compact column types (Postgres).
+
+Converts event_id to UUID and the four hash columns to BYTEA without
+holding a long exclusive lock. Run the steps in order:
+
+    prepare   add nullable shadow columns and a trigger that fills them
+              on every insert/update (metadata-only changes)
+    backfill  fill the shadow columns for existing rows in small batches
+    index     build the unique indexes CONCURRENTLY and validate NOT NULL
+              checks, so the swap doesn't have to scan the table
+    swap      one short transaction: move the primary key and unique
+              constraint onto the new indexes, drop the old columns and
+              rename the shadow columns into place
+
+Restart the service with DB_COMPACT_COLUMNS=true right after the swap;
+the swap also adds length checks so a writer still sending hex strings
+is rejected instead of storing them as raw text.
+
+A partitioned events table (DB_PARTITIONING) can't be migrated this way:
+Postgres builds no partitioned index CONCURRENTLY, a partitioned table's
+unique constraints must include timestamp, and its constraints are named
+differently. Create it with DB_COMPACT_COLUMNS=true from the start.
+"""
+from typing import Callable, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.partitions import is_partitioned
+
+# (column, shadow column, conversion from the text value, NOT NULL)
+COLUMNS = (
+    ("event_id", "event_id_c", "{}::uuid", True),
+    ("input_hash", "input_hash_c", "decode({}, 'hex')", True),
+    ("output_hash", "output_hash_c", "decode({}, 'hex')", True),
+    ("previous_event_hash", "previous_event_hash_c", "decode({}, 'hex')", False),
+    ("event_hash", "event_hash_c", "decode({}, 'hex')", True),
+)
+STEPS = ("prepare", "backfill", "index", "swap")
+
+
+def _check_postgres(engine: Engine) -> None:
+    if engine.dialect.name != "postgresql":
+        raise RuntimeError("The compact column migration only supports PostgreSQL")
+
+
+def _check_migratable(engine: Engine) -> None:
+    _check_postgres(engine)
+    if is_partitioned(engine):
+        raise RuntimeError(
+            "The compact column migration doesn't support a partitioned events table "
+            "(DB_PARTITIONING); create it with DB_COMPACT_COLUMNS=true instead"
+        )
+
+
+def prepare(engine: Engine) -> None:
+    """Add shadow columns and the trigger that keeps them in sync."""
+    _check_migratable(engine)
+    assignments = "\n".join(
+        f"    NEW.{shadow} := {convert.format('NEW.' + column)};"
+        for column, shadow, convert, _ in COLUMNS
+    )
+    with engine.begin() as conn:
+        for column, shadow, _, _ in COLUMNS:
+            shadow_type = "uuid" if column == "event_id" else "bytea"
+            conn.execute(text(f"ALTER TABLE events ADD COLUMN IF NOT EXISTS {shadow} {shadow_type}"))
+        conn.execute(text(f"""
+CREATE OR REPLACE FUNCTION events_compact_sync() RETURNS trigger AS $$
+BEGIN
+{assignments}
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""))
+        conn.execute(text("DROP TRIGGER IF EXISTS events_compact_sync ON events"))
+        conn.execute(text(
+            "CREATE TRIGGER events_compact_sync BEFORE INSERT OR UPDATE ON events "
+            "FOR EACH ROW EXECUTE FUNCTION events_compact_sync()"
+        ))
+
+
+def backfill(engine: Engine, batch_size: int = 10000, progress: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Fill the shadow columns of existing rows, one committed batch at a time.
+
+    Walks the primary key in order so each batch is an index range scan;
+    safe to interrupt and re-run. Returns the number of rows updated.
+    """
+    _check_migratable(engine)
+    assignments = ", ".join(
+        f"{shadow} = {convert.format('e.' + column)}"
+        for column, shadow, convert, _ in COLUMNS
+    )
+    statement = text(f"""
+WITH batch AS (
+    SELECT event_id FROM events
+    WHERE event_id > :after AND event_id_c IS NULL
+    ORDER BY event_id
+    LIMIT :batch_size
+)
+UPDATE events e SET {assignments}
+FROM batch WHERE e.event_id = batch.event_id
+RETURNING e.event_id
+""")
+    after = ""
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            updated = [row[0] for row in conn.execute(statement, {"after": after, "batch_size": batch_size})]
+        if not updated:
+            return total
+        total += len(updated)
+        after = max(updated)
+        if progress:
+            progress(total)
+
+
+def index(engine: Engine) -> None:
+    """Build unique indexes and validated NOT NULL checks without blocking writes."""
+    _check_migratable(engine)
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS events_event_id_c_key ON events (event_id_c)"))
+        conn.execute(text("CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS events_event_hash_c_key ON events (event_hash_c)"))
+        for _, shadow, _, not_null in COLUMNS:
+            if not not_null:
+                continue
+            exists = conn.execute(
+                text("SELECT 1 FROM pg_constraint WHERE conname = :name"),
+                {"name": f"{shadow}_not_null"}
+            ).first()
+            if not exists:
+                conn.execute(text(
+                    f"ALTER TABLE events ADD CONSTRAINT {shadow}_not_null CHECK ({shadow} IS NOT NULL) NOT VALID"
+                ))
+            # Only takes a SHARE UPDATE EXCLUSIVE lock; writes continue
+            conn.execute(text(f"ALTER TABLE events VALIDATE CONSTRAINT {shadow}_not_null"))
+
+
+def swap(engine: Engine) -> None:
+    """Switch the table over to the shadow columns in one short transaction."""
+    _check_migratable(engine)
+    with engine.begin() as conn:
+        conn.execute(text("SET LOCAL lock_timeout = '5s'"))
+        conn.execute(text("LOCK TABLE events IN ACCESS EXCLUSIVE MODE"))
+        conn.execute(text("DROP TRIGGER IF EXISTS events_compact_sync ON events"))
+        conn.execute(text("ALTER TABLE events DROP CONSTRAINT IF EXISTS events_pkey"))
+        conn.execute(text("ALTER TABLE events DROP CONSTRAINT IF EXISTS events_event_hash_key"))
+
+        for column, shadow, _, not_null in COLUMNS:
+            conn.execute(text(f"ALTER TABLE events DROP COLUMN {column}"))
+            conn.execute(text(f"ALTER TABLE events RENAME COLUMN {shadow} TO {column}"))
+            if not_null:
+                # Instant: the validated check constraint proves there are no NULLs
+                conn.execute(text(f"ALTER TABLE events ALTER COLUMN {column} SET NOT NULL"))
+                conn.execute(text(f"ALTER TABLE events DROP CONSTRAINT {shadow}_not_null"))
+            if column != "event_id":
+                # NOT VALID: enforced for new rows only, no table scan
+                conn.execute(text(
+                    f"ALTER TABLE events ADD CONSTRAINT {column}_length "
+                    f"CHECK (octet_length({column}) = 32) NOT VALID"
+                ))
+
+        conn.execute(text("ALTER TABLE events ADD CONSTRAINT events_pkey PRIMARY KEY USING INDEX events_event_id_c_key"))
+        conn.execute(text("ALTER TABLE events ADD CONSTRAINT events_event_hash_key UNIQUE USING INDEX events_event_hash_c_key"))
+        conn.execute(text("DROP FUNCTION IF EXISTS events_compact_sync()"))
+
+
+def status(engine: Engine) -> dict:
+    """Report how far the migration has got."""
+    _check_postgres(engine)
+    with engine.connect() as conn:
+        columns = {
+            row.column_name: row.data_type
+            for row in conn.execute(text(
+                "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = 'events'"
+            ))
+        }
+        trigger = conn.execute(text(
+            "SELECT 1 FROM pg_trigger WHERE tgname = 'events_compact_sync'"
+        )).first() is not None
+        indexes = {
+            row.indexname
+            for row in conn.execute(text("SELECT indexname FROM pg_indexes WHERE tablename = 'events'"))
+        }
+        remaining = None
+        if "event_id_c" in columns:
+            remaining = conn.execute(text("SELECT count(*) FROM events WHERE event_id_c IS NULL")).scalar()
+
+    return {
+        "compact": columns.get("event_id") == "uuid",
+        "shadow_columns": "event_id_c" in columns,
+        "trigger": trigger,
+        "rows_to_backfill": remaining,
+        "indexes_built": {"events_event_id_c_key", "events_event_hash_c_key"} <= indexes,
+    }
@@ -1,11 +1,47 @@
 import os
+from functools import lru_cache
 
 
 class Settings:
     database_url: str = os.environ.get("DATABASE_URL", "postgresql://ledger:ledger_secret@db:5432/ledger")
+    db_pool_size: int = int(os.environ.get("DB_POOL_SIZE", "10"))
+    db_max_overflow: int = int(os.environ.get("DB_MAX_OVERFLOW", "20"))
+    db_pool_timeout_s: float = float(os.environ.get("DB_POOL_TIMEOUT_S", "30"))
+    db_pool_recycle_s: int = int(os.environ.get("DB_POOL_RECYCLE_S", "1800"))
+    db_compact_columns: bool = os.environ.get("DB_COMPACT_COLUMNS", "false").lower() == "true"
+    db_partitioning: bool = os.environ.get("DB_PARTITIONING", "false").lower() == "true"
+    db_partition_months_ahead: int = int(os.environ.get("DB_PARTITION_MONTHS_AHEAD", "3"))
     api_key: str = os.environ.get("API_KEY", "dev-api-key-change-me")
+    api_keys_file: str = os.environ.get("API_KEYS_FILE", "")
+    api_keys_reload_s: float = float(os.environ.get("API_KEYS_RELOAD_S", "5"))
     archive_path: str = os.environ.get("ARCHIVE_PATH", "/archive")
+    archive_format: str = os.environ.get("ARCHIVE_FORMAT", "jsonl")
+    archive_fsync_policy: str = os.environ.get("ARCHIVE_FSYNC_POLICY", "interval")
+    archive_fsync_every: int = int(os.environ.get("ARCHIVE_FSYNC_EVERY", "100"))
+    archive_fsync_interval_ms: float = float(os.environ.get("ARCHIVE_FSYNC_INTERVAL_MS", "1000"))
+    archive_segment_max_bytes: int = int(os.environ.get("ARCHIVE_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+    archive_segment_max_age_s: float = float(os.environ.get("ARCHIVE_SEGMENT_MAX_AGE_S", "3600"))
+    archive_max_open_files: int = int(os.environ.get("ARCHIVE_MAX_OPEN_FILES", "256"))
+    chain_head_cache_size: int = int(os.environ.get("CHAIN_HEAD_CACHE_SIZE", "10000"))
+    mmr_index: bool = os.environ.get("MMR_INDEX", "true").lower() == "true"
+    max_batch_size: int = int(os.environ.get("MAX_BATCH_SIZE", "5000"))
+    ingest_group_commit: bool = os.environ.get("INGEST_GROUP_COMMIT", "true").lower() == "true"
+    ingest_batch_window_ms: float = float(os.environ.get("INGEST_BATCH_WINDOW_MS", "2"))
+    ingest_max_batch: int = int(os.environ.get("INGEST_MAX_BATCH", "500"))
+    ingest_wal: bool = os.environ.get("INGEST_WAL", "false").lower() == "true"
+    wal_path: str = os.environ.get("WAL_PATH", "/wal")
+    wal_fsync: bool = os.environ.get("WAL_FSYNC", "true").lower() == "true"
+    wal_segment_max_bytes: int = int(os.environ.get("WAL_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+    wal_apply_batch: int = int(os.environ.get("WAL_APPLY_BATCH", "5000"))
+    wal_max_unapplied: int = int(os.environ.get("WAL_MAX_UNAPPLIED", "1000000"))
+    stream_notify: bool = os.environ.get("STREAM_NOTIFY", "false").lower() == "true"
+    stream_buffer_size: int = int(os.environ.get("STREAM_BUFFER_SIZE", "1000"))
+    verify_batch_size: int = int(os.environ.get("VERIFY_BATCH_SIZE", "5000"))
+    verify_workers: int = int(os.environ.get("VERIFY_WORKERS", "1"))
+    verify_concurrency: int = int(os.environ.get("VERIFY_CONCURRENCY", "4"))
 
 
+@lru_cache
 def get_settings() -> Settings:
+    # Values are read from the environment at import; one instance is enough
     return Settings()
\ No newline at end of file
@@ -1,15 +1,20 @@
+import logging
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import get_settings
 
+logger = logging.getLogger(__name__)
+
 settings = get_settings()
 
 # Create database engine
 engine = create_engine(
     settings.database_url,
     pool_pre_ping=True,  # Verify connections before using
-    pool_size=10,
-    max_overflow=20
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout_s,
+    pool_recycle=settings.db_pool_recycle_s
 )
 
 # Create session factory
@@ -20,7 +25,14 @@ Base = declarative_base()
 
 
 def get_db():
-    """Dependency that provides a database session."""
+    """
+    Dependency that provides a database session.
+    
+    Sessions are synchronous, so route handlers that use one are plain
+    `def` functions: FastAPI runs them in its worker thread pool and the
+    event loop keeps serving other requests while they wait on the
+    database. See db_thread_limit.
+    """
     db = SessionLocal()
     try:
         yield db
@@ -28,7 +40,28 @@ def get_db():
         db.close()
 
 
+def db_thread_limit() -> int:
+    """
+    Worker threads for sync route handlers: one per pooled connection.
+    
+    More threads than connections would only queue for the pool (and
+    time out after DB_POOL_TIMEOUT_S); fewer would leave connections idle.
+    """
+    return settings.db_pool_size + settings.db_max_overflow
+
+
 def init_db():
     """Initialize database tables."""
-    from app.db_models import Event  # Import to register models
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    from app import db_models  # Import to register models
+    Base.metadata.create_all(bind=engine)
+    
+    from app.sequences import add_column
+    add_column(engine)  # events tables created before sequence numbers
+    
+    if settings.db_partitioning and engine.dialect.name == "postgresql":
+        from app.partitions import is_partitioned, ensure_partitions
+        if not is_partitioned(engine):
+            # create_all doesn't convert an existing table
+            logger.warning("DB_PARTITIONING is set but the existing events table is not partitioned")
+            return
+        ensure_partitions(engine, settings.db_partition_months_ahead)
@@ -1,40 +1,74 @@
-from sqlalchemy import Column, String, DateTime, Index
+from sqlalchemy import Column, String, DateTime, Index, BigInteger, Boolean, Integer, Text, UniqueConstraint
 from sqlalchemy.sql import func
+from app.config import get_settings
 from app.database import Base
+from app.db_types import id_type, hash_type
 import uuid
 
 
+def _partition_args() -> tuple:
+    """
+    Extra events table arguments for DB_PARTITIONING.
+    
+    Postgres requires the partition key in every unique constraint, so
+    timestamp joins the primary key and event_hash is unique per
+    timestamp rather than globally (a SHA-256 collision is not a
+    practical concern).
+    """
+    if not get_settings().db_partitioning:
+        return ()
+    return (
+        UniqueConstraint('event_hash', 'timestamp', name='uq_events_event_hash_timestamp'),
+        {'postgresql_partition_by': 'RANGE (timestamp)'},
+    )
+
+
 class Event(Base):
     """SQLAlchemy model for events table."""
     
     __tablename__ = "events"
     
-    # Primary key - UUID as string for compatibility
-    event_id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    # Primary key - UUID as string for compatibility (native UUID with DB_COMPACT_COLUMNS)
+    event_id = Column(id_type(), primary_key=True, default=lambda: str(uuid.uuid4()))
     
     # Core fields
     agent_id = Column(String(255), nullable=False, index=True)
     action_type = Column(String(100), nullable=False, index=True)
     tool_name = Column(String(255), nullable=True)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    timestamp = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+        index=True,
+        primary_key=get_settings().db_partitioning  # partition key must be in the primary key
+    )
     
     # Context fields
     environment = Column(String(100), nullable=True)
     model_version = Column(String(100), nullable=True)
     prompt_version = Column(String(100), nullable=True)
     
-    # Hash fields (privacy-safe - no raw content)
-    input_hash = Column(String(64), nullable=False)
-    output_hash = Column(String(64), nullable=False)
+    # Hash fields (privacy-safe - no raw content); 32 raw bytes with DB_COMPACT_COLUMNS
+    input_hash = Column(hash_type(), nullable=False)
+    output_hash = Column(hash_type(), nullable=False)
     
     # Chain fields
-    previous_event_hash = Column(String(64), nullable=True)  # NULL for first event in chain
-    event_hash = Column(String(64), nullable=False, unique=True)
+    previous_event_hash = Column(hash_type(), nullable=True)  # NULL for first event in chain
+    event_hash = Column(hash_type(), nullable=False, unique=not get_settings().db_partitioning)
+    
+    # Position in the agent's chain, assigned by the server from 1 (not
+    # hashed). NULL only for rows written before the column existed,
+    # until `python -m app.cli sequence-backfill` has run.
+    sequence = Column(BigInteger, nullable=True)
     
     # Composite indexes for common queries
     __table_args__ = (
         Index('idx_agent_timestamp', 'agent_id', 'timestamp'),
         Index('idx_agent_action', 'agent_id', 'action_type'),
+        # Unique per agent; a partitioned table can't have a unique index
+        # without the partition key, there the chain head lock keeps it unique
+        Index('idx_agent_sequence', 'agent_id', 'sequence', unique=not get_settings().db_partitioning),
+        *_partition_args(),
     )
     
     def to_dict(self) -> dict:
@@ -52,4 +86,197 @@ class Event(Base):
             "output_hash": self.output_hash,
             "previous_event_hash": self.previous_event_hash,
             "event_hash": self.event_hash
-        }
\ No newline at end of file
+        }
+
+
+class ChainHead(Base):
+    """
+    SQLAlchemy model for the per-agent chain head.
+    
+    Holds the tip of each agent's hash chain so ingest never has to scan
+    the events table to find the previous hash. Rows are locked with
+    SELECT ... FOR UPDATE while an event is appended, which serializes
+    concurrent writers for the same agent_id.
+    """
+    
+    __tablename__ = "chain_heads"
+    
+    agent_id = Column(String(255), primary_key=True)
+    
+    # Hash of the most recent event (NULL until the first event is written)
+    event_hash = Column(String(64), nullable=True)
+    
+    # Number of events in the chain
+    sequence = Column(BigInteger, nullable=False, default=0)
+    
+    # Timestamp of the most recent event, used to keep timestamps monotonic
+    last_timestamp = Column(DateTime(timezone=True), nullable=True)
+
+
+class MerkleNode(Base):
+    """
+    SQLAlchemy model for one node of an agent's Merkle Mountain Range.
+    
+    Leaves hash an event's event_hash (and record its event_id); inner
+    nodes hash their two children. See app/mmr.py for the layout.
+    """
+    
+    __tablename__ = "mmr_nodes"
+    
+    agent_id = Column(String(255), primary_key=True)
+    position = Column(BigInteger, primary_key=True)
+    hash = Column(String(64), nullable=False)
+    
+    # Set on leaves only
+    event_id = Column(String(36), nullable=True, index=True)
+
+
+class ChainCheckpoint(Base):
+    """
+    SQLAlchemy model for the last verified point of each agent's chain.
+    
+    Incremental verification starts from here and only rehashes events
+    appended after event_hash.
+    """
+    
+    __tablename__ = "chain_checkpoints"
+    
+    agent_id = Column(String(255), primary_key=True)
+    
+    # Hash of the last event covered by a successful verification
+    event_hash = Column(String(64), nullable=False)
+    
+    # Number of events in the chain up to and including that event
+    sequence = Column(BigInteger, nullable=False)
+    
+    verified_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class DailySeal(Base):
+    """
+    SQLAlchemy model for the sealed digest of one agent's events on one day.
+    
+    Written once the day has closed; the same digest is stored in a
+    sidecar next to the archive file so routine archive verification can
+    compare digests instead of rows.
+    """
+    
+    __tablename__ = "daily_seals"
+    
+    agent_id = Column(String(255), primary_key=True)
+    day = Column(String(10), primary_key=True)  # YYYY-MM-DD (UTC)
+    
+    event_count = Column(BigInteger, nullable=False)
+    root = Column(String(64), nullable=False)
+    sealed_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class VerificationJob(Base):
+    """SQLAlchemy model for a fleet-wide verification run."""
+    
+    __tablename__ = "verification_jobs"
+    
+    job_id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    status = Column(String(20), nullable=False, default="pending")  # pending, running, completed, failed
+    full = Column(Boolean, nullable=False, default=False)
+    
+    total_agents = Column(Integer, nullable=False, default=0)
+    completed_agents = Column(Integer, nullable=False, default=0)
+    invalid_agents = Column(Integer, nullable=False, default=0)
+    events_checked = Column(BigInteger, nullable=False, default=0)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    error_message = Column(Text, nullable=True)
+
+
+class VerificationResult(Base):
+    """SQLAlchemy model for one agent's outcome within a verification job."""
+    
+    __tablename__ = "verification_results"
+    
+    job_id = Column(String(36), primary_key=True)
+    agent_id = Column(String(255), primary_key=True)
+    
+    is_valid = Column(Boolean, nullable=False, index=True)
+    events_checked = Column(BigInteger, nullable=False)
+    first_invalid_event_id = Column(String(36), nullable=True)
+    error_message = Column(Text, nullable=True)
+    verified_at = Column(DateTime(timezone=True), nullable=False)
+
+class ReconciliationJob(Base):
+    """SQLAlchemy model for a DB-vs-archive reconciliation run over a date range."""
+    
+    __tablename__ = "reconciliation_jobs"
+    
+    job_id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    status = Column(String(20), nullable=False, default="pending")  # pending, running, completed, failed
+    start_date = Column(String(10), nullable=False)  # YYYY-MM-DD (UTC), inclusive
+    end_date = Column(String(10), nullable=False)
+    agent_id = Column(String(255), nullable=True)  # None = every agent
+    
+    total_days = Column(Integer, nullable=False, default=0)  # agent/day pairs
+    completed_days = Column(Integer, nullable=False, default=0)
+    discrepant_days = Column(Integer, nullable=False, default=0)
+    db_events = Column(BigInteger, nullable=False, default=0)
+    archive_events = Column(BigInteger, nullable=False, default=0)
+    missing_in_archive = Column(BigInteger, nullable=False, default=0)
+    extra_in_archive = Column(BigInteger, nullable=False, default=0)
+    mismatched = Column(BigInteger, nullable=False, default=0)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    error_message = Column(Text, nullable=True)
+
+
+class ReconciliationDiscrepancy(Base):
+    """SQLAlchemy model for one agent/day that didn't reconcile within a job."""
+    
+    __tablename__ = "reconciliation_discrepancies"
+    
+    job_id = Column(String(36), primary_key=True)
+    agent_id = Column(String(255), primary_key=True)
+    day = Column(String(10), primary_key=True)
+    
+    db_events = Column(BigInteger, nullable=False)
+    archive_events = Column(BigInteger, nullable=False)
+    missing_in_archive = Column(BigInteger, nullable=False)
+    extra_in_archive = Column(BigInteger, nullable=False)
+    mismatched = Column(BigInteger, nullable=False)
+    first_missing_event_id = Column(String(36), nullable=True)
+    first_extra_event_id = Column(String(255), nullable=True)
+    first_mismatched_event_id = Column(String(36), nullable=True)
+    error_message = Column(Text, nullable=True)
+    reconciled_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class DetachedPartition(Base):
+    """
+    SQLAlchemy model for a monthly events partition detached for retention.
+    
+    Its events are no longer in the events table (only in the archive);
+    where each agent's chain left off is kept in retention_boundaries.
+    """
+    
+    __tablename__ = "detached_partitions"
+    
+    name = Column(String(63), primary_key=True)
+    range_start = Column(DateTime(timezone=True), nullable=False)
+    range_end = Column(DateTime(timezone=True), nullable=False, index=True)
+    detached_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class RetentionBoundary(Base):
+    """
+    SQLAlchemy model for the last event of an agent's chain that was detached.
+    
+    Chain verification accepts a chain that doesn't start at sequence 1
+    only if its first remaining event continues exactly from here.
+    """
+    
+    __tablename__ = "retention_boundaries"
+    
+    agent_id = Column(String(255), primary_key=True)
+    sequence = Column(BigInteger, nullable=False)
+    event_hash = Column(String(64), nullable=False)
+    partition_name = Column(String(63), nullable=False)
@@ -0,0 +1,65 @@
+"""
+Compact column types for the events table.
+
+With DB_COMPACT_COLUMNS=true, event IDs are stored as native UUIDs and
+hashes as 32 raw bytes (BYTEA on Postgres) instead of 36/64-character
+strings. Conversion happens at the ORM boundary, so the rest of the app
+(to_dict, API responses, canonical hashing) still sees the same
+lowercase strings.
+"""
+import uuid
+from sqlalchemy import LargeBinary, String, Uuid
+from sqlalchemy.types import TypeDecorator, TypeEngine
+
+from app.config import get_settings
+
+# Values that can never be stored, bound in place of malformed input so a
+# lookup by a bad ID or hash finds nothing instead of raising
+_NO_UUID = uuid.UUID(int=0)
+_NO_HASH = b""
+
+
+class CompactUUID(TypeDecorator):
+    """UUID string stored as a native UUID (CHAR(32) where there is none)."""
+    
+    impl = Uuid
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, uuid.UUID):
+            return value
+        try:
+            return uuid.UUID(value)
+        except ValueError:
+            return _NO_UUID
+    
+    def process_result_value(self, value, dialect):
+        return None if value is None else str(value)
+
+
+class CompactHash(TypeDecorator):
+    """Hex SHA-256 digest stored as 32 raw bytes."""
+    
+    impl = LargeBinary
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return bytes.fromhex(value)
+        except ValueError:
+            return _NO_HASH
+    
+    def process_result_value(self, value, dialect):
+        return None if value is None else bytes(value).hex()
+
+
+def id_type() -> TypeEngine:
+    """Column type for event IDs in the configured schema mode."""
+    return CompactUUID() if get_settings().db_compact_columns else String(36)
+
+
+def hash_type() -> TypeEngine:
+    """Column type for SHA-256 hex digests in the configured schema mode."""
+    return CompactHash() if get_settings().db_compact_columns else String(64)
@@ -0,0 +1,308 @@
+"""
+Live event notifications for GET /events/stream (Server-Sent Events).
+
+Committed events reach subscribers in one of two ways:
+
+- PostgreSQL with STREAM_NOTIFY: ingest runs pg_notify('ledger_events',
+  <event ids>) inside its transaction, so the notification is delivered
+  only if and when the events commit, to every worker. Each worker with
+  subscribers keeps one LISTEN connection in a background thread, loads
+  the notified events with a single query and fans them out. NOTIFY is
+  sent whether or not anyone listens, and Postgres serializes the commits
+  of transactions that notify, so it is opt-in.
+- Otherwise: ingest publishes the events in-process after commit, which
+  reaches the subscribers of the worker that wrote them (all of them
+  with a single worker).
+
+Every subscriber has a bounded buffer. A subscriber that falls behind has
+its stream ended instead of blocking anyone; the client reconnects with
+Last-Event-ID and catches up from the database, as it would after any
+other disconnect. An idle stream costs a heartbeat comment every
+HEARTBEAT_S seconds and no queries.
+"""
+import asyncio
+import logging
+import select
+import threading
+from typing import Any, AsyncIterator, Callable, Iterable, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text, tuple_
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal, engine
+from app.db_models import Event
+from app.hash_chain import _as_utc
+from app.serialization import EVENT_COLUMNS, dumps, event_dict
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "ledger_events"
+# A NOTIFY payload must stay under 8000 bytes; 150 ids is about 5.5 KB
+NOTIFY_IDS_PER_MESSAGE = 150
+HEARTBEAT_S = 15.0
+CATCH_UP_PAGE = 500
+# Listener reconnect delay after losing its connection
+LISTEN_RETRY_S = 5.0
+
+
+def _uses_notify() -> bool:
+    return engine.dialect.name == "postgresql" and get_settings().stream_notify
+
+
+def notify_events(db: Session, event_ids: list[str]) -> None:
+    """
+    Announce events to other workers' listeners when the transaction commits.
+
+    Call inside the ingest transaction, before commit. A no-op unless the
+    database is PostgreSQL and STREAM_NOTIFY is on.
+    """
+    if not _uses_notify():
+        return
+    for i in range(0, len(event_ids), NOTIFY_IDS_PER_MESSAGE):
+        db.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": CHANNEL, "payload": ",".join(event_ids[i:i + NOTIFY_IDS_PER_MESSAGE])}
+        )
+
+
+def publish_events(events: list[Any]) -> None:
+    """Hand committed events to this worker's subscribers (unless NOTIFY does it)."""
+    if _uses_notify():
+        return
+    broadcaster = _broadcaster
+    if broadcaster is not None:
+        broadcaster.publish(events)
+
+
+class Subscription:
+    """One stream's filter and bounded buffer. Lives on the event loop."""
+
+    def __init__(self, agent_id: Optional[str], action_type: Optional[str], max_buffer: int):
+        self.agent_id = agent_id
+        self.action_type = action_type
+        self.max_buffer = max_buffer
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.closed = False
+
+    def matches(self, event: Any) -> bool:
+        return (
+            (self.agent_id is None or event.agent_id == self.agent_id)
+            and (self.action_type is None or event.action_type == self.action_type)
+        )
+
+    def offer(self, events: Iterable[Any]) -> None:
+        if self.closed:
+            return
+        # Same order as the catch-up query, so a resume cursor never skips
+        # an event that was sent after it
+        if self.agent_id is not None:
+            matching = sorted((e for e in events if self.matches(e)), key=lambda e: e.sequence)
+        else:
+            matching = sorted((e for e in events if self.matches(e)), key=lambda e: (e.timestamp, e.event_id))
+        for event in matching:
+            if self.queue.qsize() >= self.max_buffer:
+                logger.info("Ending a live stream that fell %d events behind", self.max_buffer)
+                self.close()
+                return
+            self.queue.put_nowait(event)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self.queue.put_nowait(None)
+
+
+class EventBroadcaster:
+    """Fans committed events out to this worker's subscriptions."""
+
+    def __init__(self, max_buffer: int):
+        self.max_buffer = max_buffer
+        self._subscriptions: set[Subscription] = set()
+        self._lock = threading.Lock()
+        self._listener: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def subscribe(self, agent_id: Optional[str], action_type: Optional[str]) -> Subscription:
+        """Register a subscription; call from the event loop."""
+        subscription = Subscription(agent_id, action_type, self.max_buffer)
+        with self._lock:
+            self._subscriptions.add(subscription)
+            if _uses_notify() and (self._listener is None or not self._listener.is_alive()):
+                self._listener = threading.Thread(target=self._listen, name="event-stream-listener", daemon=True)
+                self._listener.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, events: list[Any]) -> None:
+        """Deliver events to every subscription; safe to call from any thread."""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, events)
+            except RuntimeError:
+                # Its event loop is closed; nobody is reading this stream
+                self.unsubscribe(subscription)
+
+    def close(self) -> None:
+        """End every stream (shutdown) and stop the listener."""
+        self._stop.set()
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+            self._subscriptions.clear()
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(subscription.close)
+        if self._listener is not None:
+            self._listener.join(timeout=5)
+
+    def _listen(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._listen_once()
+            except Exception:
+                logger.exception("Event stream listener lost its connection; reconnecting")
+                self._stop.wait(LISTEN_RETRY_S)
+
+    def _listen_once(self) -> None:
+        connection = engine.raw_connection()
+        # A LISTENing autocommit connection must not go back to the pool
+        connection.detach()
+        try:
+            dbapi_connection = connection.driver_connection
+            dbapi_connection.autocommit = True
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            while not self._stop.is_set():
+                # Wake up now and then to notice shutdown
+                if not select.select([dbapi_connection], [], [], 1.0)[0]:
+                    continue
+                dbapi_connection.poll()
+                event_ids = []
+                while dbapi_connection.notifies:
+                    event_ids.extend(dbapi_connection.notifies.pop(0).payload.split(","))
+                with self._lock:
+                    idle = not self._subscriptions
+                if event_ids and not idle:
+                    self.publish(_load_events(event_ids))
+        finally:
+            connection.close()
+
+
+def _load_events(event_ids: list[str]) -> list[Any]:
+    db = SessionLocal()
+    try:
+        return (
+            db.query(*EVENT_COLUMNS)
+            .filter(Event.event_id.in_(event_ids))
+            .order_by(Event.timestamp, Event.event_id)
+            .all()
+        )
+    finally:
+        db.close()
+
+
+def _catch_up(
+    agent_id: Optional[str],
+    action_type: Optional[str],
+    after: tuple,
+    limit: int
+) -> list[Any]:
+    """Events after a cursor position, in stream order."""
+    cursor_timestamp, cursor_event_id, cursor_sequence = after
+    db = SessionLocal()
+    try:
+        query = db.query(*EVENT_COLUMNS)
+        if action_type:
+            query = query.filter(Event.action_type == action_type)
+        if agent_id and cursor_sequence is not None:
+            query = query.filter(Event.agent_id == agent_id, Event.sequence > cursor_sequence)
+            query = query.order_by(Event.sequence)
+        else:
+            if agent_id:
+                query = query.filter(Event.agent_id == agent_id)
+            query = query.filter(
+                Event.timestamp >= cursor_timestamp,  # lets the planner skip older partitions
+                tuple_(Event.timestamp, Event.event_id) > (cursor_timestamp, cursor_event_id)
+            ).order_by(Event.timestamp, Event.event_id)
+        return query.limit(limit).all()
+    finally:
+        db.close()
+
+
+def _is_after(event: Any, last: Any, by_sequence: bool) -> bool:
+    """Whether event comes after last in stream order."""
+    if by_sequence and event.sequence is not None and last.sequence is not None:
+        return event.sequence > last.sequence
+    return (_as_utc(event.timestamp), event.event_id) > (_as_utc(last.timestamp), last.event_id)
+
+
+def _format(event: Any, cursor: str) -> str:
+    return f"id: {cursor}\ndata: {dumps(event_dict(event)).decode('utf-8')}\n\n"
+
+
+async def stream(
+    subscription: Subscription,
+    after: Optional[tuple],
+    encode_cursor: Callable[[Any], str]
+) -> AsyncIterator[str]:
+    """
+    SSE body: events after `after` from the database, then live events.
+
+    The subscription is registered before catching up, so nothing that
+    commits meanwhile is missed; live events at or before the last one the
+    catch-up sent are skipped.
+    """
+    try:
+        last = None
+        while after is not None:
+            rows = await run_in_threadpool(
+                _catch_up, subscription.agent_id, subscription.action_type, after, CATCH_UP_PAGE
+            )
+            for row in rows:
+                yield _format(row, encode_cursor(row))
+            if rows:
+                last = rows[-1]
+            if len(rows) < CATCH_UP_PAGE:
+                break
+            after = (last.timestamp, last.event_id, last.sequence)
+        yield ": live\n\n"
+
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), HEARTBEAT_S)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event is None:
+                return
+            if last is not None and not _is_after(event, last, subscription.agent_id is not None):
+                continue
+            yield _format(event, encode_cursor(event))
+    finally:
+        get_broadcaster().unsubscribe(subscription)
+
+
+_broadcaster: Optional[EventBroadcaster] = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster() -> EventBroadcaster:
+    global _broadcaster
+    with _broadcaster_lock:
+        if _broadcaster is None:
+            _broadcaster = EventBroadcaster(get_settings().stream_buffer_size)
+        return _broadcaster
+
+
+def close_broadcaster() -> None:
+    """End all live streams (called on shutdown)."""
+    global _broadcaster
+    with _broadcaster_lock:
+        if _broadcaster is not None:
+            _broadcaster.close()
+            _broadcaster = None
@@ -0,0 +1,118 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Optional
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.db_models import Event, VerificationJob, VerificationResult
+from app.hash_chain import verify_chain
+
+
+def list_agent_ids(db: Session) -> list[str]:
+    """List every agent that has at least one event."""
+    return [row.agent_id for row in db.query(Event.agent_id).distinct().order_by(Event.agent_id)]
+
+
+def create_job(db: Session, full: bool = False) -> VerificationJob:
+    """Create a pending fleet verification job."""
+    job = VerificationJob(status="pending", full=full)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _verify_agent(job_id: str, agent_id: str, full: bool, workers: int) -> bool:
+    """Verify one agent in its own session and record the result."""
+    db = SessionLocal()
+    try:
+        is_valid, events_checked, first_invalid_event_id, error_message, _ = verify_chain(
+            db=db,
+            agent_id=agent_id,
+            full=full,
+            workers=workers
+        )
+        db.add(VerificationResult(
+            job_id=job_id,
+            agent_id=agent_id,
+            is_valid=is_valid,
+            events_checked=events_checked,
+            first_invalid_event_id=first_invalid_event_id,
+            error_message=error_message,
+            verified_at=datetime.now(timezone.utc)
+        ))
+        # Counters are updated in SQL so concurrent workers don't overwrite each other
+        db.execute(
+            update(VerificationJob)
+            .where(VerificationJob.job_id == job_id)
+            .values(
+                completed_agents=VerificationJob.completed_agents + 1,
+                invalid_agents=VerificationJob.invalid_agents + (0 if is_valid else 1),
+                events_checked=VerificationJob.events_checked + events_checked
+            )
+        )
+        db.commit()
+        return is_valid
+    finally:
+        db.close()
+
+
+def run_job(
+    job_id: str,
+    concurrency: Optional[int] = None,
+    workers: int = 1,
+    progress: Optional[Callable[[str, bool], None]] = None
+) -> None:
+    """
+    Verify every agent's chain for a job, at most `concurrency` at a time.
+
+    Each agent gets its own session; results are persisted as they
+    finish so progress can be polled while the job runs. `workers` is
+    passed through to verify_chain for per-agent parallel rehashing.
+    """
+    concurrency = concurrency or get_settings().verify_concurrency
+
+    db = SessionLocal()
+    try:
+        job = db.query(VerificationJob).filter(VerificationJob.job_id == job_id).one()
+        full = job.full
+        agent_ids = list_agent_ids(db)
+        job.total_agents = len(agent_ids)
+        job.status = "running"
+        db.commit()
+
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = {
+                    executor.submit(_verify_agent, job_id, agent_id, full, workers): agent_id
+                    for agent_id in agent_ids
+                }
+                for future, agent_id in futures.items():
+                    is_valid = future.result()
+                    if progress:
+                        progress(agent_id, is_valid)
+            job.status = "completed"
+        except Exception as e:
+            db.rollback()
+            job.status = "failed"
+            job.error_message = str(e)
+
+        job.finished_at = datetime.now(timezone.utc)
+        db.commit()
+    finally:
+        db.close()
+
+
+def start_job(job_id: str, concurrency: Optional[int] = None) -> threading.Thread:
+    """Run a job on a background thread and return immediately."""
+    thread = threading.Thread(
+        target=run_job,
+        args=(job_id, concurrency),
+        name=f"verify-job-{job_id[:8]}",
+        daemon=True
+    )
+    thread.start()
+    return thread
@@ -1,10 +1,17 @@
 import hashlib
+import itertools
 import json
-from datetime import datetime, timezone
-from typing import Optional
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, Iterator, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from app.db_models import Event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import desc, func
+from app.config import get_settings
+from app.db_models import Event, ChainHead, ChainCheckpoint, RetentionBoundary
 
 
 def normalize_timestamp(ts: datetime) -> str:
@@ -63,6 +70,80 @@ def canonicalize_event(
     return json.dumps(canonical, sort_keys=True, separators=(',', ':'))
 
 
+# The C string escaper json.dumps itself uses (ensure_ascii=True)
+_encode_string = json.encoder.encode_basestring_ascii
+
+
+def _canonical_timestamp(ts: datetime) -> str:
+    """normalize_timestamp without the strftime round trip."""
+    if type(ts) is not datetime:
+        return normalize_timestamp(ts)  # subclasses may override isoformat
+    suffix = ""
+    if ts.tzinfo is not timezone.utc:
+        offset = ts.utcoffset()
+        if offset is None:
+            suffix = "+00:00"  # naive timestamps are hashed as UTC
+        elif offset:
+            ts = ts.astimezone(timezone.utc)
+    if ts.year < 1000:
+        return normalize_timestamp(ts)  # strftime doesn't zero-pad these years
+    if ts.microsecond:
+        # Plain isoformat() is much cheaper than passing timespec
+        return ts.isoformat() + suffix
+    return ts.isoformat(timespec="microseconds") + suffix
+
+
+def canonicalize_event_fast(
+    event_id: str,
+    agent_id: str,
+    action_type: str,
+    tool_name: Optional[str],
+    timestamp: datetime,
+    environment: Optional[str],
+    model_version: Optional[str],
+    prompt_version: Optional[str],
+    input_hash: str,
+    output_hash: str,
+    previous_event_hash: Optional[str]
+) -> str:
+    """
+    Same output as canonicalize_event, without building a dict.
+    
+    Writes the fields straight into the key layout json.dumps produces
+    with sort_keys=True. Values that aren't strings or None go through
+    canonicalize_event, which stays the reference; see
+    benchmarks/canonical_encoder.py for the differential check.
+    """
+    try:
+        return (
+            f'{{"action_type":{_encode_string(action_type)}'
+            f',"agent_id":{_encode_string(agent_id)}'
+            f',"environment":{"null" if environment is None else _encode_string(environment)}'
+            f',"event_id":{_encode_string(event_id)}'
+            f',"input_hash":{_encode_string(input_hash)}'
+            f',"model_version":{"null" if model_version is None else _encode_string(model_version)}'
+            f',"output_hash":{_encode_string(output_hash)}'
+            f',"previous_event_hash":{"null" if previous_event_hash is None else _encode_string(previous_event_hash)}'
+            f',"prompt_version":{"null" if prompt_version is None else _encode_string(prompt_version)}'
+            f',"timestamp":"{_canonical_timestamp(timestamp)}"'
+            f',"tool_name":{"null" if tool_name is None else _encode_string(tool_name)}}}'
+        )
+    except TypeError:
+        return canonicalize_event(
+            event_id=event_id,
+            agent_id=agent_id,
+            action_type=action_type,
+            tool_name=tool_name,
+            timestamp=timestamp,
+            environment=environment,
+            model_version=model_version,
+            prompt_version=prompt_version,
+            input_hash=input_hash,
+            output_hash=output_hash,
+            previous_event_hash=previous_event_hash
+        )
+
+
 def compute_event_hash(
     event_id: str,
     agent_id: str,
@@ -81,7 +162,7 @@ def compute_event_hash(
     
     The hash includes the previous_event_hash to create the chain.
     """
-    canonical = canonicalize_event(
+    canonical = canonicalize_event_fast(
         event_id=event_id,
         agent_id=agent_id,
         action_type=action_type,
@@ -98,26 +179,206 @@ def compute_event_hash(
     return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
 
 
-def get_previous_event_hash(db: Session, agent_id: str) -> Optional[str]:
+@dataclass(frozen=True)
+class ChainHeadState:
+    """Snapshot of an agent's chain head as of the last commit."""
+    event_hash: Optional[str]
+    sequence: int
+    last_timestamp: Optional[datetime]
+
+
+class ChainHeadCache:
     """
-    Get the hash of the most recent event for a given agent.
+    Thread-safe LRU cache of committed chain heads, keyed by agent_id.
     
-    Returns None if this is the first event for the agent.
+    Sits in front of the chain_heads table for read paths. It is only
+    updated after a successful commit, so it never holds uncommitted
+    state. With several workers an entry may lag behind writes made by
+    another process; the ingest path always re-reads the locked row.
     """
-    previous_event = (
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict[str, ChainHeadState] = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, agent_id: str) -> Optional[ChainHeadState]:
+        with self._lock:
+            state = self._entries.get(agent_id)
+            if state is not None:
+                self._entries.move_to_end(agent_id)
+            return state
+    
+    def put(self, agent_id: str, state: ChainHeadState) -> None:
+        with self._lock:
+            current = self._entries.get(agent_id)
+            # Never move a head backwards if commits finish out of order
+            if current is not None and current.sequence > state.sequence:
+                return
+            self._entries[agent_id] = state
+            self._entries.move_to_end(agent_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def discard(self, agent_id: str) -> None:
+        with self._lock:
+            self._entries.pop(agent_id, None)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+chain_head_cache = ChainHeadCache(get_settings().chain_head_cache_size)
+
+
+def _as_utc(ts: datetime) -> datetime:
+    """Treat naive datetimes (e.g. from SQLite) as UTC."""
+    if ts.tzinfo is None:
+        return ts.replace(tzinfo=timezone.utc)
+    return ts
+
+
+def _count_events(db: Session, agent_id: str) -> int:
+    """Count an agent's events (only for rows written before sequences existed)."""
+    return db.query(func.count(Event.event_id)).filter(Event.agent_id == agent_id).scalar()
+
+
+def _create_chain_head(db: Session, agent_id: str) -> None:
+    """
+    Create the chain head row for an agent if it does not exist yet.
+    
+    Agents that already have events (written before chain_heads existed)
+    are bootstrapped from their latest event. This is a one-time scan per
+    agent; afterwards the head row is the source of truth.
+    """
+    if db.query(ChainHead.agent_id).filter(ChainHead.agent_id == agent_id).first():
+        return
+    
+    latest = (
         db.query(Event)
         .filter(Event.agent_id == agent_id)
         .order_by(desc(Event.timestamp), desc(Event.event_id))
         .first()
     )
+    head = ChainHead(agent_id=agent_id, event_hash=None, sequence=0, last_timestamp=None)
+    if latest is not None:
+        head.event_hash = latest.event_hash
+        head.last_timestamp = latest.timestamp
+        head.sequence = latest.sequence if latest.sequence is not None else _count_events(db, agent_id)
+    
+    # A concurrent writer may create the same row; let the unique key decide
+    try:
+        with db.begin_nested():
+            db.add(head)
+    except IntegrityError:
+        pass
+
+
+def lock_chain_head(db: Session, agent_id: str) -> ChainHead:
+    """
+    Lock and return the chain head row for an agent (SELECT ... FOR UPDATE).
     
-    return previous_event.event_hash if previous_event else None
+    The lock is held until the surrounding transaction commits or rolls
+    back, so concurrent writers to the same agent serialize here instead
+    of forking the chain.
+    """
+    query = db.query(ChainHead).filter(ChainHead.agent_id == agent_id).with_for_update()
+    
+    # Cached agents are known to have a head row, skip straight to the lock
+    head = query.first() if chain_head_cache.get(agent_id) is not None else None
+    if head is None:
+        _create_chain_head(db, agent_id)
+        head = query.first()
+    
+    return head
+
+
+def next_event_timestamp(head: ChainHead) -> datetime:
+    """
+    Generate a server timestamp for the next event in a locked chain.
+    
+    Timestamps are kept strictly increasing per agent so that ordering by
+    (timestamp, event_id) always matches chain order, even when clocks
+    differ between workers.
+    """
+    timestamp = datetime.now(timezone.utc)
+    if head.last_timestamp is not None:
+        last = _as_utc(head.last_timestamp)
+        if timestamp <= last:
+            timestamp = last + timedelta(microseconds=1)
+    return timestamp
+
+
+def advance_chain_head(head: ChainHead, event_hash: str, timestamp: datetime) -> ChainHeadState:
+    """
+    Move a locked chain head forward to a newly appended event.
+    
+    Returns the new head state so callers can cache it after commit
+    without reloading the (expired) row. Its sequence is the appended
+    event's sequence number.
+    """
+    head.event_hash = event_hash
+    head.sequence = (head.sequence or 0) + 1
+    head.last_timestamp = timestamp
+    return ChainHeadState(event_hash=event_hash, sequence=head.sequence, last_timestamp=timestamp)
+
+
+def remember_chain_head(agent_id: str, state: ChainHeadState) -> None:
+    """Record a committed chain head in the in-process cache."""
+    chain_head_cache.put(agent_id, state)
+
+
+def get_chain_head(db: Session, agent_id: str) -> ChainHeadState:
+    """
+    Get the committed chain head for an agent without locking.
+    
+    Served from the in-process cache when possible, otherwise read from
+    the chain_heads table (by primary key).
+    """
+    cached = chain_head_cache.get(agent_id)
+    if cached is not None:
+        return cached
+    
+    head = db.query(ChainHead).filter(ChainHead.agent_id == agent_id).first()
+    if head is None:
+        # No head yet: fall back to the events table (legacy agents)
+        latest = (
+            db.query(Event)
+            .filter(Event.agent_id == agent_id)
+            .order_by(desc(Event.timestamp), desc(Event.event_id))
+            .first()
+        )
+        if latest is None:
+            return ChainHeadState(event_hash=None, sequence=0, last_timestamp=None)
+        count = latest.sequence if latest.sequence is not None else _count_events(db, agent_id)
+        return ChainHeadState(event_hash=latest.event_hash, sequence=count, last_timestamp=latest.timestamp)
+    
+    state = ChainHeadState(
+        event_hash=head.event_hash,
+        sequence=head.sequence,
+        last_timestamp=head.last_timestamp
+    )
+    chain_head_cache.put(agent_id, state)
+    return state
+
+
+def get_previous_event_hash(db: Session, agent_id: str) -> Optional[str]:
+    """
+    Get the hash of the most recent event for a given agent.
+    
+    Returns None if this is the first event for the agent.
+    This is a non-locking read; use lock_chain_head when appending.
+    """
+    return get_chain_head(db, agent_id).event_hash
 
 
 def verify_event_hash(event: Event) -> bool:
     """
     Verify that an event's hash is correct.
     
+    Accepts an Event or any row with the same attributes (such as the
+    tuples produced by stream_chain_rows).
     Returns True if the stored hash matches the computed hash.
     """
     computed_hash = compute_event_hash(
@@ -137,58 +398,407 @@ def verify_event_hash(event: Event) -> bool:
     return computed_hash == event.event_hash
 
 
-def verify_chain(db: Session, agent_id: str, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None) -> tuple[bool, int, Optional[str], Optional[str]]:
+def load_checkpoint(db: Session, agent_id: str) -> Optional[ChainCheckpoint]:
+    """Get the last verified checkpoint for an agent, if any."""
+    return db.query(ChainCheckpoint).filter(ChainCheckpoint.agent_id == agent_id).first()
+
+
+def save_checkpoint(db: Session, agent_id: str, event_hash: str, sequence: int) -> None:
+    """
+    Record that an agent's chain has been verified up to event_hash.
+    
+    sequence is that event's sequence number (the number of events in
+    the chain up to and including it).
+    """
+    try:
+        checkpoint = load_checkpoint(db, agent_id)
+        if checkpoint is None:
+            checkpoint = ChainCheckpoint(agent_id=agent_id)
+            db.add(checkpoint)
+        elif checkpoint.sequence > sequence:
+            # A concurrent verification already got further
+            return
+        checkpoint.event_hash = event_hash
+        checkpoint.sequence = sequence
+        checkpoint.verified_at = datetime.now(timezone.utc)
+        db.commit()
+    except IntegrityError:
+        # Another verification created the row first; its checkpoint is as good
+        db.rollback()
+
+
+# Columns needed to rehash an event; rows are fetched as lightweight
+# tuples instead of ORM instances
+CHAIN_COLUMNS = (
+    Event.event_id,
+    Event.agent_id,
+    Event.action_type,
+    Event.tool_name,
+    Event.timestamp,
+    Event.environment,
+    Event.model_version,
+    Event.prompt_version,
+    Event.input_hash,
+    Event.output_hash,
+    Event.previous_event_hash,
+    Event.event_hash,
+)
+
+# CHAIN_COLUMNS plus the per-agent sequence number, which isn't hashed
+SEQUENCED_CHAIN_COLUMNS = CHAIN_COLUMNS + (Event.sequence,)
+
+ProgressCallback = Callable[[int], None]
+
+
+def has_unsequenced_events(db: Session, agent_id: str, *criteria) -> bool:
+    """Whether an agent has events that sequence-backfill hasn't numbered yet."""
+    return db.query(Event.event_id).filter(
+        Event.agent_id == agent_id, Event.sequence.is_(None), *criteria
+    ).first() is not None
+
+
+def stream_chain_rows(db: Session, agent_id: str, *criteria) -> Iterator:
+    """
+    Stream an agent's events in chain order through a server-side cursor.
+    
+    Rows are SEQUENCED_CHAIN_COLUMNS tuples read along the unique
+    (agent_id, sequence) index, fetched in batches of VERIFY_BATCH_SIZE,
+    so memory stays bounded regardless of chain length. Events not yet
+    numbered by sequence-backfill predate every numbered one; they come
+    first, in (timestamp, event_id) order.
+    """
+    query = (
+        db.query(*SEQUENCED_CHAIN_COLUMNS)
+        .filter(Event.agent_id == agent_id, *criteria)
+        .execution_options(yield_per=get_settings().verify_batch_size)
+    )
+    sequenced = query.filter(Event.sequence.isnot(None)).order_by(Event.sequence)
+    if not has_unsequenced_events(db, agent_id, *criteria):
+        return iter(sequenced)
+    unsequenced = query.filter(Event.sequence.is_(None)).order_by(Event.timestamp, Event.event_id)
+    return itertools.chain(unsequenced, sequenced)
+
+
+def sequence_range(
+    db: Session,
+    agent_id: str,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None
+) -> tuple[Optional[int], Optional[int]]:
+    """
+    First and last sequence numbers of an agent's events in a time range.
+    
+    Timestamps increase with sequence within a chain, so each bound is a
+    single probe of the (agent_id, timestamp) index. Returns (None, None)
+    if the range holds no events.
+    """
+    query = db.query(Event.sequence).filter(Event.agent_id == agent_id)
+    if start_time:
+        query = query.filter(Event.timestamp >= start_time)
+    if end_time:
+        query = query.filter(Event.timestamp <= end_time)
+    first = query.order_by(Event.timestamp).limit(1).scalar()
+    last = query.order_by(desc(Event.timestamp)).limit(1).scalar()
+    if first is None or last is None:
+        # No events, or events written before sequences were backfilled
+        return None, None
+    return first, last
+
+
+def find_sequence_gaps(db: Session, agent_id: str, limit: int = 100) -> list[tuple[int, int]]:
+    """
+    Find missing events in an agent's chain without rehashing anything.
+    
+    Returns up to `limit` (last_present, next_present) sequence pairs
+    where next_present - last_present > 1. A chain that doesn't start at
+    sequence 1 is reported as a gap after 0, unless it continues from the
+    agent's retention boundary (older events detached with a partition); events missing from the end of the chain
+    (behind the chain head) as a gap before head + 1.
+    """
+    following = func.lead(Event.sequence).over(order_by=Event.sequence)
+    pairs = (
+        db.query(Event.sequence.label("present"), following.label("next_present"))
+        .filter(Event.agent_id == agent_id, Event.sequence.isnot(None))
+        .subquery()
+    )
+    gaps = [
+        (present, next_present)
+        for present, next_present in db.query(pairs.c.present, pairs.c.next_present)
+        .filter(pairs.c.next_present > pairs.c.present + 1)
+        .order_by(pairs.c.present)
+        .limit(limit)
+    ]
+    
+    first, last = db.query(func.min(Event.sequence), func.max(Event.sequence)).filter(
+        Event.agent_id == agent_id
+    ).one()
+    
+    # Events deleted from the end of the chain leave no gap between rows,
+    # but the chain head still counts them
+    head = db.query(ChainHead.sequence).filter(ChainHead.agent_id == agent_id).scalar()
+    if head is not None and head > (last or 0):
+        gaps.append((last or 0, head + 1))
+    
+    # Events not yet numbered by sequence-backfill come before the first
+    # numbered one, so a chain that numbers from later on isn't a gap
+    if first is not None and first > 1 and not has_unsequenced_events(db, agent_id):
+        first_event = db.query(Event.sequence, Event.previous_event_hash).filter(
+            Event.agent_id == agent_id,
+            Event.sequence == first
+        ).one()
+        if not _continues_detached_history(db, agent_id, first_event):
+            gaps.insert(0, (0, first))
+    return gaps[:limit]
+
+
+def _rehash_chunk(rows: list[tuple]) -> list[bool]:
+    """Recompute hashes for a chunk of CHAIN_COLUMNS tuples (runs in worker processes)."""
+    return [compute_event_hash(*row[:11]) == row[11] for row in rows]
+
+
+def rehash_rows(rows: Iterable, workers: int = 1) -> Iterator[tuple]:
+    """
+    Yield (row, hash_ok) for each row, in input order.
+    
+    With workers > 1, rows are cut into chunks of VERIFY_BATCH_SIZE and
+    rehashed in a process pool; only a bounded number of chunks is in
+    flight at once. The caller does the (cheap, sequential) linkage
+    check as results come back in order.
+    """
+    if workers <= 1:
+        for row in rows:
+            yield row, verify_event_hash(row)
+        return
+    
+    chunk_size = get_settings().verify_batch_size
+    pending: deque = deque()
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                pending.append((chunk, executor.submit(_rehash_chunk, [tuple(r) for r in chunk])))
+                chunk = []
+                # Keep memory bounded: drain the oldest chunk once enough are in flight
+                if len(pending) >= workers * 2:
+                    done_chunk, future = pending.popleft()
+                    yield from zip(done_chunk, future.result())
+        if chunk:
+            pending.append((chunk, executor.submit(_rehash_chunk, [tuple(r) for r in chunk])))
+        while pending:
+            done_chunk, future = pending.popleft()
+            yield from zip(done_chunk, future.result())
+    finally:
+        # Stops outstanding work if the caller bails out at the first invalid event
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _verify_from_checkpoint(
+    db: Session,
+    agent_id: str,
+    checkpoint: ChainCheckpoint,
+    progress: Optional[ProgressCallback] = None,
+    workers: int = 1
+) -> Optional[tuple[bool, int, Optional[str], Optional[str]]]:
+    """
+    Verify only the events appended after a checkpoint.
+    
+    Returns None when the checkpoint can't be trusted (its event is gone
+    or no longer hashes correctly); the caller then falls back to a full
+    pass, which reports the first invalid event.
+    """
+    head = db.query(ChainHead).filter(ChainHead.agent_id == agent_id).first()
+    if head is not None and head.event_hash == checkpoint.event_hash:
+        # Chain head hasn't moved since the last verification
+        return True, checkpoint.sequence, None, None
+    
+    anchor = db.query(*SEQUENCED_CHAIN_COLUMNS).filter(
+        Event.agent_id == agent_id,
+        Event.event_hash == checkpoint.event_hash
+    ).first()
+    if anchor is None or anchor.sequence is None or not verify_event_hash(anchor):
+        return None
+    
+    rows = stream_chain_rows(
+        db,
+        agent_id,
+        Event.timestamp >= anchor.timestamp,  # prunes partitions before the checkpoint
+        Event.sequence > anchor.sequence
+    )
+    
+    events_checked = checkpoint.sequence
+    expected_previous_hash = anchor.event_hash
+    expected_sequence = anchor.sequence
+    progress_every = get_settings().verify_batch_size
+    for event, hash_ok in rehash_rows(rows, workers):
+        events_checked += 1
+        expected_sequence += 1
+        
+        gap = _sequence_gap(event, expected_sequence)
+        if gap:
+            return False, events_checked, event.event_id, gap
+        if not hash_ok:
+            return False, events_checked, event.event_id, f"Event hash mismatch for event {event.event_id}"
+        if event.previous_event_hash != expected_previous_hash:
+            return False, events_checked, event.event_id, f"Chain broken: previous_event_hash mismatch"
+        
+        expected_previous_hash = event.event_hash
+        if progress and events_checked % progress_every == 0:
+            progress(events_checked)
+    
+    if expected_sequence > anchor.sequence:
+        save_checkpoint(db, agent_id, expected_previous_hash, expected_sequence)
+    
+    return True, events_checked, None, None
+
+
+def _sequence_gap(event, expected_sequence: int) -> Optional[str]:
+    """Describe a missing-event gap before this event, or None if there is none."""
+    if event.sequence != expected_sequence:
+        return f"Missing events: expected sequence {expected_sequence}, found {event.sequence}"
+    return None
+
+
+def _continues_detached_history(db: Session, agent_id: str, event) -> bool:
+    """
+    Whether a chain may start at this event because the events before it
+    were detached with a partition: it must continue exactly from the
+    last event recorded for the agent when the partition was detached.
+    """
+    boundary = db.get(RetentionBoundary, agent_id)
+    return (
+        boundary is not None
+        and event.sequence == boundary.sequence + 1
+        and event.previous_event_hash == boundary.event_hash
+    )
+
+
+def verify_chain(
+    db: Session,
+    agent_id: str,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    full: bool = False,
+    progress: Optional[ProgressCallback] = None,
+    workers: Optional[int] = None
+) -> tuple[bool, int, Optional[str], Optional[str], str]:
     """
     Verify the integrity of the event chain for an agent.
     
+    Without a time range, verification resumes from the agent's last
+    stored checkpoint and only rehashes newer events; if the chain head
+    hasn't moved it returns immediately. Pass full=True to rehash the
+    whole chain (a complete audit pass). Successful whole-chain passes
+    move the checkpoint forward.
+    
+    Events are streamed as tuples in sequence order, so memory use does
+    not depend on chain length; a time range is first mapped to a
+    sequence range. A jump in sequence numbers is reported as missing
+    events. If given, progress is called with the running count every
+    VERIFY_BATCH_SIZE events.
+    
+    workers > 1 rehashes events in a process pool (see rehash_rows);
+    defaults to VERIFY_WORKERS.
+    
     Returns:
         - is_valid: True if chain is valid
-        - events_checked: Number of events verified
+        - events_checked: Number of events verified (including those
+          covered by the checkpoint)
         - first_invalid_event_id: ID of first invalid event (if any)
         - error_message: Description of the error (if any)
+        - mode: How the chain was checked: "incremental" (from the
+          checkpoint), "full" (whole chain, also when there was no usable
+          checkpoint) or "range"
     """
-    query = db.query(Event).filter(Event.agent_id == agent_id)
+    whole_chain = start_time is None and end_time is None
+    if workers is None:
+        workers = get_settings().verify_workers
+    
+    if whole_chain and not full:
+        checkpoint = load_checkpoint(db, agent_id)
+        if checkpoint is not None:
+            result = _verify_from_checkpoint(db, agent_id, checkpoint, progress, workers)
+            if result is not None:
+                return (*result, "incremental")
     
+    # No usable checkpoint: a whole-chain request falls back to a full pass
+    mode = "full" if whole_chain else "range"
+    return (*_verify_pass(db, agent_id, start_time, end_time, progress, workers), mode)
+
+
+def _verify_pass(
+    db: Session,
+    agent_id: str,
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+    progress: Optional[ProgressCallback],
+    workers: int
+) -> tuple[bool, int, Optional[str], Optional[str]]:
+    """Rehash an agent's chain, or the part of it in a time range, from the start."""
+    whole_chain = start_time is None and end_time is None
+    criteria = []
     if start_time:
-        query = query.filter(Event.timestamp >= start_time)
+        criteria.append(Event.timestamp >= start_time)
     if end_time:
-        query = query.filter(Event.timestamp <= end_time)
+        criteria.append(Event.timestamp <= end_time)
+    if criteria:
+        # Turn the time range into a range scan of the (agent_id, sequence)
+        # index; the timestamp bounds stay for partition pruning
+        first_sequence, last_sequence = sequence_range(db, agent_id, start_time, end_time)
+        if first_sequence is not None:
+            criteria += [Event.sequence >= first_sequence, Event.sequence <= last_sequence]
     
-    events = query.order_by(Event.timestamp, Event.event_id).all()
-    
-    if not events:
-        return True, 0, None, None
+    rows = stream_chain_rows(db, agent_id, *criteria)
     
     events_checked = 0
     expected_previous_hash = None
+    expected_sequence = None
+    progress_every = get_settings().verify_batch_size
     
-    # If we have a start_time filter, get the previous event to establish the chain
-    if start_time and events:
-        first_event = events[0]
-        expected_previous_hash = first_event.previous_event_hash
-    
-    for i, event in enumerate(events):
+    for event, hash_ok in rehash_rows(rows, workers):
         events_checked += 1
         
+        # Missing events show up as a jump in sequence numbers. Events not
+        # yet numbered by sequence-backfill are only checked by their links.
+        if event.sequence is None:
+            expected_sequence = None
+        else:
+            if expected_sequence is not None:
+                gap = _sequence_gap(event, expected_sequence)
+                if gap:
+                    return False, events_checked, event.event_id, gap
+            expected_sequence = event.sequence + 1
+        
         # Verify the event's own hash
-        if not verify_event_hash(event):
+        if not hash_ok:
             return False, events_checked, event.event_id, f"Event hash mismatch for event {event.event_id}"
         
         # For the first event in a full chain (no start_time filter), previous should be None
         # For subsequent events, previous should match the last event's hash
-        if i == 0 and not start_time:
-            if event.previous_event_hash is not None:
-                # Check if there's actually a prior event
-                prior = db.query(Event).filter(
-                    Event.agent_id == agent_id,
-                    Event.timestamp < event.timestamp
-                ).first()
-                if prior is None and event.previous_event_hash is not None:
-                    return False, events_checked, event.event_id, f"First event should have no previous hash"
-        elif i > 0:
+        # (with a start_time filter, the first event's previous hash is taken as given)
+        if events_checked == 1 and not start_time:
+            # A chain may only start later than sequence 1 if its older
+            # events were detached with a partition (unnumbered events
+            # come first, so the oldest is taken as the start)
+            sequence = event.sequence or 1
+            if sequence > 1 and not _continues_detached_history(db, agent_id, event):
+                return False, events_checked, event.event_id, f"Missing events: chain starts at sequence {event.sequence}"
+            if sequence == 1 and event.previous_event_hash is not None:
+                return False, events_checked, event.event_id, f"First event should have no previous hash"
+        elif events_checked > 1:
             if event.previous_event_hash != expected_previous_hash:
                 return False, events_checked, event.event_id, f"Chain broken: previous_event_hash mismatch"
         
         expected_previous_hash = event.event_hash
+        if progress and events_checked % progress_every == 0:
+            progress(events_checked)
+    
+    if events_checked == 0:
+        return True, 0, None, None
+    
+    # A checkpoint is only usable if its event is numbered
+    if whole_chain and expected_sequence is not None:
+        save_checkpoint(db, agent_id, expected_previous_hash, expected_sequence - 1)
     
     return True, events_checked, None, None
\ No newline at end of file
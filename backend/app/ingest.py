@@ -0,0 +1,377 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.models import EventCreate
+from app.db_models import Event
+from app.hash_chain import (
+    compute_event_hash,
+    lock_chain_head,
+    next_event_timestamp,
+    advance_chain_head,
+    remember_chain_head,
+    ChainHeadState,
+)
+from app.archive import get_archive_writer
+from app.mmr import build_append_rows, insert_nodes
+from app.event_stream import notify_events, publish_events
+
+logger = logging.getLogger(__name__)
+
+
+def ingest_events(db: Session, items: Sequence[EventCreate]) -> list[Event]:
+    """
+    Chain and store a batch of events in a single transaction.
+
+    Items may belong to any number of agents. Each agent's items are
+    chained in the order they appear in the batch. All rows (and the
+    agents' new MMR nodes) are written with one multi-row INSERT and one
+    commit, then appended to the archive once per agent/day file.
+
+    Returns transient Event objects (not attached to the session) in the
+    same order as the input items.
+    """
+    events, head_states = _store_events(db, items)
+    _after_commit(events, head_states)
+    return events
+
+
+def _store_events(
+    db: Session,
+    items: Sequence[EventCreate]
+) -> tuple[list[Event], dict[str, ChainHeadState]]:
+    """The transactional part of ingest_events: chain, insert and commit."""
+    if not items:
+        return [], {}
+
+    # Group item positions by agent, preserving batch order within each agent
+    positions_by_agent: dict[str, list[int]] = {}
+    for position, item in enumerate(items):
+        positions_by_agent.setdefault(item.agent_id, []).append(position)
+
+    rows: list[dict] = [None] * len(items)
+    head_states: dict[str, ChainHeadState] = {}
+    mmr_rows: list[dict] = []
+    mmr_index = get_settings().mmr_index
+
+    try:
+        # Lock heads in a fixed order so concurrent batches can't deadlock
+        for agent_id in sorted(positions_by_agent):
+            head = lock_chain_head(db, agent_id)
+            leaf_count = head.sequence or 0
+
+            for position in positions_by_agent[agent_id]:
+                item = items[position]
+                event_id = str(uuid.uuid4())
+                timestamp = next_event_timestamp(head)
+                previous_event_hash = head.event_hash
+
+                event_hash = compute_event_hash(
+                    event_id=event_id,
+                    agent_id=item.agent_id,
+                    action_type=item.action_type,
+                    tool_name=item.tool_name,
+                    timestamp=timestamp,
+                    environment=item.environment,
+                    model_version=item.model_version,
+                    prompt_version=item.prompt_version,
+                    input_hash=item.input_hash,
+                    output_hash=item.output_hash,
+                    previous_event_hash=previous_event_hash
+                )
+
+                state = advance_chain_head(head, event_hash, timestamp)
+                head_states[agent_id] = state
+
+                rows[position] = {
+                    "event_id": event_id,
+                    "agent_id": item.agent_id,
+                    "action_type": item.action_type,
+                    "tool_name": item.tool_name,
+                    "timestamp": timestamp,
+                    "environment": item.environment,
+                    "model_version": item.model_version,
+                    "prompt_version": item.prompt_version,
+                    "input_hash": item.input_hash,
+                    "output_hash": item.output_hash,
+                    "previous_event_hash": previous_event_hash,
+                    "event_hash": event_hash,
+                    "sequence": state.sequence
+                }
+
+            if mmr_index:
+                mmr_rows.extend(build_append_rows(
+                    db,
+                    agent_id,
+                    leaf_count,
+                    [(rows[p]["event_id"], rows[p]["event_hash"]) for p in positions_by_agent[agent_id]]
+                ))
+
+        # One multi-row INSERT for the whole batch
+        db.execute(insert(Event), rows)
+        insert_nodes(db, mmr_rows)
+        notify_events(db, [row["event_id"] for row in rows])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return [Event(**row) for row in rows], head_states
+
+
+def _after_commit(events: list[Event], head_states: dict[str, ChainHeadState]) -> None:
+    """Post-commit bookkeeping: chain head cache, live stream and archive."""
+    for agent_id, state in head_states.items():
+        remember_chain_head(agent_id, state)
+
+    try:
+        publish_events(events)
+    except Exception:
+        # The events are committed; live streams catch up on reconnect
+        logger.exception("Failed to publish events to live streams")
+
+    # Write to append-only archive
+    try:
+        archive_writer = get_archive_writer()
+        archive_writer.write_events(events)
+    except Exception as e:
+        # Log but don't fail the request - DB is primary storage
+        # In production, this should alert on failure
+        print(f"Warning: Archive write failed: {e}")
+
+
+class IngestUnavailableError(RuntimeError):
+    """The pipeline is refusing new events; the request should be retried later (503)."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class _PendingRequest:
+    """A request's events waiting in the ingest queue; they are written together."""
+    items: Sequence[EventCreate]
+    future: Future
+    # submit() resolves to one Event, submit_many() to the list
+    single: bool = True
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+    def resolve(self, events: Sequence[Event]) -> None:
+        self.future.set_result(events[0] if self.single else list(events))
+
+
+class IngestMetrics:
+    """Counters for the group-commit pipeline (batch size and queue delay)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.events = 0
+        self.failed_batches = 0
+        self.max_batch_size = 0
+        self.total_queue_delay_ms = 0.0
+        self.max_queue_delay_ms = 0.0
+
+    def record_batch(self, size: int, queue_delays_ms: list[float], failed: bool) -> None:
+        with self._lock:
+            self.batches += 1
+            self.events += size
+            if failed:
+                self.failed_batches += 1
+            self.max_batch_size = max(self.max_batch_size, size)
+            self.total_queue_delay_ms += sum(queue_delays_ms)
+            self.max_queue_delay_ms = max(self.max_queue_delay_ms, max(queue_delays_ms, default=0.0))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "events": self.events,
+                "failed_batches": self.failed_batches,
+                "avg_batch_size": self.events / self.batches if self.batches else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "avg_queue_delay_ms": self.total_queue_delay_ms / self.events if self.events else 0.0,
+                "max_queue_delay_ms": self.max_queue_delay_ms,
+            }
+
+
+class IngestPipeline:
+    """
+    Group-commit ingest queue with a single background writer thread.
+
+    Single-event requests are queued and the writer collects everything
+    that arrives within a short window (or until max_batch events), then
+    chains and commits the group as one transaction via ingest_events.
+    Each request's future resolves with its own Event.
+    """
+    
+    # Whether the pipeline must be the only writer: POST /events/batch
+    # goes through it too (it normally writes its own transaction), and
+    # requests never fall back to writing directly while it isn't running
+    exclusive = False
+
+    def __init__(self, window_ms: float, max_batch: int):
+        self.window_seconds = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.metrics = IngestMetrics()
+        self._queue: queue.Queue[Optional[_PendingRequest]] = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        """Start the background writer thread."""
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name="ingest-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Stop the writer after draining everything already queued."""
+        if not self.running:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def check_health(self) -> Optional[str]:
+        """Why the pipeline can't take events right now, or None if it can."""
+        return None
+
+    def submit(self, item: EventCreate) -> Future:
+        """Queue an event; the returned future resolves to the stored Event."""
+        pending = _PendingRequest(items=[item], future=Future())
+        self._queue.put(pending)
+        return pending.future
+    
+    def submit_many(self, items: Sequence[EventCreate]) -> Future:
+        """
+        Queue several events as one unit; the future resolves to their Events.
+        
+        They are always written in the same group, so either all of them
+        are stored or none are.
+        """
+        pending = _PendingRequest(items=list(items), future=Future(), single=False)
+        self._queue.put(pending)
+        return pending.future
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            batch = [first]
+            size = len(first.items)
+            stopping = False
+            deadline = first.enqueued_at + self.window_seconds
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    pending = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if pending is None:
+                    stopping = True
+                    break
+                batch.append(pending)
+                size += len(pending.items)
+
+            # Requests whose caller already gave up are dropped; the rest
+            # can't be cancelled any more, so resolving them can't fail
+            batch = [p for p in batch if p.future.set_running_or_notify_cancel()]
+            if batch:
+                try:
+                    self._write_batch(batch)
+                except Exception as e:
+                    # The writer thread must outlive any one batch
+                    logger.exception("Ingest writer failed a batch")
+                    for pending in batch:
+                        if not pending.future.done():
+                            pending.future.set_exception(e)
+            if stopping:
+                return
+
+    def _write_batch(self, batch: list[_PendingRequest]) -> None:
+        started_at = time.monotonic()
+        queue_delays_ms = [(started_at - p.enqueued_at) * 1000.0 for p in batch for _ in p.items]
+        failed = False
+
+        db = SessionLocal()
+        try:
+            try:
+                stored = [_store_events(db, [item for p in batch for item in p.items])]
+                parts = [batch]
+            except Exception:
+                # Nothing was committed: retry request by request so a single
+                # bad event only fails its own request
+                failed = True
+                stored, parts = [], []
+                for pending in batch:
+                    try:
+                        stored.append(_store_events(db, pending.items))
+                        parts.append([pending])
+                    except Exception as e:
+                        pending.future.set_exception(e)
+
+            # Everything below runs once per commit and never triggers a retry
+            for (events, head_states), pendings in zip(stored, parts):
+                position = 0
+                for pending in pendings:
+                    pending.resolve(events[position:position + len(pending.items)])
+                    position += len(pending.items)
+                _after_commit(events, head_states)
+        finally:
+            db.close()
+            self.metrics.record_batch(len(queue_delays_ms), queue_delays_ms, failed)
+
+
+_pipeline: Optional[IngestPipeline] = None
+
+
+def get_ingest_pipeline() -> Optional[IngestPipeline]:
+    """
+    Return the process-wide ingest pipeline, or None if group commit is disabled.
+    
+    With INGEST_WAL this is the write-ahead log pipeline (app.wal), which
+    implies group commit.
+    """
+    global _pipeline
+    settings = get_settings()
+    if settings.ingest_wal:
+        if _pipeline is None:
+            from app.wal import WalIngestPipeline  # imports this module
+            _pipeline = WalIngestPipeline(
+                wal_path=settings.wal_path,
+                window_ms=settings.ingest_batch_window_ms,
+                max_batch=settings.ingest_max_batch,
+                fsync=settings.wal_fsync,
+                segment_max_bytes=settings.wal_segment_max_bytes,
+                apply_batch=settings.wal_apply_batch,
+                max_unapplied=settings.wal_max_unapplied
+            )
+        return _pipeline
+    if not settings.ingest_group_commit:
+        return None
+    if _pipeline is None:
+        _pipeline = IngestPipeline(
+            window_ms=settings.ingest_batch_window_ms,
+            max_batch=settings.ingest_max_batch
+        )
+    return _pipeline
@@ -3,18 +3,42 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import os
 
-from app.database import init_db, engine
+from anyio import to_thread
+
+from app.database import init_db, db_thread_limit, engine
+from app.partitions import PartitionMaintainer
 from app.config import get_settings
-from app.archive import get_archive_writer
-from app.models import HealthResponse
-from app.routes import events, export, verify
+from app.archive import get_archive_writer, close_archive_writer
+from app.ingest import get_ingest_pipeline
+from app.event_stream import close_broadcaster
+from app.models import HealthResponse, IngestMetricsResponse
+from app.routes import events, export, verify, proofs
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Initialize database and other resources on startup."""
     init_db()
+    settings = get_settings()
+    # Sync handlers run in AnyIO's thread pool; size it to the DB pool
+    to_thread.current_default_thread_limiter().total_tokens = db_thread_limit()
+    maintainer = None
+    if settings.db_partitioning and engine.dialect.name == "postgresql":
+        maintainer = PartitionMaintainer(engine, settings.db_partition_months_ahead)
+        maintainer.start()
+    pipeline = get_ingest_pipeline()
+    if pipeline is not None:
+        # With INGEST_WAL this first replays events logged before a crash
+        pipeline.start()
     yield
+    # End live streams so the server isn't kept waiting on them
+    close_broadcaster()
+    if maintainer is not None:
+        maintainer.stop()
+    # Flush queued events and archive writes before the worker exits
+    if pipeline is not None:
+        pipeline.stop()
+    close_archive_writer()
 
 
 app = FastAPI(
@@ -43,6 +67,7 @@ app.add_middleware(
 app.include_router(events.router)
 app.include_router(export.router)
 app.include_router(verify.router)
+app.include_router(proofs.router)
 
 
 @app.get("/", tags=["root"])
@@ -56,14 +81,16 @@ async def root():
             "events": "/events",
             "export": "/export",
             "verify": "/verify",
-            "health": "/health"
+            "proofs": "/proofs",
+            "health": "/health",
+            "metrics": "/metrics/ingest"
         }
     }
 
 
 @app.get("/health", response_model=HealthResponse, tags=["health"])
-async def health_check():
-    """Health check endpoint. Verifies database and archive connectivity."""
+def health_check():
+    """Health check endpoint. Verifies database and archive connectivity and that ingest is accepting events."""
     from sqlalchemy import text
 
     # Check database
@@ -83,10 +110,36 @@ async def health_check():
     except Exception as e:
         archive_status = f"unhealthy: {str(e)}"
 
-    overall_status = "healthy" if db_status == "healthy" and archive_status == "healthy" else "degraded"
+    # Check ingest (the WAL pipeline refuses events once applying has stopped)
+    ingest_status = "healthy"
+    pipeline = get_ingest_pipeline()
+    problem = pipeline.check_health() if pipeline is not None else None
+    if problem:
+        ingest_status = f"unhealthy: {problem}"
+
+    healthy = db_status == "healthy" and archive_status == "healthy" and ingest_status == "healthy"
+    overall_status = "healthy" if healthy else "degraded"
 
     return HealthResponse(
         status=overall_status,
         database=db_status,
-        archive=archive_status
+        archive=archive_status,
+        ingest=ingest_status
+    )
+
+
+@app.get("/metrics/ingest", response_model=IngestMetricsResponse, tags=["health"])
+async def ingest_metrics():
+    """Group-commit pipeline metrics (batch sizes, queue delay, WAL backlog)."""
+    pipeline = get_ingest_pipeline()
+    if pipeline is None:
+        return IngestMetricsResponse(group_commit_enabled=False)
+    
+    wal = pipeline.wal_snapshot() if hasattr(pipeline, "wal_snapshot") else {}
+    return IngestMetricsResponse(
+        group_commit_enabled=True,
+        queue_depth=pipeline.queue_depth,
+        wal_enabled=bool(wal),
+        **wal,
+        **pipeline.metrics.snapshot()
     )
\ No newline at end of file
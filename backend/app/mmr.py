@@ -0,0 +1,354 @@
+"""
+Merkle Mountain Range (MMR) index over each agent's event hashes.
+
+Every event appended to an agent's chain is also appended as a leaf to
+that agent's MMR. The MMR is an append-only list of perfect binary
+Merkle trees ("mountains"); its root commits to the whole history, and
+any event can be proven to be part of it with O(log n) hashes, without
+replaying the linear chain.
+
+Positions are 0-based in post-order, as in the usual MMR layout:
+
+              6
+           /     \\
+          2       5       9
+         / \\     / \\     / \\
+        0   1   3   4   7   8  ...
+
+Hashing (SHA-256, inputs are raw 32-byte digests):
+    leaf   = H(0x00 || event_hash)
+    parent = H(0x01 || left || right)
+    root   = peaks bagged right to left with the parent rule
+"""
+import hashlib
+from typing import Callable, Iterable, Optional
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.db_models import Event, MerkleNode
+
+
+# ---------------------------------------------------------------------------
+# Pure MMR arithmetic (no database access)
+# ---------------------------------------------------------------------------
+
+def hash_leaf(event_hash: str) -> str:
+    """Hash an event_hash into an MMR leaf."""
+    return hashlib.sha256(b'\x00' + bytes.fromhex(event_hash)).hexdigest()
+
+
+def hash_parent(left: str, right: str) -> str:
+    """Hash two child nodes into their parent."""
+    return hashlib.sha256(b'\x01' + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+
+def mmr_size(leaf_count: int) -> int:
+    """Number of nodes in an MMR with leaf_count leaves."""
+    return 2 * leaf_count - bin(leaf_count).count('1')
+
+
+def leaf_position(leaf_index: int) -> int:
+    """Node position of the leaf_index-th leaf."""
+    return mmr_size(leaf_index)
+
+
+def leaf_index_at(position: int) -> int:
+    """Inverse of leaf_position: the leaf index stored at a leaf position."""
+    low, high = 0, position
+    while low < high:
+        mid = (low + high) // 2
+        if mmr_size(mid) < position:
+            low = mid + 1
+        else:
+            high = mid
+    return low
+
+
+def node_height(position: int) -> int:
+    """Height of the node at a position (leaves are height 0)."""
+    pos = position + 1
+    # Walk left until pos is the root of a perfect tree (all ones in binary)
+    while pos & (pos + 1):
+        pos -= (1 << (pos.bit_length() - 1)) - 1
+    return pos.bit_length() - 1
+
+
+def peak_positions(size: int) -> list[int]:
+    """Positions of the mountain peaks of an MMR with `size` nodes, left to right."""
+    peaks = []
+    offset = 0
+    remaining = size
+    while remaining > 0:
+        tree_size = (1 << ((remaining + 1).bit_length() - 1)) - 1
+        peaks.append(offset + tree_size - 1)
+        offset += tree_size
+        remaining -= tree_size
+    return peaks
+
+
+def bag_peaks(peaks: list[str]) -> Optional[str]:
+    """Fold peak hashes right to left into a single root."""
+    if not peaks:
+        return None
+    root = peaks[-1]
+    for peak in reversed(peaks[:-1]):
+        root = hash_parent(peak, root)
+    return root
+
+
+def append_leaf(size: int, leaf_hash: str, get_node: Callable[[int], str]) -> list[tuple[int, str]]:
+    """
+    Append a leaf to an MMR of `size` nodes.
+
+    Returns the new (position, hash) nodes: the leaf followed by any
+    parents it completes. get_node only ever needs current peaks.
+    """
+    position = size
+    current = leaf_hash
+    nodes = [(position, current)]
+    height = 0
+    # While the next position is a parent of the node we just wrote, merge
+    while node_height(position + 1) > height:
+        left = get_node(position + 1 - (2 << height))
+        current = hash_parent(left, current)
+        position += 1
+        height += 1
+        nodes.append((position, current))
+    return nodes
+
+
+def path_to_peak(position: int, size: int) -> list[tuple[int, str]]:
+    """
+    Sibling positions from a node up to the peak containing it.
+
+    Returns (sibling_position, side) pairs, where side is "left" or
+    "right" (the sibling's side relative to the running hash).
+    """
+    peaks = set(peak_positions(size))
+    path = []
+    height = node_height(position)
+    while position not in peaks:
+        if node_height(position + 1) > height:
+            # Right child: sibling on the left, parent right after us
+            path.append((position + 1 - (2 << height), "left"))
+            position += 1
+        else:
+            # Left child: sibling on the right, parent right after it
+            sibling = position + (2 << height) - 1
+            path.append((sibling, "right"))
+            position = sibling + 1
+        height += 1
+    return path
+
+
+def peak_above(position: int, size: int) -> int:
+    """Position of the peak whose mountain contains `position`."""
+    for sibling, _ in path_to_peak(position, size):
+        position = max(position, sibling) + 1
+    return position
+
+
+def climb(node_hash: str, path: Iterable[dict]) -> str:
+    """Apply a proof path (dicts with "hash" and "side") to a node hash."""
+    current = node_hash
+    for step in path:
+        if step["side"] == "left":
+            current = hash_parent(step["hash"], current)
+        else:
+            current = hash_parent(current, step["hash"])
+    return current
+
+
+def verify_inclusion(
+    event_hash: str,
+    leaf_index: int,
+    leaf_count: int,
+    path: list[dict],
+    peaks: list[str],
+    root: str
+) -> bool:
+    """
+    Check an inclusion proof returned by GET /proofs/inclusion/{event_id}.
+
+    Intended for auditors; depends only on this module.
+    """
+    if not 0 <= leaf_index < leaf_count:
+        return False
+    size = mmr_size(leaf_count)
+    position = leaf_position(leaf_index)
+    expected = path_to_peak(position, size)
+    positions = peak_positions(size)
+    if len(path) != len(expected) or len(peaks) != len(positions):
+        return False
+    if [step["side"] for step in path] != [side for _, side in expected]:
+        return False
+    peak = climb(hash_leaf(event_hash), path)
+    return peaks[positions.index(peak_above(position, size))] == peak and bag_peaks(peaks) == root
+
+
+def verify_consistency(
+    old_size: int,
+    old_root: str,
+    old_peaks: list[str],
+    new_size: int,
+    new_root: str,
+    new_peaks: list[str],
+    paths: list[list[dict]]
+) -> bool:
+    """
+    Check a consistency proof returned by GET /proofs/consistency.
+
+    Proves that the MMR with new_size leaves extends the one with
+    old_size leaves: every old peak must climb (via its path) to one of
+    the new peaks, and both peak lists must bag to their roots.
+    """
+    if not 0 < old_size <= new_size:
+        return False
+    size = mmr_size(new_size)
+    old_positions = peak_positions(mmr_size(old_size))
+    new_positions = peak_positions(size)
+    if len(old_peaks) != len(old_positions) or len(new_peaks) != len(new_positions) or len(paths) != len(old_peaks):
+        return False
+    if bag_peaks(old_peaks) != old_root or bag_peaks(new_peaks) != new_root:
+        return False
+    for old_pos, old_peak, path in zip(old_positions, old_peaks, paths):
+        expected = path_to_peak(old_pos, size)
+        if [step["side"] for step in path] != [side for _, side in expected]:
+            return False
+        if climb(old_peak, path) != new_peaks[new_positions.index(peak_above(old_pos, size))]:
+            return False
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Database-backed index
+# ---------------------------------------------------------------------------
+
+def get_nodes(db: Session, agent_id: str, positions: Iterable[int]) -> dict[int, str]:
+    """Fetch node hashes for an agent by position."""
+    positions = list(positions)
+    if not positions:
+        return {}
+    rows = db.query(MerkleNode.position, MerkleNode.hash).filter(
+        MerkleNode.agent_id == agent_id,
+        MerkleNode.position.in_(positions)
+    )
+    return {row.position: row.hash for row in rows}
+
+
+def _append_rows(
+    agent_id: str,
+    leaf_count: int,
+    peaks: dict[int, str],
+    events: Iterable[tuple[str, str]]
+) -> tuple[list[dict], int, dict[int, str]]:
+    """
+    Append (event_id, event_hash) leaves to an MMR given its current peaks.
+
+    Returns the new node rows, the new leaf count and the new peaks.
+    """
+    nodes = dict(peaks)
+    rows = []
+    size = mmr_size(leaf_count)
+    for event_id, event_hash in events:
+        new_nodes = append_leaf(size, hash_leaf(event_hash), nodes.__getitem__)
+        for i, (position, node_hash) in enumerate(new_nodes):
+            nodes[position] = node_hash
+            rows.append({
+                "agent_id": agent_id,
+                "position": position,
+                "hash": node_hash,
+                "event_id": event_id if i == 0 else None
+            })
+        size += len(new_nodes)
+        leaf_count += 1
+        # Only peaks are ever needed as left siblings; drop the rest
+        live = set(peak_positions(size))
+        nodes = {p: h for p, h in nodes.items() if p in live}
+    return rows, leaf_count, nodes
+
+
+def _rebuild_rows(db: Session, agent_id: str) -> tuple[list[dict], int, dict[int, str]]:
+    """
+    Build every node for an agent from its events, in chain order.
+
+    Used by mmr-rebuild for agents whose events predate the index (or
+    when the index was disabled for a while). Replaces any partial index.
+    """
+    db.query(MerkleNode).filter(MerkleNode.agent_id == agent_id).delete(synchronize_session=False)
+    events = (
+        db.query(Event.event_id, Event.event_hash)
+        .filter(Event.agent_id == agent_id)
+        .order_by(Event.timestamp, Event.event_id)
+        .execution_options(yield_per=5000)
+    )
+    return _append_rows(agent_id, 0, {}, ((e.event_id, e.event_hash) for e in events))
+
+
+def build_append_rows(db: Session, agent_id: str, leaf_count: int, events: list[tuple[str, str]]) -> list[dict]:
+    """
+    Compute the MerkleNode rows for appending events to an agent's MMR.
+
+    leaf_count is the chain length before these events (the locked chain
+    head's sequence). Call inside the ingest transaction, while the chain
+    head is locked, and before the new events are inserted.
+
+    If the stored index doesn't cover leaf_count (events that predate
+    the index, or MMR_INDEX was off for a while), nothing is appended:
+    rebuilding a whole history here would hold the chain head lock, and
+    stall the rest of a group commit, for as long as it takes. The index
+    stays behind, and proofs answer 409, until mmr-rebuild catches it up.
+    """
+    positions = peak_positions(mmr_size(leaf_count))
+    peaks = get_nodes(db, agent_id, positions)
+    if len(peaks) != len(positions):
+        return []
+    rows, _, _ = _append_rows(agent_id, leaf_count, peaks, events)
+    return rows
+
+
+def rebuild_index(db: Session, agent_id: str) -> int:
+    """Rebuild an agent's MMR from its events and commit; returns the leaf count."""
+    rows, leaf_count, _ = _rebuild_rows(db, agent_id)
+    insert_nodes(db, rows)
+    db.commit()
+    return leaf_count
+
+
+def insert_nodes(db: Session, rows: list[dict]) -> None:
+    """Insert MerkleNode rows with one multi-row INSERT."""
+    if rows:
+        db.execute(insert(MerkleNode), rows)
+
+
+def root_and_peaks(db: Session, agent_id: str, leaf_count: int) -> tuple[Optional[str], list[str]]:
+    """
+    Get the root and peak hashes of an agent's MMR at a given leaf count.
+
+    Raises LookupError if the index doesn't cover that many leaves yet.
+    """
+    positions = peak_positions(mmr_size(leaf_count))
+    nodes = get_nodes(db, agent_id, positions)
+    if len(nodes) != len(positions):
+        raise LookupError(f"MMR index for {agent_id} does not cover {leaf_count} events")
+    peaks = [nodes[p] for p in positions]
+    return bag_peaks(peaks), peaks
+
+
+def inclusion_proof(db: Session, agent_id: str, leaf_index: int, leaf_count: int) -> list[dict]:
+    """Sibling path from a leaf to its peak in the MMR with leaf_count leaves."""
+    path = path_to_peak(leaf_position(leaf_index), mmr_size(leaf_count))
+    nodes = get_nodes(db, agent_id, [p for p, _ in path])
+    if len(nodes) != len(path):
+        raise LookupError(f"MMR index for {agent_id} is incomplete")
+    return [{"position": p, "hash": nodes[p], "side": side} for p, side in path]
+
+
+def consistency_proof(db: Session, agent_id: str, old_size: int, new_size: int) -> list[list[dict]]:
+    """For each peak of the old MMR, the sibling path up to a peak of the new one."""
+    new_mmr_size = mmr_size(new_size)
+    paths = [path_to_peak(p, new_mmr_size) for p in peak_positions(mmr_size(old_size))]
+    nodes = get_nodes(db, agent_id, {p for path in paths for p, _ in path})
+    if len(nodes) != len({p for path in paths for p, _ in path}):
+        raise LookupError(f"MMR index for {agent_id} is incomplete")
+    return [[{"position": p, "hash": nodes[p], "side": side} for p, side in path] for path in paths]
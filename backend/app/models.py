@@ -4,6 +4,8 @@ from typing import Optional, List
 from enum import Enum
 import re
 
+from app.config import get_settings
+
 
 class EventCreate(BaseModel):
     agent_id: str = Field(..., min_length=1, max_length=128)
@@ -45,16 +47,27 @@ class EventResponse(BaseModel):
     output_hash: str
     previous_event_hash: Optional[str]
     event_hash: str
+    sequence: Optional[int] = None
 
     class Config:
         from_attributes = True
 
 
+class EventBatchCreate(BaseModel):
+    events: List[EventCreate] = Field(..., min_length=1, max_length=get_settings().max_batch_size)
+
+
+class EventBatchResponse(BaseModel):
+    events: List[EventResponse]
+    count: int
+
+
 class EventListResponse(BaseModel):
     events: List[EventResponse]
-    total: int
+    total: Optional[int]
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
 
 
 class VerifyResponse(BaseModel):
@@ -63,14 +76,34 @@ class VerifyResponse(BaseModel):
     events_checked: int
     first_invalid_event_id: Optional[str] = None
     error_message: Optional[str] = None
+    mode: str = "full"
 
 
 class ExportFormat(str, Enum):
     CSV = "csv"
     JSON = "json"
+    NDJSON = "ndjson"
 
 
 class HealthResponse(BaseModel):
     status: str
     database: str
-    archive: str
\ No newline at end of file
+    archive: str
+    ingest: str = "healthy"
+
+
+class IngestMetricsResponse(BaseModel):
+    group_commit_enabled: bool
+    queue_depth: int = 0
+    batches: int = 0
+    events: int = 0
+    failed_batches: int = 0
+    avg_batch_size: float = 0.0
+    max_batch_size: int = 0
+    avg_queue_delay_ms: float = 0.0
+    max_queue_delay_ms: float = 0.0
+    wal_enabled: bool = False
+    wal_unapplied: int = 0
+    wal_applied: int = 0
+    wal_apply_failures: int = 0
+    wal_apply_stopped: bool = False
\ No newline at end of file
@@ -0,0 +1,222 @@
+"""
+Monthly range partitioning of the events table (Postgres, DB_PARTITIONING).
+
+Each month of events lives in its own partition, events_YYYY_MM, so
+indexes stay month-sized and queries that filter on timestamp only touch
+the months they cover. Partitions are created ahead of time (init_db and
+a background thread keep DB_PARTITION_MONTHS_AHEAD months in reserve).
+
+Retention never DELETEs events: once every agent/day of a closed month
+is sealed against the archive, the month's partition can be detached.
+The detached table stays in the database (drop or dump it separately)
+and is recorded in detached_partitions. Where each agent's chain leaves
+the detached month is recorded in retention_boundaries, so chain
+verification accepts exactly that continuation and nothing else.
+"""
+import logging
+import threading
+from datetime import date, datetime, timezone
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.db_models import DetachedPartition, Event, RetentionBoundary
+
+logger = logging.getLogger(__name__)
+
+# How often the maintenance thread checks for missing future partitions
+MAINTENANCE_INTERVAL_S = 6 * 3600
+
+
+def _check_postgres(engine: Engine) -> None:
+    if engine.dialect.name != "postgresql":
+        raise RuntimeError("Events table partitioning only supports PostgreSQL")
+
+
+def month_start(day: date, offset: int = 0) -> date:
+    """First day of the month `offset` months after the one containing `day`."""
+    months = day.year * 12 + day.month - 1 + offset
+    return date(months // 12, months % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"events_{month.year:04d}_{month.month:02d}"
+
+
+def month_bounds(month: date) -> tuple[datetime, datetime]:
+    """[start, end) of a month in UTC, as partition bounds."""
+    start = month_start(month)
+    end = month_start(month, 1)
+    return (
+        datetime.combine(start, datetime.min.time(), tzinfo=timezone.utc),
+        datetime.combine(end, datetime.min.time(), tzinfo=timezone.utc),
+    )
+
+
+def parse_month(value: str) -> date:
+    """Parse YYYY-MM into the first day of that month."""
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+def is_partitioned(engine: Engine) -> bool:
+    """Whether the events table is a partitioned table."""
+    with engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT c.relkind = 'p' FROM pg_class c "
+            "WHERE c.oid = to_regclass('events')"
+        )).scalar() is True
+
+
+def ensure_partitions(engine: Engine, months_ahead: int, today: Optional[date] = None) -> list[str]:
+    """
+    Create partitions from the current month to `months_ahead` months on.
+
+    Months with a detached partition are skipped, since re-creating one
+    would accept new events into a range that has been retired. Returns
+    the names of the partitions created.
+    """
+    _check_postgres(engine)
+    today = today or datetime.now(timezone.utc).date()
+    created = []
+    with engine.begin() as conn:
+        detached = {row[0] for row in conn.execute(text("SELECT name FROM detached_partitions"))}
+        existing = {
+            row[0]
+            for row in conn.execute(text(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass('events')"
+            ))
+        }
+        for offset in range(months_ahead + 1):
+            month = month_start(today, offset)
+            name = partition_name(month)
+            if name in existing or name in detached:
+                continue
+            start, end = month_bounds(month)
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF events "
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            ))
+            created.append(name)
+    return created
+
+
+def list_partitions(engine: Engine) -> list[dict]:
+    """Attached partitions with their bounds and approximate row counts."""
+    _check_postgres(engine)
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass('events') ORDER BY c.relname"
+        ))
+        return [
+            {"name": name, "bounds": bounds, "approx_rows": max(rows_estimate, 0)}
+            for name, bounds, rows_estimate in rows
+        ]
+
+
+def unsealed_days(db: Session, month: date) -> list[tuple[str, str]]:
+    """Agent/days in a month that have events but no daily seal."""
+    start, end = month_bounds(month)
+    rows = db.execute(text("""
+SELECT DISTINCT e.agent_id, to_char(e.timestamp AT TIME ZONE 'UTC', 'YYYY-MM-DD') AS day
+FROM events e
+LEFT JOIN daily_seals s
+    ON s.agent_id = e.agent_id
+    AND s.day = to_char(e.timestamp AT TIME ZONE 'UTC', 'YYYY-MM-DD')
+WHERE e.timestamp >= :start AND e.timestamp < :end AND s.agent_id IS NULL
+ORDER BY 1, 2
+"""), {"start": start, "end": end})
+    return [(agent_id, day) for agent_id, day in rows]
+
+
+def detach_partition(engine: Engine, db: Session, month: date) -> DetachedPartition:
+    """
+    Detach a closed, fully sealed month from the events table.
+
+    Raises ValueError if the month hasn't closed or still has unsealed
+    agent/days; seal them first (python -m app.cli seal --date ...).
+    """
+    _check_postgres(engine)
+    month = month_start(month)
+    start, end = month_bounds(month)
+    if end > datetime.now(timezone.utc):
+        raise ValueError(f"{month:%Y-%m} has not closed yet (UTC)")
+
+    unsealed = unsealed_days(db, month)
+    if unsealed:
+        agent_id, day = unsealed[0]
+        raise ValueError(f"{len(unsealed)} agent/days in {month:%Y-%m} are not sealed (first: {agent_id} {day})")
+
+    # Each agent's last event in the month; read before detaching, while
+    # the rows are still in the events table
+    last_events = (
+        db.query(Event.agent_id, Event.sequence, Event.event_hash)
+        .filter(Event.timestamp >= start, Event.timestamp < end, Event.sequence.isnot(None))
+        .distinct(Event.agent_id)
+        .order_by(Event.agent_id, Event.sequence.desc())
+        .all()
+    )
+    # Don't hold a snapshot open while DETACH ... CONCURRENTLY waits out
+    # older transactions
+    db.rollback()
+
+    name = partition_name(month)
+    # DETACH ... CONCURRENTLY can't run inside a transaction, and only
+    # takes a SHARE UPDATE EXCLUSIVE lock on the parent
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"ALTER TABLE events DETACH PARTITION {name} CONCURRENTLY"))
+
+    record = DetachedPartition(
+        name=name,
+        range_start=start,
+        range_end=end,
+        detached_at=datetime.now(timezone.utc)
+    )
+    db.merge(record)
+    for agent_id, sequence, event_hash in last_events:
+        boundary = db.get(RetentionBoundary, agent_id)
+        if boundary is None:
+            db.add(RetentionBoundary(
+                agent_id=agent_id,
+                sequence=sequence,
+                event_hash=event_hash,
+                partition_name=name
+            ))
+        elif boundary.sequence < sequence:
+            # Months may be detached out of order; keep the latest
+            boundary.sequence = sequence
+            boundary.event_hash = event_hash
+            boundary.partition_name = name
+    db.commit()
+    return record
+
+
+class PartitionMaintainer:
+    """Background thread that keeps future partitions created."""
+
+    def __init__(self, engine: Engine, months_ahead: int, interval_s: float = MAINTENANCE_INTERVAL_S):
+        self.engine = engine
+        self.months_ahead = months_ahead
+        self.interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="partition-maintainer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            try:
+                for name in ensure_partitions(self.engine, self.months_ahead):
+                    logger.info("Created events partition %s", name)
+            except Exception:
+                logger.exception("Failed to create events partitions")
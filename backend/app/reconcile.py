@@ -0,0 +1,319 @@
+"""
+Reconcile the database against the archive, in both directions.
+
+For every agent/day in a date range, the day's events are streamed from
+the database and from the archive file, both sorted by (timestamp,
+event_id), and merge-joined. Memory per agent/day stays bounded by the
+DB cursor batch and a small reorder window for the archive, so whole
+archives can be audited without loading any file into a dict.
+
+Each agent/day ends up as one of:
+- missing_in_archive: in the DB, not in the archive
+- extra_in_archive:   in the archive, not in the DB (forged or duplicate lines)
+- mismatched:         same event, but some field differs between the two
+"""
+import heapq
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Iterable, Iterator, Optional
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from app.archive import ArchiveWriter, get_archive_writer
+from app.config import get_settings
+from app.database import SessionLocal
+from app.db_models import Event, ReconciliationJob, ReconciliationDiscrepancy
+from app.hash_chain import stream_chain_rows, _as_utc
+from app.sealing import day_bounds
+
+# Field order of CHAIN_COLUMNS rows and of archive records
+RECORD_FIELDS = (
+    "event_id",
+    "agent_id",
+    "action_type",
+    "tool_name",
+    "timestamp",
+    "environment",
+    "model_version",
+    "prompt_version",
+    "input_hash",
+    "output_hash",
+    "previous_event_hash",
+    "event_hash",
+)
+TIMESTAMP_FIELD = RECORD_FIELDS.index("timestamp")
+COMPARED_FIELDS = tuple(i for i in range(len(RECORD_FIELDS)) if i != TIMESTAMP_FIELD)
+
+# Archive lines may be slightly out of order (writes for an agent are
+# queued after commit); a window this size absorbs that without sorting
+REORDER_WINDOW = 1000
+
+
+class ArchiveOutOfOrder(Exception):
+    """An archive file is too far out of order for the reorder window."""
+
+
+@dataclass
+class DayReport:
+    """Outcome of reconciling one agent/day."""
+    agent_id: str
+    day: date
+    db_events: int = 0
+    archive_events: int = 0
+    missing_in_archive: int = 0
+    extra_in_archive: int = 0
+    mismatched: int = 0
+    first_missing_event_id: Optional[str] = None
+    first_extra_event_id: Optional[str] = None
+    first_mismatched_event_id: Optional[str] = None
+    error_message: Optional[str] = None
+
+    @property
+    def is_clean(self) -> bool:
+        return not (self.missing_in_archive or self.extra_in_archive or self.mismatched or self.error_message)
+
+
+def _db_records(db: Session, agent_id: str, day: date) -> Iterator[tuple]:
+    """The day's events from the DB as ((timestamp, event_id), row), in order."""
+    start_of_day, end_of_day = day_bounds(day)
+    rows = stream_chain_rows(db, agent_id, Event.timestamp >= start_of_day, Event.timestamp <= end_of_day)
+    for row in rows:
+        yield (_as_utc(row[TIMESTAMP_FIELD]), row[0]), tuple(row)
+
+
+def _archive_records(records: Iterable[dict]) -> Iterator[tuple]:
+    """Archive records as ((timestamp, event_id), row) tuples, in file order."""
+    for record in records:
+        row = tuple(record.get(field) for field in RECORD_FIELDS)
+        try:
+            timestamp = _as_utc(datetime.fromisoformat(row[TIMESTAMP_FIELD]))
+        except (TypeError, ValueError):
+            # Unparseable lines sort first and can only be reported as extra
+            timestamp = datetime.min.replace(tzinfo=timezone.utc)
+        yield (timestamp, str(row[0])), row
+
+
+def _reorder(records: Iterable[tuple], window: int) -> Iterator[tuple]:
+    """
+    Sort a nearly sorted stream using a bounded heap.
+
+    Raises ArchiveOutOfOrder if a record arrives after a larger one has
+    already been emitted.
+    """
+    heap = []
+    last_key = None
+    for seq, (key, row) in enumerate(records):
+        if last_key is not None and key < last_key:
+            raise ArchiveOutOfOrder
+        heapq.heappush(heap, (key, seq, row))
+        if len(heap) > window:
+            last_key, _, row = heapq.heappop(heap)
+            yield last_key, row
+    while heap:
+        key, _, row = heapq.heappop(heap)
+        yield key, row
+
+
+def merge_join(report: DayReport, db_records: Iterator[tuple], archive_records: Iterator[tuple]) -> DayReport:
+    """Merge two sorted ((timestamp, event_id), row) streams into a report."""
+    db_item = next(db_records, None)
+    archive_item = next(archive_records, None)
+
+    while db_item is not None or archive_item is not None:
+        if archive_item is None or (db_item is not None and db_item[0] < archive_item[0]):
+            report.db_events += 1
+            report.missing_in_archive += 1
+            report.first_missing_event_id = report.first_missing_event_id or db_item[0][1]
+            db_item = next(db_records, None)
+        elif db_item is None or archive_item[0] < db_item[0]:
+            report.archive_events += 1
+            report.extra_in_archive += 1
+            report.first_extra_event_id = report.first_extra_event_id or archive_item[0][1]
+            archive_item = next(archive_records, None)
+        else:
+            report.db_events += 1
+            report.archive_events += 1
+            db_row, archive_row = db_item[1], archive_item[1]
+            if any(db_row[i] != archive_row[i] for i in COMPARED_FIELDS):
+                report.mismatched += 1
+                report.first_mismatched_event_id = report.first_mismatched_event_id or db_item[0][1]
+            db_item = next(db_records, None)
+            archive_item = next(archive_records, None)
+
+    return report
+
+
+def reconcile_day(db: Session, archive_writer: ArchiveWriter, agent_id: str, day: date) -> DayReport:
+    """Reconcile one agent/day between the database and the archive."""
+    archive_date = datetime.combine(day, datetime.min.time())
+    try:
+        return merge_join(
+            DayReport(agent_id, day),
+            _db_records(db, agent_id, day),
+            _reorder(_archive_records(archive_writer.iter_events(agent_id, archive_date)), REORDER_WINDOW)
+        )
+    except ArchiveOutOfOrder:
+        # Rare: fall back to sorting this file's records in memory
+        archive_records = sorted(
+            _archive_records(archive_writer.iter_events(agent_id, archive_date)),
+            key=lambda item: item[0]
+        )
+        return merge_join(DayReport(agent_id, day), _db_records(db, agent_id, day), iter(archive_records))
+
+
+def list_agent_days(
+    db: Session,
+    archive_writer: ArchiveWriter,
+    start: date,
+    end: date,
+    agent_id: Optional[str] = None
+) -> list[tuple[str, date]]:
+    """Every agent/day in the range with events in the DB or a file in the archive."""
+    pairs = {
+        (archived_agent, day)
+        for archived_agent, day in archive_writer.list_archives(start, end)
+        if agent_id is None or archived_agent == agent_id
+    }
+
+    range_start, _ = day_bounds(start)
+    _, range_end = day_bounds(end)
+    spans = db.query(Event.agent_id, func.min(Event.timestamp), func.max(Event.timestamp)).filter(
+        Event.timestamp >= range_start,
+        Event.timestamp <= range_end
+    )
+    if agent_id is not None:
+        spans = spans.filter(Event.agent_id == agent_id)
+    for span_agent, first, last in spans.group_by(Event.agent_id):
+        day = _as_utc(first).astimezone(timezone.utc).date()
+        last_day = _as_utc(last).astimezone(timezone.utc).date()
+        while day <= last_day:
+            pairs.add((span_agent, day))
+            day += timedelta(days=1)
+
+    return sorted(pairs)
+
+
+def create_job(db: Session, start: date, end: date, agent_id: Optional[str] = None) -> ReconciliationJob:
+    """Create a pending reconciliation job."""
+    job = ReconciliationJob(
+        status="pending",
+        start_date=start.isoformat(),
+        end_date=end.isoformat(),
+        agent_id=agent_id
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _reconcile_agent_day(job_id: str, agent_id: str, day: date) -> DayReport:
+    """Reconcile one agent/day in its own session and record the result."""
+    db = SessionLocal()
+    try:
+        try:
+            report = reconcile_day(db, get_archive_writer(), agent_id, day)
+        except Exception as e:
+            db.rollback()
+            report = DayReport(agent_id, day, error_message=str(e))
+
+        if not report.is_clean:
+            db.add(ReconciliationDiscrepancy(
+                job_id=job_id,
+                agent_id=agent_id,
+                day=day.isoformat(),
+                db_events=report.db_events,
+                archive_events=report.archive_events,
+                missing_in_archive=report.missing_in_archive,
+                extra_in_archive=report.extra_in_archive,
+                mismatched=report.mismatched,
+                first_missing_event_id=report.first_missing_event_id,
+                first_extra_event_id=report.first_extra_event_id,
+                first_mismatched_event_id=report.first_mismatched_event_id,
+                error_message=report.error_message,
+                reconciled_at=datetime.now(timezone.utc)
+            ))
+        # Counters are updated in SQL so concurrent workers don't overwrite each other
+        db.execute(
+            update(ReconciliationJob)
+            .where(ReconciliationJob.job_id == job_id)
+            .values(
+                completed_days=ReconciliationJob.completed_days + 1,
+                discrepant_days=ReconciliationJob.discrepant_days + (0 if report.is_clean else 1),
+                db_events=ReconciliationJob.db_events + report.db_events,
+                archive_events=ReconciliationJob.archive_events + report.archive_events,
+                missing_in_archive=ReconciliationJob.missing_in_archive + report.missing_in_archive,
+                extra_in_archive=ReconciliationJob.extra_in_archive + report.extra_in_archive,
+                mismatched=ReconciliationJob.mismatched + report.mismatched
+            )
+        )
+        db.commit()
+        return report
+    finally:
+        db.close()
+
+
+def run_job(
+    job_id: str,
+    concurrency: Optional[int] = None,
+    progress: Optional[Callable[[DayReport], None]] = None
+) -> None:
+    """
+    Reconcile every agent/day of a job, at most `concurrency` at a time.
+
+    Agent/days are found by walking the archive tree and by querying the
+    DB, so days present on only one side are reported too. Discrepancies
+    are persisted as they are found so progress can be polled.
+    """
+    concurrency = concurrency or get_settings().verify_concurrency
+
+    db = SessionLocal()
+    try:
+        job = db.query(ReconciliationJob).filter(ReconciliationJob.job_id == job_id).one()
+        job.status = "running"
+        db.commit()
+
+        try:
+            agent_days = list_agent_days(
+                db,
+                get_archive_writer(),
+                date.fromisoformat(job.start_date),
+                date.fromisoformat(job.end_date),
+                job.agent_id
+            )
+            job.total_days = len(agent_days)
+            db.commit()
+
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                futures = [
+                    executor.submit(_reconcile_agent_day, job_id, agent_id, day)
+                    for agent_id, day in agent_days
+                ]
+                for future in futures:
+                    report = future.result()
+                    if progress:
+                        progress(report)
+            job.status = "completed"
+        except Exception as e:
+            db.rollback()
+            job.status = "failed"
+            job.error_message = str(e)
+
+        job.finished_at = datetime.now(timezone.utc)
+        db.commit()
+    finally:
+        db.close()
+
+
+def start_job(job_id: str, concurrency: Optional[int] = None) -> threading.Thread:
+    """Run a job on a background thread and return immediately."""
+    thread = threading.Thread(
+        target=run_job,
+        args=(job_id, concurrency),
+        name=f"reconcile-job-{job_id[:8]}",
+        daemon=True
+    )
+    thread.start()
+    return thread
@@ -1,16 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from datetime import datetime, timezone
+from sqlalchemy import desc, func, tuple_
+from datetime import datetime
 from typing import Optional
-import uuid
+import asyncio
+import base64
+import json
 
 from app.database import get_db
-from app.auth import verify_api_key
-from app.models import EventCreate, EventResponse, EventListResponse
+from app.auth import ApiKey, check_agent_access, verify_api_key
+from app.models import EventCreate, EventResponse, EventListResponse, EventBatchCreate, EventBatchResponse
 from app.db_models import Event
-from app.hash_chain import compute_event_hash, get_previous_event_hash
-from app.archive import get_archive_writer
+from app.hash_chain import has_unsequenced_events
+from app.ingest import IngestUnavailableError, ingest_events, get_ingest_pipeline
+from app.event_stream import get_broadcaster, stream
+from app.serialization import EVENT_COLUMNS, event_response, event_list_response, event_batch_response
 
 router = APIRouter(prefix="/events", tags=["events"])
 
@@ -19,7 +25,7 @@ router = APIRouter(prefix="/events", tags=["events"])
 async def create_event(
     event_data: EventCreate,
     db: Session = Depends(get_db),
-    api_key: str = Depends(verify_api_key)
+    api_key: ApiKey = Depends(verify_api_key)
 ):
     """
     Create a new event in the ledger.
@@ -27,91 +33,108 @@ async def create_event(
     Events are append-only and hash-chained per agent_id.
     Timestamp is server-generated UTC - not client-provided.
     """
-    # Generate event ID and timestamp (server-generated, always UTC)
-    event_id = str(uuid.uuid4())
-    timestamp = datetime.now(timezone.utc)
+    check_agent_access(api_key, event_data.agent_id)
+    pipeline = get_ingest_pipeline()
+    if pipeline is not None and (pipeline.running or pipeline.exclusive):
+        # Group commit: share a transaction with concurrent requests
+        try:
+            db_event = await asyncio.wrap_future(pipeline.submit(event_data))
+        except IngestUnavailableError as e:
+            raise _ingest_unavailable(e)
+    else:
+        db_event = (await run_in_threadpool(ingest_events, db, [event_data]))[0]
     
-    # Get previous event hash for this agent (for chaining)
-    previous_event_hash = get_previous_event_hash(db, event_data.agent_id)
+    return event_response(db_event, status.HTTP_201_CREATED)
+
+
+@router.post("/batch", response_model=EventBatchResponse, status_code=status.HTTP_201_CREATED)
+def create_events_batch(
+    batch: EventBatchCreate,
+    db: Session = Depends(get_db),
+    api_key: ApiKey = Depends(verify_api_key)
+):
+    """
+    Create many events in one request.
     
-    # Compute event hash (includes previous hash for chain integrity)
-    event_hash = compute_event_hash(
-        event_id=event_id,
-        agent_id=event_data.agent_id,
-        action_type=event_data.action_type,
-        tool_name=event_data.tool_name,
-        timestamp=timestamp,
-        environment=event_data.environment,
-        model_version=event_data.model_version,
-        prompt_version=event_data.prompt_version,
-        input_hash=event_data.input_hash,
-        output_hash=event_data.output_hash,
-        previous_event_hash=previous_event_hash
-    )
+    Items may belong to any number of agents; each agent's items are
+    chained in the order given. The whole batch is written in a single
+    transaction, so either every event is stored or none are.
+    """
+    for agent_id in {e.agent_id for e in batch.events}:
+        check_agent_access(api_key, agent_id)
+    pipeline = get_ingest_pipeline()
+    if pipeline is not None and pipeline.exclusive:
+        # Write-ahead log mode: every write has to go through the log
+        try:
+            # The batch goes into the log as one frame, so it stays all-or-nothing
+            events = pipeline.submit_many(batch.events).result()
+        except IngestUnavailableError as e:
+            raise _ingest_unavailable(e)
+    else:
+        events = ingest_events(db, batch.events)
     
-    # Create database record
-    db_event = Event(
-        event_id=event_id,
-        agent_id=event_data.agent_id,
-        action_type=event_data.action_type,
-        tool_name=event_data.tool_name,
-        timestamp=timestamp,
-        environment=event_data.environment,
-        model_version=event_data.model_version,
-        prompt_version=event_data.prompt_version,
-        input_hash=event_data.input_hash,
-        output_hash=event_data.output_hash,
-        previous_event_hash=previous_event_hash,
-        event_hash=event_hash
+    return event_batch_response(events)
+
+
+def _ingest_unavailable(error: IngestUnavailableError) -> HTTPException:
+    headers = {"Retry-After": str(int(error.retry_after))} if error.retry_after else None
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(error),
+        headers=headers
     )
-    
-    db.add(db_event)
-    db.commit()
-    db.refresh(db_event)
-    
-    # Write to append-only archive
+
+
+def _encode_cursor(event: Event) -> str:
+    """Build an opaque cursor pointing just past the given event."""
+    payload = json.dumps([event.timestamp.isoformat(), event.event_id, event.sequence], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str, Optional[int]]:
+    """Decode a cursor produced by _encode_cursor; raises 400 if malformed."""
     try:
-        archive_writer = get_archive_writer()
-        archive_writer.write_event(db_event)
-    except Exception as e:
-        # Log but don't fail the request - DB is primary storage
-        # In production, this should alert on failure
-        print(f"Warning: Archive write failed: {e}")
-    
-    return EventResponse(
-        event_id=db_event.event_id,
-        agent_id=db_event.agent_id,
-        action_type=db_event.action_type,
-        tool_name=db_event.tool_name,
-        timestamp=db_event.timestamp,
-        environment=db_event.environment,
-        model_version=db_event.model_version,
-        prompt_version=db_event.prompt_version,
-        input_hash=db_event.input_hash,
-        output_hash=db_event.output_hash,
-        previous_event_hash=db_event.previous_event_hash,
-        event_hash=db_event.event_hash
-    )
+        timestamp, event_id, *rest = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        # Cursors issued before sequences existed have no third element
+        sequence = int(rest[0]) if rest and rest[0] is not None else None
+        return datetime.fromisoformat(timestamp), str(event_id), sequence
+    except (ValueError, TypeError, UnicodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
 
 
 @router.get("", response_model=EventListResponse)
-async def list_events(
+def list_events(
     agent_id: Optional[str] = Query(None, description="Filter by agent ID"),
     action_type: Optional[str] = Query(None, description="Filter by action type"),
     start_time: Optional[datetime] = Query(None, description="Filter events after this time"),
     end_time: Optional[datetime] = Query(None, description="Filter events before this time"),
-    page: int = Query(1, ge=1, description="Page number"),
+    page: int = Query(1, ge=1, description="Page number (ignored when cursor is given)"),
     page_size: int = Query(50, ge=1, le=1000, description="Items per page"),
+    cursor: Optional[str] = Query(None, description="Continue after the page that returned this next_cursor"),
+    include_total: bool = Query(True, description="Count all matching events (skip for faster deep paging)"),
     db: Session = Depends(get_db),
-    api_key: str = Depends(verify_api_key)
+    api_key: ApiKey = Depends(verify_api_key)
 ):
     """
     List events with optional filters.
     
     Supports filtering by agent_id, action_type, and time range.
-    Results are paginated and ordered by timestamp descending.
+    Results are ordered by timestamp descending.
+    
+    Pass the returned next_cursor as cursor to fetch the following page.
+    Cursor pages seek on (timestamp, event_id) instead of using OFFSET,
+    so every page costs the same as the first. Page numbers still work
+    for compatibility. With agent_id, pages follow the agent's sequence
+    numbers (the same order) and seek on the (agent_id, sequence) index,
+    unless some of its events predate sequence numbers.
     """
-    query = db.query(Event)
+    check_agent_access(api_key, agent_id or None)
+    # Plain column tuples, encoded straight to JSON by app.serialization
+    # instead of going through EventResponse models
+    query = db.query(*EVENT_COLUMNS)
     
     # Apply filters
     if agent_id:
@@ -123,65 +146,94 @@ async def list_events(
     if end_time:
         query = query.filter(Event.timestamp <= end_time)
     
+    # Events sequence-backfill hasn't numbered yet can only be paged by timestamp
+    by_sequence = bool(agent_id) and not has_unsequenced_events(db, agent_id)
+    
     # Get total count
-    total = query.count()
+    total = None
+    if include_total:
+        if by_sequence and not (action_type or start_time or end_time):
+            # Sequence numbers are contiguous, so two index probes replace a COUNT scan
+            first, last = db.query(func.min(Event.sequence), func.max(Event.sequence)).filter(
+                Event.agent_id == agent_id
+            ).one()
+            total = last - first + 1 if last is not None else query.count()
+        else:
+            total = query.count()
     
     # Apply pagination
-    offset = (page - 1) * page_size
-    events = query.order_by(desc(Event.timestamp)).offset(offset).limit(page_size).all()
-    
-    return EventListResponse(
-        events=[
-            EventResponse(
-                event_id=e.event_id,
-                agent_id=e.agent_id,
-                action_type=e.action_type,
-                tool_name=e.tool_name,
-                timestamp=e.timestamp,
-                environment=e.environment,
-                model_version=e.model_version,
-                prompt_version=e.prompt_version,
-                input_hash=e.input_hash,
-                output_hash=e.output_hash,
-                previous_event_hash=e.previous_event_hash,
-                event_hash=e.event_hash
+    if by_sequence:
+        query = query.order_by(desc(Event.sequence))
+    else:
+        query = query.order_by(desc(Event.timestamp), desc(Event.event_id))
+    if cursor:
+        cursor_timestamp, cursor_event_id, cursor_sequence = _decode_cursor(cursor)
+        # The plain timestamp bound lets Postgres prune partitions;
+        # it can't see through the row comparison
+        query = query.filter(Event.timestamp <= cursor_timestamp)
+        if by_sequence and cursor_sequence is not None:
+            query = query.filter(Event.sequence < cursor_sequence)
+        else:
+            query = query.filter(
+                tuple_(Event.timestamp, Event.event_id) < (cursor_timestamp, cursor_event_id)
             )
-            for e in events
-        ],
-        total=total,
-        page=page,
-        page_size=page_size
+    else:
+        query = query.offset((page - 1) * page_size)
+    
+    # Fetch one extra row to know whether another page exists
+    events = query.limit(page_size + 1).all()
+    next_cursor = _encode_cursor(events[page_size - 1]) if len(events) > page_size else None
+    events = events[:page_size]
+    
+    return event_list_response(events, total, page, page_size, next_cursor)
+
+
+@router.get("/stream")
+async def stream_events(
+    agent_id: Optional[str] = Query(None, description="Only events of this agent"),
+    action_type: Optional[str] = Query(None, description="Only events of this action type"),
+    cursor: Optional[str] = Query(None, description="Start after this event (an SSE id from an earlier stream)"),
+    last_event_id: Optional[str] = Header(None, description="Sent by EventSource when reconnecting; overrides cursor"),
+    api_key: ApiKey = Depends(verify_api_key)
+):
+    """
+    Stream newly committed events as Server-Sent Events.
+
+    Each event is sent as `data:` (the same JSON as GET /events/{id}) with
+    its cursor as the SSE `id:`. Reconnecting with Last-Event-ID (or
+    cursor) first replays the events committed since, in timestamp order
+    (sequence order with agent_id), then continues live. A comment line
+    is sent every 15 seconds to keep idle connections open. The server
+    ends a stream that falls too far behind; reconnect to catch up.
+    """
+    check_agent_access(api_key, agent_id or None)
+    resume = last_event_id or cursor
+    after = _decode_cursor(resume) if resume else None
+    # Subscribe before the catch-up query so nothing committed in between is missed
+    subscription = get_broadcaster().subscribe(agent_id, action_type)
+    return StreamingResponse(
+        stream(subscription, after, _encode_cursor),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 
 @router.get("/{event_id}", response_model=EventResponse)
-async def get_event(
+def get_event(
     event_id: str,
     db: Session = Depends(get_db),
-    api_key: str = Depends(verify_api_key)
+    api_key: ApiKey = Depends(verify_api_key)
 ):
     """
     Get a single event by ID.
     """
-    event = db.query(Event).filter(Event.event_id == event_id).first()
+    event = db.query(*EVENT_COLUMNS).filter(Event.event_id == event_id).first()
     
-    if not event:
+    # Events outside a scoped key's agents are reported as missing
+    if not event or not api_key.allows(event.agent_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Event {event_id} not found"
         )
     
-    return EventResponse(
-        event_id=event.event_id,
-        agent_id=event.agent_id,
-        action_type=event.action_type,
-        tool_name=event.tool_name,
-        timestamp=event.timestamp,
-        environment=event.environment,
-        model_version=event.model_version,
-        prompt_version=event.prompt_version,
-        input_hash=event.input_hash,
-        output_hash=event.output_hash,
-        previous_event_hash=event.previous_event_hash,
-        event_hash=event.event_hash
-    )
\ No newline at end of file
+    return event_response(event)
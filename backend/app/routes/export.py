@@ -1,20 +1,47 @@
 from fastapi import APIRouter, Depends, Query
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
 from datetime import datetime
-from typing import Optional
+from typing import Iterator, Optional
 import csv
 import json
 import io
+import zlib
 
-from app.database import get_db
-from app.auth import verify_api_key
+from app.database import SessionLocal
+from app.auth import ApiKey, check_agent_access, verify_api_key
 from app.models import ExportFormat
 from app.db_models import Event
+from app.hash_chain import has_unsequenced_events
 
 router = APIRouter(prefix="/export", tags=["export"])
 
+EXPORT_COLUMNS = (
+    Event.event_id,
+    Event.agent_id,
+    Event.action_type,
+    Event.tool_name,
+    Event.timestamp,
+    Event.environment,
+    Event.model_version,
+    Event.prompt_version,
+    Event.input_hash,
+    Event.output_hash,
+    Event.previous_event_hash,
+    Event.event_hash,
+    Event.sequence,
+)
+
+FIELDNAMES = [column.key for column in EXPORT_COLUMNS]
+
+# Rows fetched per cursor round trip and encoded per response chunk
+CHUNK_ROWS = 1000
+
+MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv",
+    ExportFormat.JSON: "application/json",
+    ExportFormat.NDJSON: "application/x-ndjson",
+}
+
 
 @router.get("")
 async def export_events(
@@ -23,116 +50,154 @@ async def export_events(
     action_type: Optional[str] = Query(None, description="Filter by action type"),
     start_time: Optional[datetime] = Query(None, description="Filter events after this time"),
     end_time: Optional[datetime] = Query(None, description="Filter events before this time"),
-    db: Session = Depends(get_db),
-    api_key: str = Depends(verify_api_key)
+    gzip: bool = Query(False, description="Compress the response with gzip"),
+    api_key: ApiKey = Depends(verify_api_key)
 ):
     """
-    Export events as CSV or JSON.
+    Export events as CSV, JSON or NDJSON.
     
     Supports the same filters as the list endpoint.
-    Returns a downloadable file.
+    Returns a downloadable file. Rows are streamed from a database
+    cursor as they are encoded, so memory use doesn't depend on the
+    size of the export. A single agent's export is read in sequence
+    order along the (agent_id, sequence) index once all of its events
+    are numbered.
     """
-    query = db.query(Event)
-    
-    # Apply filters
+    check_agent_access(api_key, agent_id or None)
+    criteria = []
     if agent_id:
-        query = query.filter(Event.agent_id == agent_id)
+        criteria.append(Event.agent_id == agent_id)
     if action_type:
-        query = query.filter(Event.action_type == action_type)
+        criteria.append(Event.action_type == action_type)
     if start_time:
-        query = query.filter(Event.timestamp >= start_time)
+        criteria.append(Event.timestamp >= start_time)
     if end_time:
-        query = query.filter(Event.timestamp <= end_time)
-    
-    events = query.order_by(Event.timestamp).all()
+        criteria.append(Event.timestamp <= end_time)
     
     if format == ExportFormat.CSV:
-        return _export_csv(events)
+        body = _encode_csv(_stream_rows(criteria, agent_id))
+    elif format == ExportFormat.NDJSON:
+        body = _encode_ndjson(_stream_rows(criteria, agent_id))
     else:
-        return _export_json(events)
-
-
-def _export_csv(events: list[Event]) -> StreamingResponse:
-    """Generate CSV export."""
-    output = io.StringIO()
+        body = _encode_json(_stream_rows(criteria, agent_id))
     
-    fieldnames = [
-        "event_id",
-        "agent_id",
-        "action_type",
-        "tool_name",
-        "timestamp",
-        "environment",
-        "model_version",
-        "prompt_version",
-        "input_hash",
-        "output_hash",
-        "previous_event_hash",
-        "event_hash"
-    ]
+    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    filename = f"events_export_{timestamp}.{format.value}"
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
     
-    writer = csv.DictWriter(output, fieldnames=fieldnames)
-    writer.writeheader()
+    if gzip:
+        body = _gzip(body)
+        headers["Content-Encoding"] = "gzip"
     
-    for event in events:
-        writer.writerow({
-            "event_id": event.event_id,
-            "agent_id": event.agent_id,
-            "action_type": event.action_type,
-            "tool_name": event.tool_name or "",
-            "timestamp": event.timestamp.isoformat(),
-            "environment": event.environment or "",
-            "model_version": event.model_version or "",
-            "prompt_version": event.prompt_version or "",
-            "input_hash": event.input_hash,
-            "output_hash": event.output_hash,
-            "previous_event_hash": event.previous_event_hash or "",
-            "event_hash": event.event_hash
-        })
+    return StreamingResponse(body, media_type=MEDIA_TYPES[format], headers=headers)
+
+
+def _stream_rows(criteria: list, agent_id: Optional[str]) -> Iterator:
+    """
+    Yield matching events as tuples through a server-side cursor.
+    
+    The session is opened here rather than taken from get_db: dependency
+    cleanup runs before a streaming body is sent, so the generator has
+    to own its connection.
+    """
+    db = SessionLocal()
+    try:
+        # Same order either way: timestamps increase with sequence within a
+        # chain. Events sequence-backfill hasn't numbered yet only have the latter.
+        if agent_id and not has_unsequenced_events(db, agent_id):
+            order_by = (Event.sequence,)
+        else:
+            order_by = (Event.timestamp, Event.event_id)
+        query = (
+            db.query(*EXPORT_COLUMNS)
+            .filter(*criteria)
+            .order_by(*order_by)
+            .execution_options(yield_per=CHUNK_ROWS)
+        )
+        yield from query
+    finally:
+        db.close()
+
+
+def _event_dict(row) -> dict:
+    """Convert an exported row to the JSON representation of an event."""
+    event = row._asdict()
+    event["timestamp"] = row.timestamp.isoformat()
+    return event
+
+
+def _encode_csv(rows: Iterator) -> Iterator[str]:
+    """Encode rows as CSV, one chunk per CHUNK_ROWS rows."""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(FIELDNAMES)
     
-    output.seek(0)
+    count = 0
+    for row in rows:
+        writer.writerow([
+            row.event_id,
+            row.agent_id,
+            row.action_type,
+            row.tool_name or "",
+            row.timestamp.isoformat(),
+            row.environment or "",
+            row.model_version or "",
+            row.prompt_version or "",
+            row.input_hash,
+            row.output_hash,
+            row.previous_event_hash or "",
+            row.event_hash,
+            "" if row.sequence is None else row.sequence
+        ])
+        count += 1
+        if count % CHUNK_ROWS == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
     
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    filename = f"events_export_{timestamp}.csv"
+    yield output.getvalue()
+
+
+def _encode_json(rows: Iterator) -> Iterator[str]:
+    """
+    Encode rows as one JSON document.
     
-    return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
-
-
-def _export_json(events: list[Event]) -> StreamingResponse:
-    """Generate JSON export."""
-    data = {
-        "exported_at": datetime.utcnow().isoformat(),
-        "total_events": len(events),
-        "events": [
-            {
-                "event_id": e.event_id,
-                "agent_id": e.agent_id,
-                "action_type": e.action_type,
-                "tool_name": e.tool_name,
-                "timestamp": e.timestamp.isoformat(),
-                "environment": e.environment,
-                "model_version": e.model_version,
-                "prompt_version": e.prompt_version,
-                "input_hash": e.input_hash,
-                "output_hash": e.output_hash,
-                "previous_event_hash": e.previous_event_hash,
-                "event_hash": e.event_hash
-            }
-            for e in events
-        ]
-    }
+    total_events comes after the events array because the count is only
+    known once the cursor is exhausted.
+    """
+    yield '{"exported_at": ' + json.dumps(datetime.utcnow().isoformat()) + ', "events": [\n'
     
-    output = json.dumps(data, indent=2)
+    count = 0
+    chunk = []
+    for row in rows:
+        chunk.append(("  " if count == 0 else ",\n  ") + json.dumps(_event_dict(row)))
+        count += 1
+        if len(chunk) >= CHUNK_ROWS:
+            yield ''.join(chunk)
+            chunk = []
     
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    filename = f"events_export_{timestamp}.json"
+    chunk.append('\n], "total_events": ' + str(count) + '}\n')
+    yield ''.join(chunk)
+
+
+def _encode_ndjson(rows: Iterator) -> Iterator[str]:
+    """Encode rows as newline-delimited JSON, one event per line."""
+    chunk = []
+    for row in rows:
+        chunk.append(json.dumps(_event_dict(row), separators=(',', ':')) + '\n')
+        if len(chunk) >= CHUNK_ROWS:
+            yield ''.join(chunk)
+            chunk = []
     
-    return StreamingResponse(
-        iter([output]),
-        media_type="application/json",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
\ No newline at end of file
+    if chunk:
+        yield ''.join(chunk)
+
+
+def _gzip(chunks: Iterator[str]) -> Iterator[bytes]:
+    """Compress a stream of text chunks into a gzip stream."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,197 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from pydantic import BaseModel
+
+from app.database import get_db
+from app.auth import ApiKey, check_agent_access, verify_api_key
+from app.db_models import ChainHead, Event, MerkleNode
+from app.mmr import (
+    root_and_peaks,
+    inclusion_proof,
+    consistency_proof,
+    leaf_index_at,
+    hash_leaf,
+)
+
+router = APIRouter(prefix="/proofs", tags=["proofs"])
+
+
+class ProofStep(BaseModel):
+    """One sibling hash on the path from a node to its peak."""
+    position: int
+    hash: str
+    side: str
+
+
+class RootResponse(BaseModel):
+    """Current Merkle Mountain Range root for an agent."""
+    agent_id: str
+    leaf_count: int
+    root: Optional[str]
+    peaks: List[str]
+
+
+class InclusionProofResponse(BaseModel):
+    """Proof that an event is leaf leaf_index of the MMR with leaf_count leaves."""
+    event_id: str
+    agent_id: str
+    event_hash: str
+    leaf_index: int
+    leaf_count: int
+    leaf_hash: str
+    path: List[ProofStep]
+    peaks: List[str]
+    root: str
+
+
+class ConsistencyProofResponse(BaseModel):
+    """Proof that the MMR at new_size leaves extends the one at old_size."""
+    agent_id: str
+    old_size: int
+    new_size: int
+    old_root: str
+    new_root: str
+    old_peaks: List[str]
+    new_peaks: List[str]
+    paths: List[List[ProofStep]]
+
+
+def _leaf_count(db: Session, agent_id: str) -> int:
+    head = db.query(ChainHead).filter(ChainHead.agent_id == agent_id).first()
+    if head is None or not head.sequence:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No events for agent {agent_id}"
+        )
+    return head.sequence
+
+
+def _index_missing(error: LookupError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"{error}. Catch the index up with: python -m app.cli mmr-rebuild"
+    )
+
+
+def _check_size(size: Optional[int], leaf_count: int, name: str) -> int:
+    if size is None:
+        return leaf_count
+    if not 1 <= size <= leaf_count:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{name} must be between 1 and {leaf_count}"
+        )
+    return size
+
+
+@router.get("/root", response_model=RootResponse)
+def get_root(
+    agent_id: str = Query(..., description="Agent ID"),
+    db: Session = Depends(get_db),
+    api_key: ApiKey = Depends(verify_api_key)
+):
+    """
+    Get the current Merkle Mountain Range root over an agent's events.
+
+    The root commits to every event_hash in chain order. Auditors can
+    record it and later ask for consistency proofs against newer roots.
+    """
+    check_agent_access(api_key, agent_id)
+    leaf_count = _leaf_count(db, agent_id)
+    try:
+        root, peaks = root_and_peaks(db, agent_id, leaf_count)
+    except LookupError as e:
+        raise _index_missing(e)
+
+    return RootResponse(agent_id=agent_id, leaf_count=leaf_count, root=root, peaks=peaks)
+
+
+@router.get("/inclusion/{event_id}", response_model=InclusionProofResponse)
+def get_inclusion_proof(
+    event_id: str,
+    size: Optional[int] = Query(None, description="Prove against the root at this many events (default: current)"),
+    db: Session = Depends(get_db),
+    api_key: ApiKey = Depends(verify_api_key)
+):
+    """
+    Prove that an event is part of its agent's history in O(log n) hashes.
+
+    Check the result with app.mmr.verify_inclusion (or an equivalent
+    implementation): climb from the leaf hash along path to a peak, then
+    bag the peaks and compare with root.
+    """
+    leaf = db.query(MerkleNode).filter(MerkleNode.event_id == event_id).first()
+    event = db.query(Event.agent_id, Event.event_hash).filter(Event.event_id == event_id).first()
+    if event is None or not api_key.allows(event.agent_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Event {event_id} not found"
+        )
+    if leaf is None:
+        raise _index_missing(LookupError(f"MMR index for {event.agent_id} does not include event {event_id}"))
+
+    leaf_index = leaf_index_at(leaf.position)
+    leaf_count = _check_size(size, _leaf_count(db, leaf.agent_id), "size")
+    if leaf_index >= leaf_count:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Event {event_id} is leaf {leaf_index}, not within the first {leaf_count} events"
+        )
+
+    try:
+        path = inclusion_proof(db, leaf.agent_id, leaf_index, leaf_count)
+        root, peaks = root_and_peaks(db, leaf.agent_id, leaf_count)
+    except LookupError as e:
+        raise _index_missing(e)
+
+    return InclusionProofResponse(
+        event_id=event_id,
+        agent_id=leaf.agent_id,
+        event_hash=event.event_hash,
+        leaf_index=leaf_index,
+        leaf_count=leaf_count,
+        leaf_hash=hash_leaf(event.event_hash),
+        path=path,
+        peaks=peaks,
+        root=root
+    )
+
+
+@router.get("/consistency", response_model=ConsistencyProofResponse)
+def get_consistency_proof(
+    agent_id: str = Query(..., description="Agent ID"),
+    old_size: int = Query(..., ge=1, description="Event count of the earlier root"),
+    new_size: Optional[int] = Query(None, description="Event count of the later root (default: current)"),
+    db: Session = Depends(get_db),
+    api_key: ApiKey = Depends(verify_api_key)
+):
+    """
+    Prove that the agent's history at new_size extends the one at old_size.
+
+    Nothing recorded up to old_size was changed or removed if every old
+    peak climbs to a new peak along its path. Check the result with
+    app.mmr.verify_consistency.
+    """
+    check_agent_access(api_key, agent_id)
+    leaf_count = _leaf_count(db, agent_id)
+    new_size = _check_size(new_size, leaf_count, "new_size")
+    old_size = _check_size(old_size, new_size, "old_size")
+
+    try:
+        old_root, old_peaks = root_and_peaks(db, agent_id, old_size)
+        new_root, new_peaks = root_and_peaks(db, agent_id, new_size)
+        paths = consistency_proof(db, agent_id, old_size, new_size)
+    except LookupError as e:
+        raise _index_missing(e)
+
+    return ConsistencyProofResponse(
+        agent_id=agent_id,
+        old_size=old_size,
+        new_size=new_size,
+        old_root=old_root,
+        new_root=new_root,
+        old_peaks=old_peaks,
+        new_peaks=new_peaks,
+        paths=paths
+    )
@@ -1,15 +1,18 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime, timezone
+from typing import List, Optional
 from pydantic import BaseModel
 
 from app.database import get_db
-from app.auth import verify_api_key
+from app.auth import ApiKey, check_agent_access, verify_api_key
 from app.models import VerifyResponse
-from app.hash_chain import verify_chain
+from app.hash_chain import verify_chain, find_sequence_gaps, CHAIN_COLUMNS, _as_utc
 from app.archive import get_archive_writer
-from app.db_models import Event
+from app.db_models import Event, VerificationJob, VerificationResult, ReconciliationJob, ReconciliationDiscrepancy
+from app.fleet import create_job, start_job
+from app import reconcile
+from app.sealing import archive_digest, day_bounds, get_seal, is_closed, seal_day
 
 router = APIRouter(prefix="/verify", tags=["verify"])
 
@@ -24,15 +27,113 @@ class ArchiveVerifyResponse(BaseModel):
     mismatches: int
     missing_in_archive: int
     error_message: Optional[str] = None
+    method: str = "rows"
+    sealed: bool = False
+
+
+class ArchiveEventVerifyResponse(BaseModel):
+    """Response for verifying a single event against its archived copy."""
+    event_id: str
+    agent_id: str
+    date: str
+    in_archive: bool
+    is_valid: bool
+    mismatched_fields: List[str] = []
+    error_message: Optional[str] = None
+
+
+class VerifyJobResponse(BaseModel):
+    """Progress of a fleet-wide verification job."""
+    job_id: str
+    status: str
+    full: bool
+    total_agents: int
+    completed_agents: int
+    invalid_agents: int
+    events_checked: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    error_message: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class VerifyJobSummaryResponse(BaseModel):
+    """Broken chains found by a fleet-wide verification job."""
+    job: VerifyJobResponse
+    broken: List[VerifyResponse]
+
+
+class ReconcileJobResponse(BaseModel):
+    """Progress of a DB-vs-archive reconciliation job."""
+    job_id: str
+    status: str
+    start_date: str
+    end_date: str
+    agent_id: Optional[str] = None
+    total_days: int
+    completed_days: int
+    discrepant_days: int
+    db_events: int
+    archive_events: int
+    missing_in_archive: int
+    extra_in_archive: int
+    mismatched: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    error_message: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ReconcileDiscrepancyResponse(BaseModel):
+    """One agent/day that didn't reconcile."""
+    agent_id: str
+    day: str
+    db_events: int
+    archive_events: int
+    missing_in_archive: int
+    extra_in_archive: int
+    mismatched: int
+    first_missing_event_id: Optional[str] = None
+    first_extra_event_id: Optional[str] = None
+    first_mismatched_event_id: Optional[str] = None
+    error_message: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
+class ReconcileSummaryResponse(BaseModel):
+    """Agent/days with discrepancies found by a reconciliation job."""
+    job: ReconcileJobResponse
+    discrepancies: List[ReconcileDiscrepancyResponse]
+
+
+class SequenceGap(BaseModel):
+    """A run of missing sequence numbers in an agent's chain."""
+    after_sequence: int
+    next_sequence: int
+    missing: int
+
+
+class SequenceGapsResponse(BaseModel):
+    """Missing events found from sequence numbers alone."""
+    agent_id: str
+    is_complete: bool
+    gaps: List[SequenceGap]
 
 
 @router.get("", response_model=VerifyResponse)
-async def verify_integrity(
+def verify_integrity(
     agent_id: str = Query(..., description="Agent ID to verify"),
     start_time: Optional[datetime] = Query(None, description="Start of time range (ISO format)"),
     end_time: Optional[datetime] = Query(None, description="End of time range (ISO format)"),
+    full: bool = Query(False, description="Rehash the whole chain instead of resuming from the last checkpoint"),
     db: Session = Depends(get_db),
-    api_key: str = Depends(verify_api_key)
+    api_key: ApiKey = Depends(verify_api_key)
 ):
     """
     Verify the integrity of the event chain for an agent.
@@ -41,13 +142,18 @@ async def verify_integrity(
     1. Each event's hash matches its content
     2. Each event's previous_event_hash correctly references the prior event
     
+    Without a time range, only events added since the last successful
+    verification are rehashed. Use full=true for a complete audit pass.
+    
     Returns verification status and details about any chain breaks.
     """
-    is_valid, events_checked, first_invalid_event_id, error_message = verify_chain(
+    check_agent_access(api_key, agent_id)
+    is_valid, events_checked, first_invalid_event_id, error_message, mode = verify_chain(
         db=db,
         agent_id=agent_id,
         start_time=start_time,
-        end_time=end_time
+        end_time=end_time,
+        full=full
     )
     
     return VerifyResponse(
@@ -55,24 +161,129 @@ async def verify_integrity(
         is_valid=is_valid,
         events_checked=events_checked,
         first_invalid_event_id=first_invalid_event_id,
-        error_message=error_message
+        error_message=error_message,
+        mode=mode
+    )
+
+
+@router.get("/gaps", response_model=SequenceGapsResponse)
+def verify_sequence_gaps(
+    agent_id: str = Query(..., description="Agent ID to check"),
+    limit: int = Query(100, ge=1, le=10000, description="Max gaps to return"),
+    db: Session = Depends(get_db),
+    api_key: ApiKey = Depends(verify_api_key)
+):
+    """
+    Find deleted or missing events by their sequence numbers.
+    
+    Reads only the (agent_id, sequence) index; nothing is rehashed, so
+    this is a cheap completeness check between full verifications. It
+    doesn't detect modified events; use GET /verify for that.
+    """
+    check_agent_access(api_key, agent_id)
+    gaps = find_sequence_gaps(db, agent_id, limit=limit)
+    return SequenceGapsResponse(
+        agent_id=agent_id,
+        is_complete=not gaps,
+        gaps=[
+            SequenceGap(after_sequence=after, next_sequence=following, missing=following - after - 1)
+            for after, following in gaps
+        ]
+    )
+
+
+@router.post("/all", response_model=VerifyJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def start_fleet_verification(
+    full: bool = Query(False, description="Rehash every chain instead of resuming from checkpoints"),
+    db: Session = Depends(get_db),
+    api_key: ApiKey = Depends(verify_api_key)
+):
+    """
+    Start verifying every agent's chain in the background.
+    
+    Agents are verified concurrently (VERIFY_CONCURRENCY at a time) and
+    each result is stored as it finishes. Poll GET /verify/all/{job_id}
+    for progress and GET /verify/all/{job_id}/summary for broken chains.
+    """
+    check_agent_access(api_key, None)
+    job = create_job(db, full=full)
+    start_job(job.job_id)
+    return VerifyJobResponse.model_validate(job)
+
+
+def _get_job(db: Session, job_id: str) -> VerificationJob:
+    job = db.query(VerificationJob).filter(VerificationJob.job_id == job_id).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Verification job {job_id} not found"
+        )
+    return job
+
+
+@router.get("/all/{job_id}", response_model=VerifyJobResponse)
+def get_fleet_verification(
+    job_id: str,
+    db: Session = Depends(get_db),
+    api_key: ApiKey = Depends(verify_api_key)
+):
+    """Get the progress of a fleet-wide verification job."""
+    check_agent_access(api_key, None)
+    return VerifyJobResponse.model_validate(_get_job(db, job_id))
+
+
+@router.get("/all/{job_id}/summary", response_model=VerifyJobSummaryResponse)
+def get_fleet_verification_summary(
+    job_id: str,
+    db: Session = Depends(get_db),
+    api_key: ApiKey = Depends(verify_api_key)
+):
+    """List the agents whose chains failed verification in a job."""
+    check_agent_access(api_key, None)
+    job = _get_job(db, job_id)
+    broken = (
+        db.query(VerificationResult)
+        .filter(VerificationResult.job_id == job_id, VerificationResult.is_valid.is_(False))
+        .order_by(VerificationResult.agent_id)
+        .all()
+    )
+    
+    return VerifyJobSummaryResponse(
+        job=VerifyJobResponse.model_validate(job),
+        broken=[
+            VerifyResponse(
+                agent_id=r.agent_id,
+                is_valid=r.is_valid,
+                events_checked=r.events_checked,
+                first_invalid_event_id=r.first_invalid_event_id,
+                error_message=r.error_message,
+                mode="full" if job.full else "incremental"
+            )
+            for r in broken
+        ]
     )
 
 
 @router.get("/archive", response_model=ArchiveVerifyResponse)
-async def verify_archive(
+def verify_archive(
     agent_id: str = Query(..., description="Agent ID to verify"),
     date: str = Query(..., description="Date to verify (YYYY-MM-DD format)"),
     db: Session = Depends(get_db),
-    api_key: str = Depends(verify_api_key)
+    api_key: ApiKey = Depends(verify_api_key)
 ):
     """
     Verify that archive files match database records for a given agent and date.
     
-    Compares event_hash values between DB and archive to detect:
+    Sealed days (see python -m app.cli seal) are checked by comparing the
+    archive file's digest with the sealed one, without reading the events
+    back from the database. Unsealed days, and sealed days whose digest
+    differs, are compared row by row to detect:
     - Events in DB but missing from archive
     - Hash mismatches between DB and archive
+    
+    A closed day that passes the row-level check is sealed on the way out.
     """
+    check_agent_access(api_key, agent_id)
     try:
         verify_date = datetime.strptime(date, "%Y-%m-%d")
     except ValueError:
@@ -87,18 +298,35 @@ async def verify_archive(
             error_message="Invalid date format. Use YYYY-MM-DD."
         )
     
+    archive_writer = get_archive_writer()
+    day = verify_date.date()
+    
+    seal = get_seal(db, agent_id, day)
+    if seal is not None:
+        archive_events, archive_root = archive_digest(archive_writer, agent_id, day)
+        if archive_events == seal.event_count and archive_root == seal.root:
+            return ArchiveVerifyResponse(
+                agent_id=agent_id,
+                date=date,
+                is_valid=True,
+                db_events=seal.event_count,
+                archive_events=archive_events,
+                mismatches=0,
+                missing_in_archive=0,
+                method="digest",
+                sealed=True
+            )
+    
     # Get events from DB for this agent and date
-    start_of_day = verify_date.replace(hour=0, minute=0, second=0, microsecond=0)
-    end_of_day = verify_date.replace(hour=23, minute=59, second=59, microsecond=999999)
+    start_of_day, end_of_day = day_bounds(day)
     
-    db_events = db.query(Event).filter(
+    db_events = db.query(Event.event_id, Event.event_hash).filter(
         Event.agent_id == agent_id,
         Event.timestamp >= start_of_day,
         Event.timestamp <= end_of_day
     ).all()
     
     # Get events from archive
-    archive_writer = get_archive_writer()
     archive_events = archive_writer.read_events(agent_id, verify_date)
     
     # Build lookup of archive events by event_hash
@@ -126,6 +354,15 @@ async def verify_archive(
         if mismatches > 0:
             errors.append(f"{mismatches} hash mismatches")
         error_message = "; ".join(errors)
+    elif seal is not None:
+        # Rows match but the digest didn't: the archive holds extra lines
+        is_valid = False
+        error_message = (
+            f"Archive digest does not match seal "
+            f"({len(archive_events)} archived events, {seal.event_count} sealed)"
+        )
+    elif db_events and is_closed(day):
+        seal = seal_day(db, agent_id, day, archive_writer)
     
     return ArchiveVerifyResponse(
         agent_id=agent_id,
@@ -135,5 +372,128 @@ async def verify_archive(
         archive_events=len(archive_events),
         mismatches=mismatches,
         missing_in_archive=missing_in_archive,
-        error_message=error_message
-    )
\ No newline at end of file
+        error_message=error_message,
+        method="rows",
+        sealed=seal is not None
+    )
+
+
+@router.get("/archive/event/{event_id}", response_model=ArchiveEventVerifyResponse)
+def verify_archived_event(
+    event_id: str,
+    db: Session = Depends(get_db),
+    api_key: ApiKey = Depends(verify_api_key)
+):
+    """
+    Verify one event against its archived copy.
+    
+    With the segment archive format, compressed segments are searched
+    through their index, so only one chunk of one file is read.
+    """
+    event = db.query(*CHAIN_COLUMNS).filter(Event.event_id == event_id).first()
+    if event is None or not api_key.allows(event.agent_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Event {event_id} not found"
+        )
+    
+    timestamp = _as_utc(event.timestamp).astimezone(timezone.utc)
+    archived = get_archive_writer().find_event(event.agent_id, timestamp, event_id)
+    day = timestamp.strftime("%Y-%m-%d")
+    if archived is None:
+        return ArchiveEventVerifyResponse(
+            event_id=event_id,
+            agent_id=event.agent_id,
+            date=day,
+            in_archive=False,
+            is_valid=False,
+            error_message="Event missing from archive"
+        )
+    
+    mismatched_fields = [
+        field for field, value in event._mapping.items()
+        if field != "timestamp" and archived.get(field) != value
+    ]
+    try:
+        if _as_utc(datetime.fromisoformat(archived.get("timestamp"))) != timestamp:
+            mismatched_fields.append("timestamp")
+    except (TypeError, ValueError):
+        mismatched_fields.append("timestamp")
+    
+    return ArchiveEventVerifyResponse(
+        event_id=event_id,
+        agent_id=event.agent_id,
+        date=day,
+        in_archive=True,
+        is_valid=not mismatched_fields,
+        mismatched_fields=mismatched_fields,
+        error_message=f"Archived copy differs in: {', '.join(mismatched_fields)}" if mismatched_fields else None
+    )
+
+
+@router.post("/reconcile", response_model=ReconcileJobResponse, status_code=status.HTTP_202_ACCEPTED)
+def start_reconciliation(
+    start_date: date = Query(..., description="First day to reconcile (YYYY-MM-DD)"),
+    end_date: date = Query(..., description="Last day to reconcile (YYYY-MM-DD)"),
+    agent_id: Optional[str] = Query(None, description="Only this agent (default: every agent)"),
+    db: Session = Depends(get_db),
+    api_key: ApiKey = Depends(verify_api_key)
+):
+    """
+    Start reconciling the database against the archive in the background.
+    
+    Every agent/day in the range is merge-joined in both directions:
+    events missing from the archive, archive lines with no DB event, and
+    events whose fields differ. Poll GET /verify/reconcile/{job_id} for
+    progress and GET /verify/reconcile/{job_id}/summary for discrepancies.
+    """
+    check_agent_access(api_key, agent_id)
+    if end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="end_date must not be before start_date"
+        )
+    job = reconcile.create_job(db, start_date, end_date, agent_id)
+    reconcile.start_job(job.job_id)
+    return ReconcileJobResponse.model_validate(job)
+
+
+def _get_reconcile_job(db: Session, job_id: str, api_key: ApiKey) -> ReconciliationJob:
+    job = db.query(ReconciliationJob).filter(ReconciliationJob.job_id == job_id).first()
+    if not job or not api_key.allows(job.agent_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Reconciliation job {job_id} not found"
+        )
+    return job
+
+
+@router.get("/reconcile/{job_id}", response_model=ReconcileJobResponse)
+def get_reconciliation(
+    job_id: str,
+    db: Session = Depends(get_db),
+    api_key: ApiKey = Depends(verify_api_key)
+):
+    """Get the progress of a reconciliation job."""
+    return ReconcileJobResponse.model_validate(_get_reconcile_job(db, job_id, api_key))
+
+
+@router.get("/reconcile/{job_id}/summary", response_model=ReconcileSummaryResponse)
+def get_reconciliation_summary(
+    job_id: str,
+    db: Session = Depends(get_db),
+    api_key: ApiKey = Depends(verify_api_key)
+):
+    """List the agent/days whose database and archive disagree."""
+    job = _get_reconcile_job(db, job_id, api_key)
+    discrepancies = (
+        db.query(ReconciliationDiscrepancy)
+        .filter(ReconciliationDiscrepancy.job_id == job_id)
+        .order_by(ReconciliationDiscrepancy.agent_id, ReconciliationDiscrepancy.day)
+        .all()
+    )
+    
+    return ReconcileSummaryResponse(
+        job=ReconcileJobResponse.model_validate(job),
+        discrepancies=[ReconcileDiscrepancyResponse.model_validate(d) for d in discrepancies]
+    )
@@ -0,0 +1,116 @@
+import hashlib
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterable, Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.archive import ArchiveWriter, get_archive_writer
+from app.db_models import DailySeal, Event
+
+
+def day_bounds(day: date) -> tuple[datetime, datetime]:
+    """First and last representable instants of a UTC day."""
+    start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    return start, start + timedelta(days=1) - timedelta(microseconds=1)
+
+
+def is_closed(day: date) -> bool:
+    """A day can be sealed once it is over in UTC."""
+    return day < datetime.now(timezone.utc).date()
+
+
+def digest_hashes(event_hashes: Iterable[str]) -> tuple[int, str]:
+    """
+    Digest a day's event hashes: SHA-256 over the raw 32-byte hashes in
+    sorted order.
+    
+    Sorting makes the digest independent of the order lines were
+    appended to the archive (workers may append in a different order
+    than they committed). Returns (event_count, hex digest).
+    """
+    hashes = sorted(event_hashes)
+    digest = hashlib.sha256()
+    for event_hash in hashes:
+        digest.update(bytes.fromhex(event_hash))
+    return len(hashes), digest.hexdigest()
+
+
+def db_digest(db: Session, agent_id: str, day: date) -> tuple[int, str]:
+    """Digest of the day's events as stored in the database."""
+    start_of_day, end_of_day = day_bounds(day)
+    rows = (
+        db.query(Event.event_hash)
+        .filter(
+            Event.agent_id == agent_id,
+            Event.timestamp >= start_of_day,
+            Event.timestamp <= end_of_day
+        )
+        .execution_options(yield_per=5000)
+    )
+    return digest_hashes(row.event_hash for row in rows)
+
+
+def archive_digest(archive_writer: ArchiveWriter, agent_id: str, day: date) -> tuple[int, str]:
+    """Digest of the day's events as stored in the archive file."""
+    archive_date = datetime.combine(day, time.min)
+    return digest_hashes(e["event_hash"] for e in archive_writer.iter_events(agent_id, archive_date))
+
+
+def get_seal(db: Session, agent_id: str, day: date) -> Optional[DailySeal]:
+    return db.query(DailySeal).filter(
+        DailySeal.agent_id == agent_id,
+        DailySeal.day == day.isoformat()
+    ).first()
+
+
+def seal_day(db: Session, agent_id: str, day: date, archive_writer: ArchiveWriter = None) -> Optional[DailySeal]:
+    """
+    Seal one agent's closed day: store the DB digest and write the sidecar.
+    
+    The database is the source of truth, so the seal always reflects the
+    DB rows; a differing archive shows up when the archive is verified.
+    Returns the existing seal if the day is already sealed, or None if
+    the day hasn't closed yet.
+    """
+    if not is_closed(day):
+        return None
+    
+    seal = get_seal(db, agent_id, day)
+    if seal is None:
+        event_count, root = db_digest(db, agent_id, day)
+        seal = DailySeal(
+            agent_id=agent_id,
+            day=day.isoformat(),
+            event_count=event_count,
+            root=root,
+            sealed_at=datetime.now(timezone.utc)
+        )
+        try:
+            db.add(seal)
+            db.commit()
+        except IntegrityError:
+            # Sealed concurrently; use that one
+            db.rollback()
+            seal = get_seal(db, agent_id, day)
+    
+    archive_writer = archive_writer or get_archive_writer()
+    archive_writer.write_seal(agent_id, datetime.combine(day, time.min), {
+        "agent_id": seal.agent_id,
+        "date": seal.day,
+        "event_count": seal.event_count,
+        "root": seal.root,
+        "sealed_at": seal.sealed_at.isoformat()
+    })
+    return seal
+
+
+def agents_active_on(db: Session, day: date) -> list[str]:
+    """Agents with at least one event on a UTC day."""
+    start_of_day, end_of_day = day_bounds(day)
+    rows = (
+        db.query(Event.agent_id)
+        .filter(Event.timestamp >= start_of_day, Event.timestamp <= end_of_day)
+        .distinct()
+        .order_by(Event.agent_id)
+    )
+    return [row.agent_id for row in rows]
@@ -0,0 +1,361 @@
+"""
+Binary archive segment format.
+
+A segment file is a sequence of self-contained blocks, one per append.
+Each block carries its own interned string table, so appending never
+needs to read the existing file and a torn final block (crash mid-write)
+is detected by its checksum and skipped.
+
+Block layout (little-endian):
+
+    header   magic "ALB1", string count (u32), string bytes (u32),
+             record count (u32)
+    strings  string count x u16 lengths, then the UTF-8 bytes
+    records  record count x RECORD (fixed width, see below)
+    crc32    u32 over everything after the magic
+
+Record (177 bytes, vs ~600 for a JSON line):
+
+    event_id             16  raw UUID
+    timestamp             8  int64 microseconds since the Unix epoch (UTC)
+    agent_id ... prompt   4  x 6 string indexes (NULL_STRING = None)
+    input_hash           32  raw SHA-256
+    output_hash          32
+    previous_event_hash  32  (zeroes when flags has no HAS_PREVIOUS)
+    event_hash           32
+    flags                 1
+
+Readers memory-map the file and unpack records in place.
+
+Sealed segments are compacted into a compressed file plus an index:
+
+    .segz    chunks of whole blocks, each zlib-compressed on its own:
+             magic "ALZ1", raw bytes (u32), compressed bytes (u32),
+             record count (u32), data, crc32 of data (u32)
+    .idx     magic "ALI1", event count (u32), chunk count (u32), then
+             chunk count x (first sequence u64, file offset u64), then
+             event count x (raw event_id 16, sequence u32) sorted by id
+
+Sequences are record positions within the segment. The index lets a
+reader seek to a sequence range or a single event_id by decompressing
+one chunk instead of the whole file.
+"""
+import bisect
+import mmap
+import os
+import struct
+import uuid
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+MAGIC = b"ALB1"
+BLOCK_HEADER = struct.Struct("<4sIII")
+STRING_LENGTH = struct.Struct("<H")
+RECORD = struct.Struct("<16sq6I32s32s32s32sB")
+CRC = struct.Struct("<I")
+RECORD_EVENT_ID = struct.Struct(f"<16s{RECORD.size - 16}x")
+
+CHUNK_MAGIC = b"ALZ1"
+CHUNK_HEADER = struct.Struct("<4sIII")
+INDEX_MAGIC = b"ALI1"
+INDEX_HEADER = struct.Struct("<4sII")
+INDEX_CHUNK = struct.Struct("<QQ")
+INDEX_ENTRY = struct.Struct("<16sI")
+
+# Raw bytes per compressed chunk: big enough to compress well, small
+# enough that a point lookup only inflates a little
+CHUNK_BYTES = 64 * 1024
+
+NULL_STRING = 0xFFFFFFFF
+HAS_PREVIOUS = 0x01
+NO_HASH = bytes(32)
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Fields stored as string table indexes, in record order
+STRING_FIELDS = ("agent_id", "action_type", "tool_name", "environment", "model_version", "prompt_version")
+
+
+class CorruptSegment(Exception):
+    """A segment block failed its structural or checksum checks."""
+
+
+def _to_micros(timestamp: datetime) -> int:
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    delta = timestamp - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _from_micros(micros: int) -> datetime:
+    return EPOCH + timedelta(microseconds=micros)
+
+
+def encode_block(events: Iterable) -> bytes:
+    """
+    Encode events (anything with Event's attributes) as one block.
+
+    Raises ValueError if an event_id isn't a UUID or a hash isn't 64 hex
+    characters, since those can't be stored losslessly.
+    """
+    strings: dict[str, int] = {}
+    records = []
+
+    def intern(value) -> int:
+        if value is None:
+            return NULL_STRING
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+
+    for event in events:
+        previous = event.previous_event_hash
+        records.append(RECORD.pack(
+            uuid.UUID(event.event_id).bytes,
+            _to_micros(event.timestamp),
+            *(intern(getattr(event, field)) for field in STRING_FIELDS),
+            bytes.fromhex(event.input_hash),
+            bytes.fromhex(event.output_hash),
+            bytes.fromhex(previous) if previous else NO_HASH,
+            bytes.fromhex(event.event_hash),
+            HAS_PREVIOUS if previous else 0
+        ))
+
+    encoded = [s.encode("utf-8") for s in strings]
+    body = b"".join([
+        BLOCK_HEADER.pack(MAGIC, len(encoded), sum(len(s) for s in encoded), len(records))[4:],
+        b"".join(STRING_LENGTH.pack(len(s)) for s in encoded),
+        *encoded,
+        *records,
+    ])
+    return MAGIC + body + CRC.pack(zlib.crc32(body))
+
+
+def _block_spans(view: memoryview) -> Iterator[tuple[int, int, int, int, int, int]]:
+    """
+    Yield (start, end, strings_at, string_count, records_at, record_count)
+    for each complete block; end includes the checksum.
+
+    Stops quietly at a truncated final block; raises CorruptSegment for a
+    bad block in the middle of the buffer.
+    """
+    offset = 0
+    end = len(view)
+    while offset < end:
+        if end - offset < BLOCK_HEADER.size:
+            return  # torn header at the tail
+        magic, string_count, string_bytes, record_count = BLOCK_HEADER.unpack_from(view, offset)
+        if magic != MAGIC:
+            raise CorruptSegment(f"Bad block magic at offset {offset}")
+
+        strings_at = offset + BLOCK_HEADER.size
+        records_at = strings_at + string_count * STRING_LENGTH.size + string_bytes
+        block_end = records_at + record_count * RECORD.size
+        if block_end + CRC.size > end:
+            return  # torn block at the tail
+
+        (crc,) = CRC.unpack_from(view, block_end)
+        if zlib.crc32(view[offset + 4:block_end]) != crc:
+            if block_end + CRC.size == end:
+                return  # torn block at the tail
+            raise CorruptSegment(f"Checksum mismatch in block at offset {offset}")
+
+        yield offset, block_end + CRC.size, strings_at, string_count, records_at, record_count
+        offset = block_end + CRC.size
+
+
+def iter_blocks(buffer) -> Iterator[tuple[list[str], memoryview]]:
+    """
+    Yield (strings, records) for each complete block in a buffer.
+
+    records is a memoryview over the block's fixed-width records.
+    """
+    view = memoryview(buffer)
+    for _, _, strings_at, string_count, records_at, record_count in _block_spans(view):
+        strings = []
+        position = strings_at + string_count * STRING_LENGTH.size
+        for i in range(string_count):
+            (length,) = STRING_LENGTH.unpack_from(view, strings_at + i * STRING_LENGTH.size)
+            strings.append(str(view[position:position + length], "utf-8"))
+            position += length
+
+        yield strings, view[records_at:records_at + record_count * RECORD.size]
+
+
+def iter_records(buffer) -> Iterator[dict]:
+    """Decode every record in a buffer into an archive record dict."""
+    for strings, records in iter_blocks(buffer):
+        for (
+            event_id, micros,
+            agent_id, action_type, tool_name, environment, model_version, prompt_version,
+            input_hash, output_hash, previous_event_hash, event_hash, flags
+        ) in RECORD.iter_unpack(records):
+            yield {
+                "event_id": str(uuid.UUID(bytes=event_id)),
+                "agent_id": strings[agent_id] if agent_id != NULL_STRING else None,
+                "action_type": strings[action_type] if action_type != NULL_STRING else None,
+                "tool_name": strings[tool_name] if tool_name != NULL_STRING else None,
+                "timestamp": _from_micros(micros).isoformat(),
+                "environment": strings[environment] if environment != NULL_STRING else None,
+                "model_version": strings[model_version] if model_version != NULL_STRING else None,
+                "prompt_version": strings[prompt_version] if prompt_version != NULL_STRING else None,
+                "input_hash": input_hash.hex(),
+                "output_hash": output_hash.hex(),
+                "previous_event_hash": previous_event_hash.hex() if flags & HAS_PREVIOUS else None,
+                "event_hash": event_hash.hex()
+            }
+
+
+def map_file(path: Path) -> Optional[mmap.mmap]:
+    """Memory-map a file read-only, or None if it is empty."""
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            return None  # mmap can't map an empty file
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def release(mapped: Optional[mmap.mmap]) -> None:
+    """Unmap a file mapped by map_file."""
+    if mapped is None:
+        return
+    try:
+        mapped.close()
+    except BufferError:
+        pass  # a caller still holds a view; unmapped when it's collected
+
+
+def compact_segment(raw_path: Path, compressed_path: Path, index_path: Path, level: int = 6) -> int:
+    """
+    Compress a sealed raw segment into chunks and write its index.
+
+    Both outputs are written to temporary files, fsynced and renamed, the
+    index first, so a reader never sees a compressed segment without its
+    index. The raw file is left for the caller to remove. Returns the
+    number of records.
+    """
+    entries: list[tuple[bytes, int]] = []
+    chunk_table: list[tuple[int, int]] = []
+    sequence = 0
+
+    compressed_tmp = compressed_path.with_name(compressed_path.name + ".tmp")
+    mapped = map_file(raw_path)
+    try:
+        with open(compressed_tmp, "wb") as out:
+            view = memoryview(mapped) if mapped is not None else memoryview(b"")
+            chunk_start = chunk_end = 0
+            chunk_records = 0
+
+            def write_chunk() -> None:
+                data = zlib.compress(view[chunk_start:chunk_end], level)
+                chunk_table.append((sequence - chunk_records, out.tell()))
+                out.write(CHUNK_HEADER.pack(CHUNK_MAGIC, chunk_end - chunk_start, len(data), chunk_records))
+                out.write(data)
+                out.write(CRC.pack(zlib.crc32(data)))
+
+            for start, end, _, _, records_at, record_count in _block_spans(view):
+                if chunk_end - chunk_start >= CHUNK_BYTES:
+                    write_chunk()
+                    chunk_start, chunk_records = start, 0
+                for (event_id,) in RECORD_EVENT_ID.iter_unpack(view[records_at:records_at + record_count * RECORD.size]):
+                    entries.append((event_id, sequence))
+                    sequence += 1
+                chunk_end = end
+                chunk_records += record_count
+            if chunk_end > chunk_start:
+                write_chunk()
+            del view
+            out.flush()
+            os.fsync(out.fileno())
+    finally:
+        release(mapped)
+
+    entries.sort()
+    index_tmp = index_path.with_name(index_path.name + ".tmp")
+    with open(index_tmp, "wb") as f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, len(entries), len(chunk_table)))
+        f.write(b"".join(INDEX_CHUNK.pack(*chunk) for chunk in chunk_table))
+        f.write(b"".join(INDEX_ENTRY.pack(*entry) for entry in entries))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(index_tmp, index_path)
+    os.replace(compressed_tmp, compressed_path)
+    return sequence
+
+
+class SegmentIndex:
+    """Sidecar index of a compressed segment (see module docstring)."""
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, self.event_count, chunk_count = INDEX_HEADER.unpack_from(data, 0)
+        if magic != INDEX_MAGIC:
+            raise CorruptSegment(f"Bad index magic in {path}")
+        chunks = list(INDEX_CHUNK.iter_unpack(data[INDEX_HEADER.size:INDEX_HEADER.size + chunk_count * INDEX_CHUNK.size]))
+        self.chunk_sequences = [first for first, _ in chunks]
+        self.chunk_offsets = [offset for _, offset in chunks]
+        self._entries = memoryview(data)[INDEX_HEADER.size + chunk_count * INDEX_CHUNK.size:]
+
+    def chunk_for(self, sequence: int) -> int:
+        """Position in the chunk table of the chunk holding a sequence."""
+        return bisect.bisect_right(self.chunk_sequences, sequence) - 1
+
+    def lookup(self, event_id: str) -> Optional[int]:
+        """Sequence of an event in this segment, or None (binary search)."""
+        try:
+            key = uuid.UUID(event_id).bytes
+        except ValueError:
+            return None
+        low, high = 0, self.event_count
+        while low < high:
+            mid = (low + high) // 2
+            entry_id, sequence = INDEX_ENTRY.unpack_from(self._entries, mid * INDEX_ENTRY.size)
+            if entry_id < key:
+                low = mid + 1
+            elif entry_id > key:
+                high = mid
+            else:
+                return sequence
+        return None
+
+
+def _read_chunk(view: memoryview, offset: int) -> tuple[bytes, int]:
+    """Inflate the chunk at an offset; returns (raw blocks, next offset)."""
+    magic, raw_bytes, compressed_bytes, _ = CHUNK_HEADER.unpack_from(view, offset)
+    if magic != CHUNK_MAGIC:
+        raise CorruptSegment(f"Bad chunk magic at offset {offset}")
+    data_at = offset + CHUNK_HEADER.size
+    data = view[data_at:data_at + compressed_bytes]
+    (crc,) = CRC.unpack_from(view, data_at + compressed_bytes)
+    if zlib.crc32(data) != crc:
+        raise CorruptSegment(f"Checksum mismatch in chunk at offset {offset}")
+    raw = zlib.decompress(data)
+    if len(raw) != raw_bytes:
+        raise CorruptSegment(f"Chunk at offset {offset} inflated to {len(raw)} bytes, expected {raw_bytes}")
+    return raw, data_at + compressed_bytes + CRC.size
+
+
+def read_compressed(buffer, index: SegmentIndex, start: int = 0, stop: Optional[int] = None) -> Iterator[dict]:
+    """
+    Stream records [start, stop) of a compressed segment.
+
+    Seeks with the index to the chunk holding `start`, so only the chunks
+    covering the range are inflated.
+    """
+    stop = index.event_count if stop is None else min(stop, index.event_count)
+    if start >= stop or buffer is None:
+        return
+    view = memoryview(buffer)
+    chunk = index.chunk_for(max(start, 0))
+    sequence = index.chunk_sequences[chunk]
+    offset = index.chunk_offsets[chunk]
+    while sequence < stop and offset < len(view):
+        raw, offset = _read_chunk(view, offset)
+        for record in iter_records(raw):
+            if sequence >= stop:
+                break
+            if sequence >= start:
+                yield record
+            sequence += 1
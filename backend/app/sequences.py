@@ -0,0 +1,81 @@
+"""
+Backfill of per-agent sequence numbers for events written before the
+sequence column existed.
+
+init_db adds the (nullable) column to an existing events table; new
+events get their sequence from the chain head as they are ingested.
+Older rows are numbered per agent in (timestamp, event_id) order, which
+is their chain order and matches the count the chain head was
+bootstrapped from, then the (agent_id, sequence) index is built.
+"""
+import logging
+from typing import Callable, Optional
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from app.partitions import is_partitioned
+
+logger = logging.getLogger(__name__)
+
+
+def add_column(engine: Engine) -> bool:
+    """Add the sequence column to an events table that predates it."""
+    columns = {column["name"] for column in inspect(engine).get_columns("events")}
+    if "sequence" in columns:
+        return False
+    with engine.begin() as conn:
+        # Nullable with no default: a metadata-only change in Postgres
+        conn.execute(text("ALTER TABLE events ADD COLUMN sequence BIGINT"))
+    logger.warning("Added events.sequence; run python -m app.cli sequence-backfill to number existing events")
+    return True
+
+
+def backfill(engine: Engine, progress: Optional[Callable[[str, int], None]] = None) -> int:
+    """
+    Number every agent's unsequenced events, one agent per transaction.
+
+    Safe to interrupt and re-run. Returns the number of rows updated.
+    """
+    with engine.connect() as conn:
+        agent_ids = [
+            row[0] for row in conn.execute(text("SELECT DISTINCT agent_id FROM events WHERE sequence IS NULL"))
+        ]
+
+    statement = text("""
+UPDATE events SET sequence = numbered.seq
+FROM (
+    SELECT event_id, row_number() OVER (ORDER BY timestamp, event_id) AS seq
+    FROM events WHERE agent_id = :agent_id
+) AS numbered
+WHERE events.event_id = numbered.event_id AND events.sequence IS NULL
+""")
+    total = 0
+    for agent_id in agent_ids:
+        with engine.begin() as conn:
+            rows = conn.execute(statement, {"agent_id": agent_id}).rowcount
+        total += rows
+        if progress:
+            progress(agent_id, rows)
+    return total
+
+
+def build_index(engine: Engine) -> None:
+    """
+    Build the (agent_id, sequence) index, without blocking writes on Postgres.
+
+    It is unique except on a partitioned events table (DB_PARTITIONING),
+    where a unique index would have to include the partition key and
+    can't be built concurrently; there it is a plain index, built
+    partition by partition.
+    """
+    if engine.dialect.name != "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS idx_agent_sequence ON events (agent_id, sequence)"))
+        return
+    if is_partitioned(engine):
+        with engine.begin() as conn:
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_agent_sequence ON events (agent_id, sequence)"))
+        return
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_agent_sequence ON events (agent_id, sequence)"))
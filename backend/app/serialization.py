@@ -0,0 +1,119 @@
+"""
+Direct JSON encoding for event responses.
+
+The event endpoints fetch plain column tuples and encode them here
+instead of building EventResponse models that FastAPI would validate
+and serialize again. The routes keep their response_model, so the
+OpenAPI schema is unchanged, and the bytes match what FastAPI would
+have sent (datetimes in Pydantic's format, UTC as "Z").
+
+orjson is used when it is installed; otherwise the standard library
+encoder with the same settings as FastAPI's JSONResponse.
+"""
+import json
+from datetime import datetime
+from typing import Any, Iterable, Optional
+
+from fastapi.responses import Response
+
+from app.db_models import Event
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+# Columns of an event response, in EventResponse field order
+EVENT_COLUMNS = (
+    Event.event_id,
+    Event.agent_id,
+    Event.action_type,
+    Event.tool_name,
+    Event.timestamp,
+    Event.environment,
+    Event.model_version,
+    Event.prompt_version,
+    Event.input_hash,
+    Event.output_hash,
+    Event.previous_event_hash,
+    Event.event_hash,
+    Event.sequence,
+)
+
+
+def _json_timestamp(ts: datetime) -> str:
+    """Format a datetime the way Pydantic serializes it to JSON."""
+    text = ts.isoformat()
+    if text.endswith("+00:00"):
+        return text[:-6] + "Z"
+    return text
+
+
+def event_dict(event: Any) -> dict:
+    """
+    JSON-ready dict for one event.
+
+    Accepts an Event or any row with the same attributes (such as the
+    tuples selected with EVENT_COLUMNS).
+    """
+    return {
+        "event_id": event.event_id,
+        "agent_id": event.agent_id,
+        "action_type": event.action_type,
+        "tool_name": event.tool_name,
+        "timestamp": _json_timestamp(event.timestamp),
+        "environment": event.environment,
+        "model_version": event.model_version,
+        "prompt_version": event.prompt_version,
+        "input_hash": event.input_hash,
+        "output_hash": event.output_hash,
+        "previous_event_hash": event.previous_event_hash,
+        "event_hash": event.event_hash,
+        "sequence": event.sequence
+    }
+
+
+def dumps(content: Any) -> bytes:
+    """Encode JSON-ready content (strings, numbers, None, lists, dicts)."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+def json_response(content: Any, status_code: int = 200) -> Response:
+    """A response whose body is already encoded; FastAPI sends it as is."""
+    return Response(content=dumps(content), status_code=status_code, media_type="application/json")
+
+
+def event_response(event: Any, status_code: int = 200) -> Response:
+    """Encode a single EventResponse."""
+    return json_response(event_dict(event), status_code)
+
+
+def event_list_response(
+    events: Iterable[Any],
+    total: Optional[int],
+    page: int,
+    page_size: int,
+    next_cursor: Optional[str]
+) -> Response:
+    """Encode an EventListResponse."""
+    return json_response({
+        "events": [event_dict(e) for e in events],
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "next_cursor": next_cursor
+    })
+
+
+def event_batch_response(events: Iterable[Any], status_code: int = 201) -> Response:
+    """Encode an EventBatchResponse."""
+    events = [event_dict(e) for e in events]
+    return json_response({"events": events, "count": len(events)}, status_code)
@@ -0,0 +1,557 @@
+"""
+Local write-ahead log for ingest (INGEST_WAL).
+
+With the WAL enabled, POST /events and /events/batch are acknowledged as
+soon as the event is chained and durable on local disk, instead of after
+the database commit and archive append:
+
+1. The group-commit writer thread (IngestPipeline) collects a group of
+   requests and chains them against chain heads kept in memory.
+2. The group is appended to the current WAL segment as one checksummed
+   frame and fsynced once (group fsync), then every request in it is
+   acknowledged with its event.
+3. An applier thread writes acknowledged events to the database (one
+   transaction per batch, chain heads and MMR nodes included) and the
+   archive, then deletes WAL segments that are fully applied.
+
+On startup, frames left over from a crash are replayed before any new
+event is accepted: events already in the database (applied just before
+the crash) are skipped, the rest are applied. A torn frame at the end of
+the last segment (crash mid-write) fails its checksum; it was never
+acknowledged and is dropped.
+
+The in-memory chain heads make this process the only writer: the WAL
+directory is locked, so run one worker per WAL_PATH. If the database
+shows that something else wrote to a chain anyway (WalChainError, or a
+conflicting row), applying stops for good and new events are refused
+until an operator has sorted it out; the log is kept for replay. New
+events are also refused while WAL_MAX_UNAPPLIED events await applying. Reads (listing,
+verification, proofs) see an event once it has been applied, normally
+within milliseconds.
+
+Frame layout (little-endian):
+
+    header   magic "ALW1", first LSN (u64), event count (u32),
+             payload bytes (u32), crc32 of payload (u32)
+    payload  JSON array of event rows
+
+Segments are named wal-<first LSN>.log; LSNs number events.
+"""
+import fcntl
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Optional, Sequence
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import get_settings
+from app.database import SessionLocal
+from app.db_models import Event
+from app.models import EventCreate
+from app.hash_chain import (
+    ChainHeadState,
+    compute_event_hash,
+    get_chain_head,
+    lock_chain_head,
+    next_event_timestamp,
+    remember_chain_head,
+)
+from app.archive import get_archive_writer
+from app.mmr import build_append_rows, insert_nodes
+from app.event_stream import notify_events, publish_events
+from app.ingest import IngestPipeline, IngestUnavailableError, _PendingRequest
+
+logger = logging.getLogger(__name__)
+
+FRAME_MAGIC = b"ALW1"
+FRAME_HEADER = struct.Struct("<4sQIII")
+SEGMENT_PREFIX = "wal-"
+SEGMENT_SUFFIX = ".log"
+
+# Applier retry delay after a failed database write, doubling up to the max
+APPLY_RETRY_S = 0.5
+APPLY_RETRY_MAX_S = 30.0
+# Retry-After sent while the unapplied backlog is full
+BACKLOG_RETRY_AFTER_S = 5.0
+
+
+class WalChainError(RuntimeError):
+    """The database chain head doesn't match the WAL (another writer appended)."""
+
+
+def _encode_row(row: dict) -> dict:
+    return {**row, "timestamp": row["timestamp"].isoformat()}
+
+
+def _decode_row(row: dict) -> dict:
+    return {**row, "timestamp": datetime.fromisoformat(row["timestamp"])}
+
+
+def encode_frame(first_lsn: int, rows: list[dict]) -> bytes:
+    payload = json.dumps([_encode_row(r) for r in rows], separators=(",", ":")).encode("utf-8")
+    return FRAME_HEADER.pack(FRAME_MAGIC, first_lsn, len(rows), len(payload), zlib.crc32(payload)) + payload
+
+
+def read_frames(path: Path) -> tuple[list[tuple[int, list[dict]]], int]:
+    """
+    Read the valid frames of a segment.
+
+    Returns (first LSN, rows) per frame and the byte length of the valid
+    prefix; anything after it is a torn or corrupt tail.
+    """
+    data = path.read_bytes()
+    frames = []
+    offset = 0
+    while offset + FRAME_HEADER.size <= len(data):
+        magic, first_lsn, count, length, crc = FRAME_HEADER.unpack_from(data, offset)
+        start = offset + FRAME_HEADER.size
+        payload = data[start:start + length]
+        if magic != FRAME_MAGIC or len(payload) != length or zlib.crc32(payload) != crc:
+            break
+        rows = [_decode_row(r) for r in json.loads(payload)]
+        if len(rows) != count:
+            break
+        frames.append((first_lsn, rows))
+        offset = start + length
+    return frames, offset
+
+
+def _segment_lsn(path: Path) -> int:
+    return int(path.name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+
+
+def list_segments(wal_path: Path) -> list[Path]:
+    """WAL segments in LSN order."""
+    return sorted(wal_path.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}"), key=_segment_lsn)
+
+
+def apply_rows(db: Session, rows: Sequence[dict]) -> list[Event]:
+    """
+    Write already-chained event rows in one transaction.
+
+    Like ingest_events, but the hashes, timestamps and sequences were
+    assigned when the rows were logged. Each agent's chain head is locked
+    and must be exactly where the rows continue from; otherwise something
+    else appended to the chain and WalChainError is raised.
+    """
+    rows_by_agent: dict[str, list[dict]] = {}
+    for row in rows:
+        rows_by_agent.setdefault(row["agent_id"], []).append(row)
+
+    head_states: dict[str, ChainHeadState] = {}
+    mmr_rows: list[dict] = []
+    mmr_index = get_settings().mmr_index
+    try:
+        for agent_id in sorted(rows_by_agent):
+            agent_rows = rows_by_agent[agent_id]
+            head = lock_chain_head(db, agent_id)
+            first = agent_rows[0]
+            if head.event_hash != first["previous_event_hash"] or (head.sequence or 0) != first["sequence"] - 1:
+                raise WalChainError(
+                    f"Chain head of {agent_id} is at sequence {head.sequence}, "
+                    f"but the WAL continues from sequence {first['sequence'] - 1}"
+                )
+            if mmr_index:
+                mmr_rows.extend(build_append_rows(
+                    db,
+                    agent_id,
+                    head.sequence or 0,
+                    [(r["event_id"], r["event_hash"]) for r in agent_rows]
+                ))
+            last = agent_rows[-1]
+            head.event_hash = last["event_hash"]
+            head.sequence = last["sequence"]
+            head.last_timestamp = last["timestamp"]
+            head_states[agent_id] = ChainHeadState(last["event_hash"], last["sequence"], last["timestamp"])
+
+        db.execute(insert(Event), list(rows))
+        insert_nodes(db, mmr_rows)
+        notify_events(db, [row["event_id"] for row in rows])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    for agent_id, state in head_states.items():
+        remember_chain_head(agent_id, state)
+    events = [Event(**row) for row in rows]
+    try:
+        publish_events(events)
+    except Exception:
+        # The events are committed; live streams catch up on reconnect
+        logger.exception("Failed to publish events to live streams")
+    return events
+
+
+class WalIngestPipeline(IngestPipeline):
+    """
+    Group-commit pipeline that acknowledges events once they are in the WAL.
+
+    start() locks the WAL directory and replays anything left over before
+    the writer and applier threads start; stop() drains both.
+    """
+
+    exclusive = True
+
+    def __init__(
+        self,
+        wal_path: str,
+        window_ms: float,
+        max_batch: int,
+        fsync: bool = True,
+        segment_max_bytes: int = 64 * 1024 * 1024,
+        apply_batch: int = 5000,
+        max_unapplied: int = 1000000
+    ):
+        super().__init__(window_ms=window_ms, max_batch=max_batch)
+        self.wal_path = Path(wal_path)
+        self.fsync = fsync
+        self.segment_max_bytes = segment_max_bytes
+        self.apply_batch = apply_batch
+        self.max_unapplied = max_unapplied
+        self._lock_file: Optional[BinaryIO] = None
+        self._segment: Optional[BinaryIO] = None
+        self._segment_bytes = 0
+        # (first LSN, path) of segments not yet deleted, oldest first
+        self._segments: list[tuple[int, Path]] = []
+        self._segments_lock = threading.Lock()
+        self._next_lsn = 1
+        # Heads as of the last logged event, ahead of the database
+        self._heads: dict[str, ChainHeadState] = {}
+        self._apply_queue: queue.Queue[Optional[tuple[int, list[dict]]]] = queue.Queue()
+        self._applier: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self.unapplied = 0
+        self.applied = 0
+        self.apply_failures = 0
+        # Set when applying hit an error retrying can't fix; nothing more
+        # is logged or applied after that
+        self.fatal_error: Optional[Exception] = None
+
+    # Lifecycle
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self.wal_path.mkdir(parents=True, exist_ok=True)
+        self._lock_file = open(self.wal_path / "LOCK", "ab")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            raise RuntimeError(
+                f"WAL directory {self.wal_path} is in use by another process; "
+                "INGEST_WAL needs one worker per WAL_PATH"
+            )
+        try:
+            replayed = self.recover()
+        except Exception:
+            # Leave the log as it is for the next attempt
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+            raise
+        if replayed:
+            logger.info("Replayed %d events from the ingest WAL", replayed)
+        self._open_segment()
+        self._applier = threading.Thread(target=self._run_applier, name="wal-applier", daemon=True)
+        self._applier.start()
+        super().start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        """Stop accepting events, then apply everything logged so far."""
+        if self._applier is None:
+            return
+        super().stop(timeout)
+        self._apply_queue.put(None)
+        self._applier.join(timeout)
+        if self._applier.is_alive():
+            logger.warning("WAL applier did not finish; unapplied events will be replayed on the next start")
+        self._applier = None
+        if self._segment is not None:
+            self._segment.close()
+            self._segment = None
+        if self.unapplied == 0:
+            self._delete_segments_before(self._next_lsn)
+        fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        self._lock_file.close()
+        self._lock_file = None
+
+    def check_health(self) -> Optional[str]:
+        if self.fatal_error is not None:
+            return f"WAL apply stopped: {self.fatal_error}"
+        if not self.running:
+            return "WAL is not running"
+        if self.unapplied >= self.max_unapplied:
+            return f"WAL backlog full ({self.unapplied} unapplied events)"
+        return None
+
+    def submit(self, item: EventCreate):
+        self._check_accepting()
+        return super().submit(item)
+
+    def submit_many(self, items: Sequence[EventCreate]):
+        self._check_accepting()
+        return super().submit_many(items)
+
+    def _check_accepting(self) -> None:
+        if self.fatal_error is not None:
+            raise IngestUnavailableError(f"Ingest is stopped: {self.fatal_error}")
+        if not self.running:
+            raise IngestUnavailableError("Ingest WAL is not running")
+        if self.unapplied >= self.max_unapplied:
+            raise IngestUnavailableError(
+                f"Ingest WAL backlog is full ({self.unapplied} events not yet in the database)",
+                retry_after=BACKLOG_RETRY_AFTER_S
+            )
+
+    def recover(self) -> int:
+        """
+        Apply WAL frames that didn't reach the database before a crash.
+
+        Returns the number of events applied. Segments are deleted once
+        everything in them is in the database.
+        """
+        replayed = 0
+        segments = list_segments(self.wal_path)
+        for path in segments:
+            frames, valid_bytes = read_frames(path)
+            if valid_bytes < path.stat().st_size:
+                logger.warning("Dropping %d bytes of torn WAL frame at the end of %s",
+                               path.stat().st_size - valid_bytes, path.name)
+            for first_lsn, rows in frames:
+                self._next_lsn = max(self._next_lsn, first_lsn + len(rows))
+                replayed += self._replay(rows)
+        for path in segments:
+            path.unlink()
+        return replayed
+
+    def _replay(self, rows: list[dict]) -> int:
+        db = SessionLocal()
+        try:
+            ids = [r["event_id"] for r in rows]
+            present = {
+                event_id for (event_id,) in
+                db.query(Event.event_id).filter(Event.event_id.in_(ids))
+            }
+            missing = [r for r in rows if r["event_id"] not in present]
+            if missing:
+                events = apply_rows(db, missing)
+                self._archive(events)
+            return len(missing)
+        finally:
+            db.close()
+
+    # Writer thread: chain, log, acknowledge
+
+    def _head(self, agent_id: str) -> ChainHeadState:
+        state = self._heads.get(agent_id)
+        if state is None:
+            db = SessionLocal()
+            try:
+                state = get_chain_head(db, agent_id)
+            finally:
+                db.close()
+            self._heads[agent_id] = state
+        return state
+
+    def _write_batch(self, batch: list[_PendingRequest]) -> None:
+        started_at = time.monotonic()
+        queue_delays_ms = [(started_at - p.enqueued_at) * 1000.0 for p in batch for _ in p.items]
+        try:
+            # Whatever stopped the applier may have happened while these waited
+            if self.fatal_error is not None:
+                raise IngestUnavailableError(f"Ingest is stopped: {self.fatal_error}")
+            heads = {}
+            rows = []
+            for pending in batch:
+                for item in pending.items:
+                    head = heads.get(item.agent_id) or self._head(item.agent_id)
+                    row = _chain_row(item, head)
+                    heads[item.agent_id] = ChainHeadState(row["event_hash"], row["sequence"], row["timestamp"])
+                    rows.append(row)
+
+            first_lsn = self._next_lsn
+            self._append(encode_frame(first_lsn, rows))
+        except Exception as e:
+            logger.exception("Failed to write ingest WAL")
+            for pending in batch:
+                pending.future.set_exception(e)
+            self.metrics.record_batch(len(queue_delays_ms), queue_delays_ms, failed=True)
+            return
+
+        # Durable: advance the heads and acknowledge
+        self._next_lsn += len(rows)
+        self._heads.update(heads)
+        with self._stats_lock:
+            self.unapplied += len(rows)
+        self._apply_queue.put((first_lsn, rows))
+        position = 0
+        for pending in batch:
+            pending.resolve([Event(**row) for row in rows[position:position + len(pending.items)]])
+            position += len(pending.items)
+        self.metrics.record_batch(len(rows), queue_delays_ms, failed=False)
+
+    def _append(self, frame: bytes) -> None:
+        if self._segment_bytes >= self.segment_max_bytes:
+            self._segment.close()
+            self._open_segment()
+        try:
+            self._segment.write(frame)
+            if self.fsync:
+                os.fsync(self._segment.fileno())
+        except OSError:
+            # The frame isn't acknowledged, so it must not be replayed
+            # either: its events would fork the chains
+            self._segment.truncate(self._segment_bytes)
+            raise
+        self._segment_bytes += len(frame)
+
+    def _open_segment(self) -> None:
+        path = self.wal_path / f"{SEGMENT_PREFIX}{self._next_lsn:020d}{SEGMENT_SUFFIX}"
+        self._segment = open(path, "ab", buffering=0)
+        self._segment_bytes = self._segment.tell()
+        if self.fsync:
+            # Make the new directory entry durable too
+            directory = os.open(self.wal_path, os.O_RDONLY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+        with self._segments_lock:
+            self._segments.append((self._next_lsn, path))
+
+    # Applier thread: database and archive
+
+    def _run_applier(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._apply_queue.get()
+            if item is None:
+                return
+            end_lsn, rows = item[0] + len(item[1]), list(item[1])
+            while len(rows) < self.apply_batch:
+                try:
+                    item = self._apply_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                end_lsn = item[0] + len(item[1])
+                rows.extend(item[1])
+            if not self._apply(rows):
+                # Leave everything from here on in the log
+                return
+            self._delete_segments_before(end_lsn)
+
+    def _apply(self, rows: list[dict]) -> bool:
+        """
+        Apply rows, retrying until the database takes them.
+
+        Returns False, with fatal_error set, if the database shows another
+        writer on the chains: retrying can't fix that, and logging more
+        events on top would only fork the chains further.
+        """
+        delay = APPLY_RETRY_S
+        while True:
+            db = SessionLocal()
+            try:
+                events = apply_rows(db, rows)
+                break
+            except (WalChainError, IntegrityError) as e:
+                self.fatal_error = e
+                logger.critical(
+                    "Stopped applying the ingest WAL (%d events pending, new events refused): %s",
+                    self.unapplied, e
+                )
+                return False
+            except Exception:
+                with self._stats_lock:
+                    self.apply_failures += 1
+                logger.exception("Failed to apply %d WAL events; retrying in %.1fs", len(rows), delay)
+            finally:
+                db.close()
+            time.sleep(delay)
+            delay = min(delay * 2, APPLY_RETRY_MAX_S)
+        self._archive(events)
+        with self._stats_lock:
+            self.unapplied -= len(rows)
+            self.applied += len(rows)
+        return True
+
+    @staticmethod
+    def _archive(events: list[Event]) -> None:
+        try:
+            get_archive_writer().write_events(events)
+        except Exception as e:
+            # Log but don't fail - DB is primary storage
+            print(f"Warning: Archive write failed: {e}")
+
+    def _delete_segments_before(self, lsn: int) -> None:
+        """Delete closed segments whose events all have LSNs below lsn."""
+        with self._segments_lock:
+            self._delete_segments_locked(lsn)
+
+    def _delete_segments_locked(self, lsn: int) -> None:
+        while len(self._segments) > 1 and self._segments[1][0] <= lsn:
+            _, path = self._segments.pop(0)
+            path.unlink(missing_ok=True)
+        if self._segment is None and self._segments and self._segments[0][0] <= lsn:
+            # Stopped: the last segment is closed too
+            for _, path in self._segments:
+                path.unlink(missing_ok=True)
+            self._segments.clear()
+
+    def wal_snapshot(self) -> dict:
+        with self._stats_lock:
+            return {
+                "wal_unapplied": self.unapplied,
+                "wal_applied": self.applied,
+                "wal_apply_failures": self.apply_failures,
+                "wal_apply_stopped": self.fatal_error is not None,
+            }
+
+
+def _chain_row(item: EventCreate, head: ChainHeadState) -> dict:
+    """Build the next event row of a chain from its current head."""
+    event_id = str(uuid.uuid4())
+    timestamp = next_event_timestamp(head)
+    event_hash = compute_event_hash(
+        event_id=event_id,
+        agent_id=item.agent_id,
+        action_type=item.action_type,
+        tool_name=item.tool_name,
+        timestamp=timestamp,
+        environment=item.environment,
+        model_version=item.model_version,
+        prompt_version=item.prompt_version,
+        input_hash=item.input_hash,
+        output_hash=item.output_hash,
+        previous_event_hash=head.event_hash
+    )
+    return {
+        "event_id": event_id,
+        "agent_id": item.agent_id,
+        "action_type": item.action_type,
+        "tool_name": item.tool_name,
+        "timestamp": timestamp,
+        "environment": item.environment,
+        "model_version": item.model_version,
+        "prompt_version": item.prompt_version,
+        "input_hash": item.input_hash,
+        "output_hash": item.output_hash,
+        "previous_event_hash": head.event_hash,
+        "event_hash": event_hash,
+        "sequence": head.sequence + 1
+    }
@@ -0,0 +1,165 @@
+"""
+Differential check and benchmark for the canonical event encoder.
+
+compute_event_hash uses canonicalize_event_fast; canonicalize_event is
+the reference. Any byte of difference between the two would change
+event hashes and break every chain, so this first compares them on
+fuzzed events (odd strings, escapes, non-ASCII, surrogates, naive and
+offset timestamps) and exits 1 on the first mismatch, then times both.
+
+Run from the backend directory:
+
+    python benchmarks/canonical_encoder.py --cases 100000 --events 100000
+"""
+import argparse
+import hashlib
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.hash_chain import canonicalize_event, canonicalize_event_fast  # noqa: E402
+
+FIELDS = (
+    "event_id",
+    "agent_id",
+    "action_type",
+    "tool_name",
+    "timestamp",
+    "environment",
+    "model_version",
+    "prompt_version",
+    "input_hash",
+    "output_hash",
+    "previous_event_hash",
+)
+OPTIONAL_FIELDS = {"tool_name", "environment", "model_version", "prompt_version", "previous_event_hash"}
+
+ALPHABETS = (
+    "abcdefghijklmnopqrstuvwxyz0123456789-_.:/ ",
+    '"\\/\b\f\n\r\t',
+    "".join(chr(c) for c in range(0x20)) + "\x7f",
+    "éüßçñ€→中文日本語",
+    "\U0001f600\U0001f680\U00010348",
+    "\ud800\udbff\udc00\udfff",  # lone surrogates
+)
+ZONES = (
+    timezone.utc,
+    timezone(timedelta(0)),
+    timezone(timedelta(hours=5, minutes=30)),
+    timezone(timedelta(hours=-11, minutes=-15, seconds=-7)),
+    ZoneInfo("America/New_York"),
+    ZoneInfo("Australia/Lord_Howe"),
+)
+
+
+def random_string(rng: random.Random) -> str:
+    length = rng.choice((0, 1, 2, 8, 36, 64, 200))
+    alphabet = "".join(rng.sample(ALPHABETS, rng.randint(1, 3)))
+    return "".join(rng.choice(alphabet) for _ in range(length))
+
+
+def random_timestamp(rng: random.Random) -> datetime:
+    ts = datetime(
+        rng.choice((1, 999, 1000, 1970, 2024, 2038, 9998)),
+        rng.randint(1, 12),
+        rng.randint(1, 28),
+        rng.randint(0, 23),
+        rng.randint(0, 59),
+        rng.randint(0, 59),
+        rng.choice((0, 1, 999999, rng.randint(0, 999999)))
+    )
+    if rng.random() < 0.25:
+        return ts  # naive, hashed as UTC
+    try:
+        return ts.replace(tzinfo=rng.choice(ZONES))
+    except (OverflowError, ValueError):
+        return ts
+
+
+def random_event(rng: random.Random) -> dict:
+    event = {}
+    for field in FIELDS:
+        if field == "timestamp":
+            event[field] = random_timestamp(rng)
+        elif field in OPTIONAL_FIELDS and rng.random() < 0.3:
+            event[field] = None
+        elif rng.random() < 0.01:
+            event[field] = rng.choice((0, -1, 2**70, 1.5, True))  # not a string: reference path
+        elif field.endswith("hash") and rng.random() < 0.7:
+            event[field] = "%064x" % rng.getrandbits(256)
+        else:
+            event[field] = random_string(rng)
+    return event
+
+
+def typical_event(rng: random.Random) -> dict:
+    """An event as ingest produces it: ASCII fields, aware UTC timestamp."""
+    return {
+        "event_id": "%08x-%04x-4%03x-a%03x-%012x" % tuple(rng.getrandbits(b) for b in (32, 16, 12, 12, 48)),
+        "agent_id": "support-agent-%d" % rng.randint(1, 50),
+        "action_type": rng.choice(("llm_call", "tool_use", "retrieval")),
+        "tool_name": rng.choice((None, "search", "calculator")),
+        "timestamp": datetime.now(timezone.utc) - timedelta(microseconds=rng.randint(0, 10**12)),
+        "environment": "production",
+        "model_version": "gpt-4o-2024-08-06",
+        "prompt_version": None,
+        "input_hash": "%064x" % rng.getrandbits(256),
+        "output_hash": "%064x" % rng.getrandbits(256),
+        "previous_event_hash": "%064x" % rng.getrandbits(256),
+    }
+
+
+def differential(cases: int, seed: int) -> bool:
+    rng = random.Random(seed)
+    for case in range(cases):
+        event = random_event(rng)
+        try:
+            expected = canonicalize_event(**event)
+        except (OverflowError, ValueError) as e:
+            expected = type(e)
+        try:
+            actual = canonicalize_event_fast(**event)
+        except (OverflowError, ValueError) as e:
+            actual = type(e)
+        if expected != actual:
+            print(f"MISMATCH in case {case}:\n  event:     {event!r}\n  reference: {expected!r}\n  fast:      {actual!r}")
+            return False
+    print(f"{cases} fuzzed events: identical output")
+    return True
+
+
+def bench(label: str, function, events: list[dict]) -> float:
+    start = time.perf_counter()
+    for event in events:
+        hashlib.sha256(function(**event).encode("utf-8")).hexdigest()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<10} {elapsed:7.3f}s  {len(events) / elapsed:>10,.0f} events/s")
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cases", type=int, default=100000, help="Fuzzed events to compare")
+    parser.add_argument("--events", type=int, default=100000, help="Events to hash per timing run")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if not differential(args.cases, args.seed):
+        return 1
+
+    rng = random.Random(args.seed)
+    events = [typical_event(rng) for _ in range(args.events)]
+    print(f"Hashing {args.events} typical events:")
+    reference = bench("reference", canonicalize_event, events)
+    fast = bench("fast", canonicalize_event_fast, events)
+    print(f"  speedup    {reference / fast:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
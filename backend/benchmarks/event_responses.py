@@ -0,0 +1,102 @@
+"""
+Benchmark encoding an event list page: EventResponse models versus the
+direct path in app/serialization.py.
+
+The model path is what the routes did before: build one EventResponse per
+row, wrap them in EventListResponse, and let FastAPI validate and dump
+it. Both produce the same bytes; this checks that, then times them.
+
+Run from the backend directory:
+
+    python benchmarks/event_responses.py --page-size 1000 --pages 200
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app import serialization  # noqa: E402
+from app.models import EventListResponse, EventResponse  # noqa: E402
+
+
+def make_rows(count: int) -> list:
+    start = datetime.now(timezone.utc)
+    return [
+        SimpleNamespace(
+            event_id=f"00000000-0000-4000-8000-{i:012d}",
+            agent_id="support-agent",
+            action_type="llm_call",
+            tool_name="search" if i % 3 else None,
+            timestamp=start + timedelta(microseconds=i),
+            environment="production",
+            model_version="gpt-4o-2024-08-06",
+            prompt_version=None,
+            input_hash="%064x" % (i * 7919),
+            output_hash="%064x" % (i * 104729),
+            previous_event_hash="%064x" % (i * 1299709),
+            event_hash="%064x" % (i * 15485863),
+            sequence=i + 1
+        )
+        for i in range(count)
+    ]
+
+
+def model_path(rows: list) -> bytes:
+    page = EventListResponse(
+        events=[EventResponse.model_validate(row) for row in rows],
+        total=len(rows),
+        page=1,
+        page_size=len(rows),
+        next_cursor=None
+    )
+    # What FastAPI does with a returned model and a response_model:
+    # dump it, validate against the response model, dump that to JSON types
+    validated = EventListResponse.model_validate(page.model_dump())
+    return JSONResponse(validated.model_dump(mode="json")).body
+
+
+def direct_path(rows: list) -> bytes:
+    return serialization.event_list_response(rows, len(rows), 1, len(rows), None).body
+
+
+def bench(label: str, function, rows: list, pages: int) -> float:
+    start = time.perf_counter()
+    for _ in range(pages):
+        function(rows)
+    elapsed = (time.perf_counter() - start) / pages
+    print(f"  {label:<16} {elapsed * 1000:8.2f} ms/page")
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--pages", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = make_rows(args.page_size)
+    if json.loads(model_path(rows)) != json.loads(direct_path(rows)):
+        print("Outputs differ")
+        return 1
+
+    print(f"Encoding {args.pages} pages of {args.page_size} events "
+          f"(orjson {'installed' if serialization.orjson else 'not installed'}):")
+    models = bench("EventResponse", model_path, rows, args.pages)
+    direct = bench("direct", direct_path, rows, args.pages)
+    if serialization.orjson is not None:
+        orjson, serialization.orjson = serialization.orjson, None
+        bench("direct, stdlib", direct_path, rows, args.pages)
+        serialization.orjson = orjson
+    print(f"  speedup          {models / direct:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Concurrent ingest throughput of one worker, with and without slow
+requests running next to it.
+
+Starts --clients coroutines that POST /events in a loop for --seconds,
+optionally alongside --slow-clients that keep requesting a slow endpoint
+(a full chain verification by default). Reports ingest events/s and
+latency percentiles. If handlers block the event loop, ingest stalls
+whenever a slow request is being served; with the work in threads it
+keeps going.
+
+Run against a single-worker server, e.g. before and after a change:
+
+    uvicorn app.main:app --workers 1 &
+    python benchmarks/ingest_concurrency.py --clients 64 --slow-clients 4
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+
+
+def event(agent_id: str) -> dict:
+    return {
+        "agent_id": agent_id,
+        "action_type": "llm_call",
+        "input_hash": "a" * 64,
+        "output_hash": "b" * 64,
+    }
+
+
+async def ingest_client(client: httpx.AsyncClient, index: int, deadline: float, latencies: list, errors: list) -> None:
+    payload = event(f"bench-agent-{index % 16}")
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.post("/events", json=payload)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+        except httpx.HTTPError as e:
+            errors.append(str(e))
+
+
+async def slow_client(client: httpx.AsyncClient, path: str, deadline: float, count: list) -> None:
+    while time.perf_counter() < deadline:
+        try:
+            response = await client.get(path)
+            await response.aread()
+            count.append(1)
+        except httpx.HTTPError:
+            pass
+
+
+async def run(args: argparse.Namespace) -> int:
+    limits = httpx.Limits(max_connections=args.clients + args.slow_clients)
+    async with httpx.AsyncClient(
+        base_url=args.url,
+        headers={"X-API-Key": args.api_key},
+        limits=limits,
+        timeout=60
+    ) as client:
+        # Give the slow endpoint something to chew on
+        seed = [event("bench-slow") for _ in range(1000)]
+        for _ in range(args.seed_batches):
+            (await client.post("/events/batch", json={"events": seed})).raise_for_status()
+
+        latencies: list = []
+        errors: list = []
+        slow_done: list = []
+        deadline = time.perf_counter() + args.seconds
+        started = time.perf_counter()
+        await asyncio.gather(
+            *(ingest_client(client, i, deadline, latencies, errors) for i in range(args.clients)),
+            *(slow_client(client, args.slow_path, deadline, slow_done) for _ in range(args.slow_clients))
+        )
+        elapsed = time.perf_counter() - started
+
+    if not latencies:
+        print(f"No events ingested ({len(errors)} errors)")
+        return 1
+    latencies.sort()
+    print(f"{args.clients} ingest clients, {args.slow_clients} x GET {args.slow_path}, {elapsed:.1f}s")
+    print(f"  ingest      {len(latencies) / elapsed:8.0f} events/s  ({len(errors)} errors)")
+    print(f"  latency p50 {statistics.median(latencies) * 1000:8.1f} ms")
+    print(f"  latency p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:8.1f} ms")
+    print(f"  latency max {latencies[-1] * 1000:8.1f} ms")
+    print(f"  slow requests completed: {len(slow_done)}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--api-key", default="dev-api-key-change-me")
+    parser.add_argument("--clients", type=int, default=64, help="Concurrent POST /events loops")
+    parser.add_argument("--slow-clients", type=int, default=4, help="Concurrent slow request loops")
+    parser.add_argument("--slow-path", default="/verify?agent_id=bench-slow&full=true",
+                        help="Endpoint the slow clients request")
+    parser.add_argument("--seed-batches", type=int, default=20,
+                        help="Batches of 1000 events written for the slow endpoint first")
+    parser.add_argument("--seconds", type=float, default=20)
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
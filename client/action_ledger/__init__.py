@@ -0,0 +1,17 @@
+"""
+Python client for the AI Action Ledger.
+
+    from action_ledger import LedgerClient
+
+    client = LedgerClient("http://localhost:8000", "dev-api-key-change-me")
+    client.log_event(
+        agent_id="my-agent",
+        action_type="llm_call",
+        input_hash=client.hash_content("What is 2+2?"),
+        output_hash=client.hash_content("4")
+    )
+"""
+from action_ledger.client import LedgerClient, LedgerError, QueueFullError
+from action_ledger.callbacks import ActionLedgerCallback
+
+__all__ = ["LedgerClient", "LedgerError", "QueueFullError", "ActionLedgerCallback"]
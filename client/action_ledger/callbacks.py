@@ -0,0 +1,122 @@
+"""
+LangChain callback that records LLM, chat model and tool calls.
+
+Each call becomes one event when it ends: the prompt (or tool input) is
+hashed into input_hash and the response (or tool output, or the error)
+into output_hash. Only hashes leave the process. Events go through a
+LedgerClient, so callbacks return without waiting for the ledger.
+"""
+import json
+from typing import Any, Optional
+from uuid import UUID
+
+from action_ledger.client import LedgerClient
+
+try:
+    from langchain_core.callbacks import BaseCallbackHandler
+except ImportError:  # older LangChain releases
+    try:
+        from langchain.callbacks.base import BaseCallbackHandler
+    except ImportError:  # optional dependency
+        BaseCallbackHandler = object
+
+
+class ActionLedgerCallback(BaseCallbackHandler):
+    """
+    Log every LLM and tool call of a LangChain run to the ledger.
+
+    Pass either ledger_url and api_key, or an existing client to share
+    its buffer and connection pool with the rest of the application.
+    """
+
+    def __init__(
+        self,
+        ledger_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        agent_id: str = "langchain-agent",
+        environment: Optional[str] = None,
+        prompt_version: Optional[str] = None,
+        client: Optional[LedgerClient] = None,
+        **client_options: Any
+    ):
+        if client is None:
+            if ledger_url is None or api_key is None:
+                raise ValueError("Pass ledger_url and api_key, or a LedgerClient")
+            client = LedgerClient(ledger_url, api_key, **client_options)
+        self.client = client
+        self.agent_id = agent_id
+        self.environment = environment
+        self.prompt_version = prompt_version
+        # run_id -> (action_type, tool_name, model_version, input_hash) of calls in progress
+        self._runs: dict[UUID, tuple[str, Optional[str], Optional[str], str]] = {}
+
+    # LLMs and chat models
+
+    def on_llm_start(self, serialized: dict, prompts: list[str], *, run_id: UUID, **kwargs: Any) -> None:
+        self._start(run_id, "llm_call", None, _model_name(serialized, kwargs), "\n".join(prompts))
+
+    def on_chat_model_start(self, serialized: dict, messages: list, *, run_id: UUID, **kwargs: Any) -> None:
+        text = json.dumps(
+            [[_message_dict(m) for m in conversation] for conversation in messages],
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        self._start(run_id, "llm_call", None, _model_name(serialized, kwargs), text)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        generations = getattr(response, "generations", None) or []
+        text = "\n".join(g.text for candidates in generations for g in candidates)
+        self._end(run_id, text)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, repr(error), error=True)
+
+    # Tools
+
+    def on_tool_start(self, serialized: dict, input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        tool_name = (serialized or {}).get("name") or kwargs.get("name")
+        self._start(run_id, "tool_use", tool_name, None, input_str)
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, str(output))
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, repr(error), error=True)
+
+    def _start(
+        self,
+        run_id: UUID,
+        action_type: str,
+        tool_name: Optional[str],
+        model_version: Optional[str],
+        input_text: str
+    ) -> None:
+        self._runs[run_id] = (action_type, tool_name, model_version, self.client.hash_content(input_text))
+
+    def _end(self, run_id: UUID, output_text: str, error: bool = False) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        action_type, tool_name, model_version, input_hash = run
+        self.client.log_event(
+            agent_id=self.agent_id,
+            action_type=f"{action_type}_error" if error else action_type,
+            input_hash=input_hash,
+            output_hash=self.client.hash_content(output_text),
+            tool_name=tool_name,
+            environment=self.environment,
+            model_version=model_version,
+            prompt_version=self.prompt_version
+        )
+
+
+def _model_name(serialized: Optional[dict], kwargs: dict) -> Optional[str]:
+    params = kwargs.get("invocation_params") or {}
+    name = params.get("model_name") or params.get("model")
+    if not name and serialized:
+        name = (serialized.get("kwargs") or {}).get("model_name") or (serialized.get("kwargs") or {}).get("model")
+    return str(name)[:100] if name else None
+
+
+def _message_dict(message: Any) -> dict:
+    return {"type": getattr(message, "type", type(message).__name__), "content": getattr(message, "content", message)}
@@ -0,0 +1,322 @@
+"""
+Buffered HTTP client for the AI Action Ledger.
+
+log_event() only puts the event on a bounded in-memory queue and returns
+a Future. A background thread drains the queue in batches (POST
+/events/batch) over one keep-alive connection pool, flushing when
+batch_size events are waiting or flush_interval_s after the first one,
+so agent code never waits on the ledger. Failed sends are retried with
+exponential backoff.
+"""
+import atexit
+import hashlib
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Optional
+
+import httpx
+
+logger = logging.getLogger("action_ledger")
+
+# Worth retrying: the ledger is overloaded, restarting or behind a proxy
+# that lost it. Everything else in 4xx is a problem with the request.
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+
+class LedgerError(Exception):
+    """An event could not be recorded."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class QueueFullError(LedgerError):
+    """The client's buffer was full and the event was dropped."""
+
+
+class LedgerClient:
+    """
+    Client for one ledger, safe to share between threads.
+
+    Create it once per process and reuse it: it owns the connection pool
+    and the sender thread. Call flush() to wait for buffered events to be
+    written and close() on shutdown (also done at interpreter exit).
+    """
+
+    def __init__(
+        self,
+        ledger_url: str,
+        api_key: str,
+        *,
+        batch_size: int = 100,
+        flush_interval_s: float = 1.0,
+        max_queue_size: int = 10000,
+        block_when_full: bool = False,
+        max_retries: int = 5,
+        backoff_s: float = 0.5,
+        max_backoff_s: float = 30.0,
+        timeout_s: float = 10.0,
+        max_connections: int = 4
+    ):
+        """
+        Args:
+            ledger_url: Base URL, e.g. http://localhost:8000
+            api_key: Sent as X-API-Key
+            batch_size: Events per request (at most the server's MAX_BATCH_SIZE)
+            flush_interval_s: Longest an event waits in the buffer before being sent
+            max_queue_size: Events buffered before log_event drops them (or blocks)
+            block_when_full: Wait for room instead of dropping when the buffer is full
+            max_retries: Retries of a failed request before its events are given up
+            backoff_s: First retry delay; doubles on each retry up to max_backoff_s
+            timeout_s: HTTP timeout per request
+            max_connections: Size of the keep-alive connection pool
+        """
+        self.ledger_url = ledger_url.rstrip("/")
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.block_when_full = block_when_full
+        self.max_retries = max_retries
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self._http = httpx.Client(
+            base_url=self.ledger_url,
+            headers={"X-API-Key": api_key},
+            timeout=timeout_s,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        # Events logged but not yet sent or given up; flush() waits for zero
+        self._pending = 0
+        self._pending_changed = threading.Condition()
+        self._flush_now = threading.Event()
+        self._closed = threading.Event()
+        self.stats = {"sent": 0, "failed": 0, "dropped": 0, "retries": 0}
+        self._thread = threading.Thread(target=self._run, name="action-ledger-sender", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @staticmethod
+    def hash_content(content: Any) -> str:
+        """SHA-256 hex digest of a string (UTF-8) or bytes, for input_hash/output_hash."""
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        return hashlib.sha256(content).hexdigest()
+
+    def log_event(
+        self,
+        agent_id: str,
+        action_type: str,
+        input_hash: str,
+        output_hash: str,
+        tool_name: Optional[str] = None,
+        environment: Optional[str] = None,
+        model_version: Optional[str] = None,
+        prompt_version: Optional[str] = None
+    ) -> Future:
+        """
+        Buffer an event for sending and return immediately.
+
+        The returned Future resolves to the stored event (with event_id,
+        event_hash, timestamp, ...) once it has been written, or raises
+        LedgerError if it couldn't be. Ignoring it is fine; failures are
+        also logged and counted in stats.
+        """
+        if self._closed.is_set():
+            raise LedgerError("LedgerClient is closed")
+        event = {
+            "agent_id": agent_id,
+            "action_type": action_type,
+            "input_hash": input_hash,
+            "output_hash": output_hash,
+        }
+        for field, value in (
+            ("tool_name", tool_name),
+            ("environment", environment),
+            ("model_version", model_version),
+            ("prompt_version", prompt_version),
+        ):
+            if value is not None:
+                event[field] = value
+
+        future: Future = Future()
+        with self._pending_changed:
+            self._pending += 1
+        try:
+            self._queue.put((event, future), block=self.block_when_full)
+        except queue.Full:
+            with self._pending_changed:
+                self.stats["dropped"] += 1
+            logger.warning("Ledger buffer full, dropped %s event for agent %s", action_type, agent_id)
+            self._resolve([(event, future)], error=QueueFullError("Ledger buffer is full"))
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Send buffered events now and wait until they are written or given up.
+
+        Returns False if the timeout expired first.
+        """
+        self._flush_now.set()
+        with self._pending_changed:
+            return self._pending_changed.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: Optional[float] = 30.0) -> None:
+        """Flush, stop the sender thread and close the connection pool."""
+        if self._closed.is_set():
+            return
+        atexit.unregister(self.close)
+        self.flush(timeout)
+        self._closed.set()
+        self._thread.join(timeout)
+        self._http.close()
+
+    def __enter__(self) -> "LedgerClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    # Synchronous calls
+
+    def health(self) -> dict:
+        return self._get("/health")
+
+    def verify_chain(self, agent_id: str, full: bool = False) -> dict:
+        """Verify an agent's hash chain (after sending anything still buffered)."""
+        self.flush()
+        return self._get("/verify", {"agent_id": agent_id, "full": full})
+
+    def get_event(self, event_id: str) -> dict:
+        return self._get(f"/events/{event_id}")
+
+    def list_events(self, agent_id: Optional[str] = None, **filters: Any) -> dict:
+        """List events; filters are the query parameters of GET /events."""
+        if agent_id is not None:
+            filters["agent_id"] = agent_id
+        return self._get("/events", filters)
+
+    def _get(self, path: str, params: Optional[dict] = None) -> dict:
+        response = self._http.get(path, params=params)
+        if response.is_error:
+            raise LedgerError(f"GET {path} failed: {response.status_code} {response.text}", response.status_code)
+        return response.json()
+
+    # Sender thread
+
+    def _run(self) -> None:
+        while not self._closed.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._send(batch)
+        # Closed: anything still queued (close timed out) is given up
+        leftover = []
+        while True:
+            try:
+                leftover.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if leftover:
+            self._fail(leftover, LedgerError("LedgerClient closed before the event was sent"))
+
+    def _next_batch(self) -> list:
+        """Wait for an event, then collect more until the batch is full or its time is up."""
+        try:
+            first = self._queue.get(timeout=self.flush_interval_s)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval_s
+        while len(batch) < self.batch_size:
+            if self._flush_now.is_set():
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    self._flush_now.clear()
+                    break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                # Short waits so a flush() request is noticed promptly
+                batch.append(self._queue.get(timeout=min(remaining, 0.05)))
+            except queue.Empty:
+                continue
+        return batch
+
+    def _send(self, batch: list) -> None:
+        try:
+            response = self._post_with_retries("/events/batch", {"events": [event for event, _ in batch]})
+        except LedgerError as e:
+            if e.status_code == 422 and len(batch) > 1:
+                # A batch is stored all-or-nothing; send one by one so a
+                # single invalid event doesn't take the others with it
+                for item in batch:
+                    self._send([item])
+                return
+            self._fail(batch, e)
+            return
+        except Exception as e:
+            self._fail(batch, LedgerError(f"Unexpected error sending events: {e!r}"))
+            return
+        stored = response.json()["events"]
+        self.stats["sent"] += len(batch)
+        self._resolve(batch, results=stored)
+
+    def _post_with_retries(self, path: str, body: dict) -> httpx.Response:
+        attempt = 0
+        while True:
+            try:
+                response = self._http.post(path, json=body)
+                if response.status_code not in RETRY_STATUSES:
+                    if response.is_error:
+                        raise LedgerError(
+                            f"Ledger rejected events: {response.status_code} {response.text}",
+                            response.status_code
+                        )
+                    return response
+                error = LedgerError(f"Ledger returned {response.status_code}", response.status_code)
+                retry_after = _retry_after(response)
+            except httpx.TransportError as e:
+                # Includes timeouts: the request may have been stored, but a
+                # duplicate is visible in the ledger while a lost event isn't
+                error = LedgerError(f"Could not reach the ledger: {e!r}")
+                retry_after = None
+            if attempt >= self.max_retries or self._closed.is_set():
+                raise error
+            if retry_after is not None:
+                delay = min(retry_after, self.max_backoff_s)
+            else:
+                delay = min(self.max_backoff_s, self.backoff_s * 2 ** attempt) * random.uniform(0.5, 1.0)
+            attempt += 1
+            self.stats["retries"] += 1
+            logger.info("%s; retry %d/%d in %.1fs", error, attempt, self.max_retries, delay)
+            if self._closed.wait(delay):
+                raise error
+
+    def _fail(self, batch: list, error: LedgerError) -> None:
+        self.stats["failed"] += len(batch)
+        logger.error("Failed to record %d ledger events: %s", len(batch), error)
+        self._resolve(batch, error=error)
+
+    def _resolve(self, batch: list, results: Optional[list] = None, error: Optional[Exception] = None) -> None:
+        for i, (_, future) in enumerate(batch):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(results[i])
+        with self._pending_changed:
+            self._pending -= len(batch)
+            self._pending_changed.notify_all()
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
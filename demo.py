@@ -9,63 +9,40 @@ This script demonstrates the full flow:
 
 Prerequisites:
 - AI Action Ledger running: docker compose up
-- requests installed: pip install requests
+- Python client installed: pip install ./client
 
 Usage:
     python demo.py
 """
 
-import hashlib
-import requests
 import time
 
+from action_ledger import LedgerClient, LedgerError
+
 # Configuration
 LEDGER_URL = "http://localhost:8000"
 API_KEY = "dev-api-key-change-me"
 AGENT_ID = f"demo-agent-{int(time.time())}"
 
-def sha256(content: str) -> str:
-    """Hash content using SHA-256."""
-    return hashlib.sha256(content.encode()).hexdigest()
+client = LedgerClient(LEDGER_URL, API_KEY)
 
 def log_event(action_type: str, input_text: str, output_text: str, tool_name: str = None):
-    """Log an event to the ledger."""
-    payload = {
-        "agent_id": AGENT_ID,
-        "action_type": action_type,
-        "input_hash": sha256(input_text),
-        "output_hash": sha256(output_text),
-    }
-    if tool_name:
-        payload["tool_name"] = tool_name
-    
-    response = requests.post(
-        f"{LEDGER_URL}/events",
-        headers={"X-API-Key": API_KEY, "Content-Type": "application/json"},
-        json=payload
+    """Buffer an event for the ledger; returns a Future for the stored event."""
+    return client.log_event(
+        agent_id=AGENT_ID,
+        action_type=action_type,
+        input_hash=client.hash_content(input_text),
+        output_hash=client.hash_content(output_text),
+        tool_name=tool_name
     )
-    response.raise_for_status()
-    return response.json()
 
 def verify_chain():
     """Verify the hash chain for our agent."""
-    response = requests.get(
-        f"{LEDGER_URL}/verify",
-        headers={"X-API-Key": API_KEY},
-        params={"agent_id": AGENT_ID}
-    )
-    response.raise_for_status()
-    return response.json()
+    return client.verify_chain(AGENT_ID)
 
 def list_events():
     """List all events for our agent."""
-    response = requests.get(
-        f"{LEDGER_URL}/events",
-        headers={"X-API-Key": API_KEY},
-        params={"agent_id": AGENT_ID}
-    )
-    response.raise_for_status()
-    return response.json()
+    return client.list_events(AGENT_ID)
 
 def main():
     print("=" * 60)
@@ -77,7 +54,7 @@ def main():
     # Check health
     print("\n[1/5] Checking ledger health...")
     try:
-        health = requests.get(f"{LEDGER_URL}/health").json()
+        health = client.health()
         print(f"  Status: {health['status']}")
         print(f"  Database: {health['database']}")
         print(f"  Archive: {health['archive']}")
@@ -96,8 +73,15 @@ def main():
         ("llm_call", "Summarize the weather", "It's a nice day in NYC - 72°F and sunny.", None),
     ]
     
-    for i, (action_type, input_text, output_text, tool_name) in enumerate(events, 1):
-        event = log_event(action_type, input_text, output_text, tool_name)
+    # Logging doesn't wait for the ledger; the client sends events in batches
+    pending = [log_event(*event) for event in events]
+    for i, future in enumerate(pending, 1):
+        try:
+            event = future.result()
+        except LedgerError as e:
+            print(f"  ERROR: {e}")
+            return
+        action_type = event['action_type']
         print(f"  Event {i}: {action_type}")
         print(f"    ID: {event['event_id'][:8]}...")
         print(f"    Hash: {event['event_hash'][:16]}...")